@@ -0,0 +1,271 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi.responses import Response, PlainTextResponse
+from typing import Dict, Optional
+from backend.api.services import (
+    get_news_crawler, get_sentiment_analyzer, get_cache_manager, get_stock_cache,
+    get_watchlist_hub, is_created, get_request_profiler, get_memory_profiler,
+    get_admission_controller
+)
+from backend.utils.config import Config
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """校验管理接口令牌"""
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置ADMIN_TOKEN，管理接口不可用")
+    if x_admin_token != Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="管理接口令牌无效")
+
+
+admin_router = APIRouter(dependencies=[Depends(verify_admin_token)])
+
+
+@admin_router.get("/caches")
+async def get_cache_stats() -> Dict:
+    """获取各缓存的条目数、字节数、命中率以及最近一次清理结果"""
+    return await asyncio.to_thread(get_cache_manager().stats)
+
+
+@admin_router.post("/caches/sweep")
+async def sweep_caches() -> Dict:
+    """立即执行一次缓存清理，在线程中执行文件操作以免阻塞事件循环"""
+    return await asyncio.to_thread(get_cache_manager().sweep)
+
+
+@admin_router.delete("/caches/stocks/{stock_code}")
+async def purge_stock_cache(stock_code: str) -> Dict:
+    """删除指定股票的新闻缓存和情感分析缓存
+
+    Args:
+        stock_code: 股票代码
+
+    Returns:
+        Dict: 各缓存删除的条目数
+    """
+    return await asyncio.to_thread(get_cache_manager().purge_stock, stock_code)
+
+
+@admin_router.post("/caches/stocks/{stock_code}/warm")
+async def warm_stock_cache(
+    stock_code: str,
+    days: int = Config.DEFAULT_DAYS,
+    max_news: int = Config.MAX_NEWS_PER_STOCK
+) -> Dict:
+    """预热指定股票的新闻缓存和情感分析缓存
+
+    Args:
+        stock_code: 股票代码
+        days: 获取最近几天的新闻
+        max_news: 最大新闻条数
+
+    Returns:
+        Dict: 预热结果
+    """
+    try:
+        news_list = await asyncio.to_thread(
+            get_news_crawler().get_stock_news,
+            stock_code=stock_code,
+            days=days,
+            max_news=max_news
+        )
+        analysis_result = await get_sentiment_analyzer().analyze_sentiment(
+            news_list=news_list,
+            stock_code=stock_code,
+            priority='batch',
+            consumer='admin_warm'
+        )
+        return {
+            'stock_code': stock_code,
+            'news_count': len(news_list),
+            'overall_score': analysis_result['analysis_summary']['overall_score']
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/llm-scheduler")
+async def get_llm_scheduler_metrics() -> Dict:
+    """获取大模型调度器各优先级的排队深度、执行数和等待时间"""
+    return get_sentiment_analyzer().scheduler.metrics()
+
+
+@admin_router.get("/admission")
+async def get_admission_metrics() -> Dict:
+    """获取分析接口准入控制的在途数、排队数、拒绝数和估算的服务时间"""
+    return get_admission_controller().metrics()
+
+
+@admin_router.get("/llm-usage")
+async def get_llm_usage() -> Dict:
+    """获取大模型调用的token用量，包括命中服务端前缀缓存的输入token数"""
+    analyzer = get_sentiment_analyzer()
+    return {
+        'model': analyzer.client_name,
+        **analyzer.client.usage.to_dict()
+    }
+
+
+@admin_router.get("/watchlist")
+async def get_watchlist_metrics() -> Dict:
+    """获取自选股订阅中心正在轮询的股票数和订阅数"""
+    if not is_created('watchlist_hub'):
+        return {'codes': 0, 'subscriptions': 0}
+    return get_watchlist_hub().metrics()
+
+
+# pstats支持的排序字段和tracemalloc支持的分组方式
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'pcalls', 'filename', 'name')
+TRACEMALLOC_GROUP_BY = ('lineno', 'filename', 'traceback')
+
+
+@admin_router.post("/profiling/cpu/start")
+async def start_cpu_profiling(
+    sample_rate: float = 0.1,
+    max_requests: int = Config.PROFILE_MAX_REQUESTS,
+    paths: Optional[str] = None
+) -> Dict:
+    """在当前worker开始按采样率分析请求的CPU耗时，清空之前的结果
+
+    Args:
+        sample_rate: 采样率（0-1]
+        max_requests: 分析的请求数达到该值后自动停止
+        paths: 需要分析的请求路径前缀，逗号分隔，默认Config.PROFILE_PATHS
+
+    Returns:
+        Dict: 采样状态
+    """
+    if not 0 < sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate必须在0到1之间")
+    if max_requests <= 0:
+        raise HTTPException(status_code=400, detail="max_requests必须为正整数")
+    path_list = ([path.strip() for path in paths.split(',') if path.strip()] if paths
+                 else Config.PROFILE_PATHS)
+    profiler = get_request_profiler()
+    profiler.start(path_list, sample_rate, max_requests)
+    return profiler.status()
+
+
+@admin_router.post("/profiling/cpu/stop")
+async def stop_cpu_profiling() -> Dict:
+    """停止采样，已累加的结果保留到下次开始"""
+    profiler = get_request_profiler()
+    profiler.stop()
+    return profiler.status()
+
+
+@admin_router.get("/profiling/cpu")
+async def get_cpu_profile(sort: str = 'cumulative', limit: int = 30) -> PlainTextResponse:
+    """获取累加的CPU分析结果中排在前面的函数（pstats文本报告）
+
+    Args:
+        sort: 排序字段
+        limit: 返回的函数数
+    """
+    if sort not in PROFILE_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort必须是{', '.join(PROFILE_SORT_KEYS)}之一")
+    profiler = get_request_profiler()
+    report = profiler.report(sort, limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="还没有分析结果")
+    status = profiler.status()
+    header = (f"worker已分析{status['profiled_requests']}个请求，"
+              f"采样{'进行中' if status['enabled'] else '已停止'}\n")
+    return PlainTextResponse(header + report)
+
+
+@admin_router.get("/profiling/cpu/pstats")
+async def download_cpu_profile() -> Response:
+    """下载累加的CPU分析结果（pstats格式），可用snakeviz或gprof2dot生成火焰图/调用图"""
+    data = get_request_profiler().dump()
+    if data is None:
+        raise HTTPException(status_code=404, detail="还没有分析结果")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": "attachment; filename=requests.pstats"}
+    )
+
+
+@admin_router.get("/profiling/memory")
+async def get_memory_profiling_status() -> Dict:
+    """获取tracemalloc跟踪状态和已保留的快照"""
+    return get_memory_profiler().status()
+
+
+@admin_router.post("/profiling/memory/snapshot")
+async def take_memory_snapshot(group_by: str = 'lineno', limit: int = 20) -> Dict:
+    """拍一个内存快照，第一次调用时开始跟踪（之后的分配才会被记录）
+
+    Args:
+        group_by: 分组方式，lineno、filename或traceback
+        limit: 返回的分配位置数
+
+    Returns:
+        Dict: 快照编号、当前跟踪的内存以及占用最多的分配位置
+    """
+    if group_by not in TRACEMALLOC_GROUP_BY:
+        raise HTTPException(status_code=400,
+                            detail=f"group_by必须是{', '.join(TRACEMALLOC_GROUP_BY)}之一")
+    return await asyncio.to_thread(get_memory_profiler().snapshot, group_by, limit)
+
+
+@admin_router.get("/profiling/memory/diff")
+async def diff_memory_snapshots(
+    base_id: Optional[int] = None,
+    snapshot_id: Optional[int] = None,
+    group_by: str = 'lineno',
+    limit: int = 20,
+    include: Optional[str] = None
+) -> Dict:
+    """对比两个内存快照，返回增长最多的分配位置
+
+    Args:
+        base_id: 基准快照编号，默认为倒数第二个快照
+        snapshot_id: 对比的快照编号，默认为最新的快照
+        group_by: 分组方式，lineno、filename或traceback
+        limit: 返回的分配位置数
+        include: 只统计调用栈中包含该文件的分配，支持通配符，如"*stock_cache.py"
+    """
+    if group_by not in TRACEMALLOC_GROUP_BY:
+        raise HTTPException(status_code=400,
+                            detail=f"group_by必须是{', '.join(TRACEMALLOC_GROUP_BY)}之一")
+    try:
+        return await asyncio.to_thread(
+            get_memory_profiler().diff, base_id, snapshot_id, group_by, limit, include)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@admin_router.delete("/profiling/memory")
+async def stop_memory_profiling() -> Dict:
+    """停止tracemalloc跟踪并丢弃全部快照"""
+    profiler = get_memory_profiler()
+    profiler.stop()
+    return profiler.status()
+
+
+@admin_router.post("/stocks/rebuild-index")
+async def rebuild_stock_index() -> Dict:
+    """从数据源获取全部A股列表，替换股票缓存并重建搜索快照
+
+    重建后名称和代码片段的搜索直接使用本地快照，各worker会自动重新打开新快照。
+
+    Returns:
+        Dict: 重建后的股票数
+    """
+    def rebuild() -> int:
+        import akshare as ak
+        stock_df = ak.stock_info_a_code_name()
+        stocks = [
+            {"code": row['code'], "name": row['name']}
+            for _, row in stock_df.iterrows()
+        ]
+        stock_cache = get_stock_cache()
+        stock_cache.update_stocks({'stocks': stocks})
+        return len(stock_cache.index) if stock_cache.index is not None else 0
+
+    try:
+        return {'stocks': await asyncio.to_thread(rebuild)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,77 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Dict, Optional
+from backend.api.services import get_news_crawler, get_sentiment_analyzer, get_job_queue
+from backend.api.routes import get_consumer_id
+from backend.utils.http_utils import check_webhook_url
+from backend.utils.config import Config
+
+job_router = APIRouter()
+
+
+class StockAnalysisJobRequest(BaseModel):
+    """股票分析任务请求"""
+    stock_code: str
+    days: int = Config.DEFAULT_DAYS
+    max_news: int = Config.MAX_NEWS_PER_STOCK
+    webhook_url: Optional[str] = None  # 任务完成后POST任务信息到该地址，只允许公网地址或允许列表中的主机
+
+
+@job_router.post("/stock-analysis")
+async def submit_stock_analysis(request: StockAnalysisJobRequest, http_request: Request):
+    """提交股票分析任务
+
+    分析结果已在缓存中时直接返回结果（job_id为null）；否则创建任务并立即返回任务ID（202），
+    之后通过GET /api/jobs/{job_id}轮询或webhook_url回调获取结果。
+    相同参数的任务在排队或执行期间重复提交返回同一个任务。
+
+    Returns:
+        Dict: 任务信息，包含job_id、status以及完成时的result
+    """
+    if request.webhook_url:
+        try:
+            await asyncio.to_thread(check_webhook_url, request.webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # 新闻和分析结果都命中缓存时不需要排队
+        # 缓存读取和任务表都是同步的磁盘I/O，在线程中执行，避免阻塞事件循环
+        news_list = await asyncio.to_thread(
+            get_news_crawler().get_cached_stock_news, request.stock_code, request.days)
+        if news_list:
+            cached_result = await asyncio.to_thread(
+                get_sentiment_analyzer().get_cached_analysis, news_list, request.stock_code)
+            if cached_result is not None:
+                return {
+                    'job_id': None,
+                    'status': 'succeeded',
+                    'stock_code': request.stock_code,
+                    'result': cached_result
+                }
+
+        job = await asyncio.to_thread(
+            get_job_queue().submit,
+            request.stock_code, request.days, request.max_news, request.webhook_url,
+            consumer=get_consumer_id(http_request))
+        return JSONResponse(status_code=202, content=job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@job_router.get("/{job_id}")
+async def get_job(job_id: str) -> Dict:
+    """获取任务状态和结果
+
+    Args:
+        job_id: 任务ID
+
+    Returns:
+        Dict: 任务信息，status为queued/running/succeeded/failed，成功时result为分析结果
+    """
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -1,21 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
-import akshare as ak
-from backend.core.news_crawler import NewsCrawler
-from backend.core.sentiment_analyzer import SentimentAnalyzer
-from backend.core.stock_cache import StockCache
+import json
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional
+from backend.api.services import (
+    get_news_crawler, get_sentiment_analyzer, get_stock_cache, get_sector_aggregator,
+    get_admission_controller, get_history_store
+)
+from backend.core.admission import Overloaded
 from backend.utils.config import Config
+from backend.utils.deadline import Deadline
 
 router = APIRouter()
-news_crawler = NewsCrawler()
-sentiment_analyzer = SentimentAnalyzer()
-stock_cache = StockCache()
+
+
+def get_consumer_id(request: Request) -> str:
+    """API调用方标识：请求头X-Consumer-Id，未提供时使用客户端IP"""
+    consumer = request.headers.get('X-Consumer-Id')
+    if consumer:
+        return consumer
+    return request.client.host if request.client else 'default'
+
+
+# 行业与指数聚合支持的加权方式，与SectorAggregator.WEIGHTINGS一致
+SECTOR_WEIGHTINGS = ('equal', 'market_cap')
+INDEX_WEIGHTINGS = ('equal', 'market_cap', 'index')
+# 分析模式，与sentiment_analyzer.ANALYSIS_MODES一致
+ANALYSIS_MODES = ('fast', 'deep', 'auto')
+
+
+def overloaded_response(error: Overloaded) -> HTTPException:
+    """过载时的503响应，Retry-After为按服务速率估算的等待秒数"""
+    return HTTPException(
+        status_code=503,
+        detail=f"服务繁忙，请稍后重试: {error}",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+async def degraded_analysis(news_list: List, stock_code: str, consumer: str) -> Dict:
+    """过载时的降级结果：该股票最近一次的大模型分析，没有时用本地打分器分析"""
+    analyzer = get_sentiment_analyzer()
+    analysis_result = analyzer.get_stale_analysis(news_list, stock_code)
+    if analysis_result is None:
+        analysis_result = await analyzer.analyze_sentiment(
+            news_list=news_list,
+            stock_code=stock_code,
+            priority='interactive',
+            consumer=consumer,
+            mode='fast'
+        )
+    return {**analysis_result, 'degraded': True}
+
+
+async def lookup_stock_info(stock_code: str) -> Dict:
+    """获取股票代码和名称，优先使用本地快照，快照中没有时在线程中查询数据源
+
+    Args:
+        stock_code: 股票代码
+
+    Returns:
+        Dict: 包含code和name
+
+    Raises:
+        IndexError: 股票不存在
+    """
+    stock_info = get_stock_cache().get_cached_stock(stock_code)
+    if stock_info is None:
+        def fetch_stock_info():
+            import akshare as ak
+            stock_df = ak.stock_info_a_code_name()
+            return stock_df[stock_df['code'] == stock_code].iloc[0]
+
+        stock_info = await asyncio.to_thread(fetch_stock_info)
+    return {
+        "code": stock_info['code'],
+        "name": stock_info['name']
+    }
 
 
 @router.get("/stocks/search")
 async def search_stocks(query: str) -> List[Dict]:
     """搜索股票
 
+    本地快照包含全部A股后，搜索都在本地完成；没有匹配时按编辑距离返回相近的代码或名称
+    （如600159返回600519，"贵洲茅台"返回贵州茅台），这些结果额外包含distance。
+
     Args:
         query: 股票名称或代码关键词
 
@@ -23,24 +94,27 @@ async def search_stocks(query: str) -> List[Dict]:
         List[Dict]: 股票列表，包含代码和名称
     """
     try:
+        stock_cache = get_stock_cache()
+
         # 使用缓存获取股票数据
         def fetch_stocks(q: str) -> Dict:
+            import akshare as ak
             # 使用akshare获取股票列表
             stock_df = ak.stock_info_a_code_name()
-            # 过滤匹配的股票
-            matched_stocks = stock_df[
-                stock_df['name'].str.contains(q) |
-                stock_df['code'].str.contains(q)
+            stocks = [
+                {"code": row['code'], "name": row['name']}
+                for _, row in stock_df.iterrows()
             ]
-            return {
-                'stocks': [
-                    {"code": row['code'], "name": row['name']}
-                    for _, row in matched_stocks.iterrows()
-                ]
-            }
-        
-        # 从缓存获取或重新获取股票数据
-        result = stock_cache.get_stocks(query, lambda q: fetch_stocks(q))
+            # 已经下载了全部A股，直接替换为完整快照，之后的搜索（包括输错的）都不再请求数据源
+            stock_cache.update_stocks({'stocks': stocks})
+            index = stock_cache.index
+            if index is None:
+                return {'stocks': [stock for stock in stocks
+                                   if q in stock['name'] or q in stock['code']]}
+            return {'stocks': index.search(q) or index.fuzzy_search(q)}
+
+        # 从缓存获取或重新获取股票数据；未命中时会下载股票列表并重建快照，在线程中执行以免阻塞事件循环
+        result = await asyncio.to_thread(stock_cache.get_stocks, query, fetch_stocks)
         return result['stocks']
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -49,15 +123,33 @@ async def search_stocks(query: str) -> List[Dict]:
 @router.get("/stock-analysis/{stock_code}")
 async def get_stock_analysis(
     stock_code: str,
+    request: Request,
     days: int = Config.DEFAULT_DAYS,
-    max_news: int = Config.MAX_NEWS_PER_STOCK
+    max_news: int = Config.MAX_NEWS_PER_STOCK,
+    mode: str = 'deep',
+    degrade: bool = False,
+    deadline: Optional[float] = None,
+    x_request_deadline: Optional[str] = Header(None)
 ) -> Dict:
     """获取股票新闻分析结果
 
+    需要调用大模型的冷分析受准入控制，过载时立即返回503和Retry-After，
+    命中缓存的请求以及fast、auto模式不受限制。
+    请求有截止时间：抓取新闻超时返回504；大模型分析来不及完成时返回同时开始的本地打分器结果，
+    大模型分析在后台继续并写入缓存。
+
     Args:
         stock_code: 股票代码
         days: 获取最近几天的新闻，默认7天
         max_news: 最大新闻条数，默认20条
+        mode: 分析模式
+            - deep: 大模型分析（默认），耗时10-40秒
+            - fast: 本地打分器分析，毫秒级返回，已有大模型分析缓存时直接返回缓存
+            - auto: 同fast，并在后台补做大模型分析，之后的请求得到大模型结果
+        degrade: 过载时不返回503，而是返回该股票最近一次的大模型分析或本地打分器结果，
+            结果中degraded为True
+        deadline: 时间预算（秒），也可用请求头X-Request-Deadline指定，
+            默认Config.REQUEST_DEADLINE_SECONDS
 
     Returns:
         Dict: 分析结果，包含:
@@ -69,32 +161,75 @@ async def get_stock_analysis(
             - impact_analysis: 影响力分析
             - risk_analysis: 风险分析
             - news_analysis: 新闻列表
+            - analysis_mode: 结果来源，deep为大模型分析，fast为本地打分器
+            - degraded: 仅在过载降级时出现
+            - deadline_exceeded: 仅在大模型分析未能在截止时间内完成、返回本地结果时出现
     """
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode必须是{', '.join(ANALYSIS_MODES)}之一")
+    try:
+        request_deadline = Deadline.from_request(deadline, x_request_deadline)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        # 获取股票信息
-        stock_df = ak.stock_info_a_code_name()
-        stock_info = stock_df[stock_df['code'] == stock_code].iloc[0]
+        # 获取股票信息，优先使用本地快照
+        stock_info = await lookup_stock_info(stock_code)
 
-        # 获取新闻
-        news_list = news_crawler.get_stock_news(
-            stock_code=stock_code,
-            days=days,
-            max_news=max_news
-        )
+        # 获取新闻，超过截止时间时抓取在线程中继续完成并写入缓存
+        try:
+            news_list = await asyncio.wait_for(
+                asyncio.to_thread(
+                    get_news_crawler().get_stock_news,
+                    stock_code=stock_code,
+                    days=days,
+                    max_news=max_news
+                ),
+                request_deadline.remaining()
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="获取新闻超时，请稍后重试")
 
-        # 分析情感
-        analysis_result = await sentiment_analyzer.analyze_sentiment(
-            news_list=news_list
-        )
+        # 分析情感，命中缓存时不经过准入控制
+        analyzer = get_sentiment_analyzer()
+        consumer = get_consumer_id(request)
+        analysis_result = None
+        if mode == 'deep' and news_list:
+            analysis_result = analyzer.get_cached_analysis(news_list, stock_code)
+        if analysis_result is None and mode == 'deep' and news_list:
+            async def admitted_analysis() -> Dict:
+                # 名额随大模型分析一起持有，超过截止时间后在后台继续时同样计入在途数
+                async with get_admission_controller().admit():
+                    return await analyzer.analyze_sentiment(
+                        news_list=news_list,
+                        stock_code=stock_code,
+                        priority='interactive',
+                        consumer=consumer,
+                        mode=mode
+                    )
+
+            try:
+                analysis_result = await analyzer.analyze_within_deadline(
+                    admitted_analysis(), news_list, stock_code, request_deadline)
+            except Overloaded as e:
+                if not degrade:
+                    raise overloaded_response(e)
+                analysis_result = await degraded_analysis(news_list, stock_code, consumer)
+        elif analysis_result is None:
+            analysis_result = await analyzer.analyze_sentiment(
+                news_list=news_list,
+                stock_code=stock_code,
+                priority='interactive',
+                consumer=consumer,
+                mode=mode
+            )
 
         return {
-            "stock_info": {
-                "code": stock_info['code'],
-                "name": stock_info['name']
-            },
+            "stock_info": stock_info,
             **analysis_result
         }
 
+    except HTTPException:
+        raise
     except IndexError:
         raise HTTPException(
             status_code=404,
@@ -102,3 +237,277 @@ async def get_stock_analysis(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stock-analysis/{stock_code}/stream")
+async def stream_stock_analysis(
+    stock_code: str,
+    request: Request,
+    days: int = Config.DEFAULT_DAYS,
+    max_news: int = Config.MAX_NEWS_PER_STOCK,
+    degrade: bool = False,
+    deadline: Optional[float] = None,
+    x_request_deadline: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """流式获取股票新闻分析结果
+
+    以NDJSON格式逐行返回事件，客户端可以在大模型生成完整结果之前先展示已完成的维度：
+        - {"type": "stock_info", "data": 股票信息}
+        - {"type": "section", "key": 维度名, "data": 该维度的分析结果}
+        - {"type": "result", "data": 与/stock-analysis相同的完整结果}，最后一行
+
+    与/stock-analysis相同，冷分析受准入控制，过载时返回503和Retry-After；
+    请求有截止时间，抓取新闻超时返回504，大模型分析来不及完成时以本地打分器的结果作为result
+    （deadline_exceeded为True），大模型分析在后台继续并写入缓存。
+
+    Args:
+        stock_code: 股票代码
+        days: 获取最近几天的新闻，默认7天
+        max_news: 最大新闻条数，默认20条
+        degrade: 过载时不返回503，只推送stock_info和降级的result
+        deadline: 时间预算（秒），也可用请求头X-Request-Deadline指定，
+            默认Config.REQUEST_DEADLINE_SECONDS
+    """
+    try:
+        request_deadline = Deadline.from_request(deadline, x_request_deadline)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # 获取股票信息，优先使用本地快照
+        stock_info = await lookup_stock_info(stock_code)
+
+        # 获取新闻，超过截止时间时抓取在线程中继续完成并写入缓存
+        try:
+            news_list = await asyncio.wait_for(
+                asyncio.to_thread(
+                    get_news_crawler().get_stock_news,
+                    stock_code=stock_code,
+                    days=days,
+                    max_news=max_news
+                ),
+                request_deadline.remaining()
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="获取新闻超时，请稍后重试")
+    except HTTPException:
+        raise
+    except IndexError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Stock with code {stock_code} not found"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    consumer = get_consumer_id(request)
+    analyzer = get_sentiment_analyzer()
+    # 在开始响应之前取得冷分析名额，过载时才能返回503
+    admission = get_admission_controller()
+    admitted_at = None
+    degraded = False
+    if news_list and analyzer.get_cached_analysis(news_list, stock_code) is None:
+        try:
+            admitted_at = await admission.acquire()
+        except Overloaded as e:
+            if not degrade:
+                raise overloaded_response(e)
+            degraded = True
+
+    # 名额随大模型分析一起持有，超过截止时间后在后台继续时同样计入在途数
+    analysis_handed_off = False
+
+    async def analysis_events():
+        try:
+            async for event in analyzer.stream_sentiment(
+                    news_list=news_list, stock_code=stock_code,
+                    priority='interactive', consumer=consumer):
+                yield event
+        finally:
+            if admitted_at is not None:
+                admission.release(admitted_at)
+
+    async def event_stream():
+        nonlocal analysis_handed_off
+        try:
+            yield json.dumps({"type": "stock_info", "data": stock_info},
+                             ensure_ascii=False) + "\n"
+            if degraded:
+                result = await degraded_analysis(news_list, stock_code, consumer)
+                yield json.dumps({"type": "result",
+                                  "data": {"stock_info": stock_info, **result}},
+                                 ensure_ascii=False) + "\n"
+                return
+            # 交给stream_within_deadline后由analysis_events归还名额
+            analysis_handed_off = True
+            async for event in analyzer.stream_within_deadline(
+                    analysis_events(), news_list, stock_code, request_deadline):
+                if event['type'] == 'result':
+                    event = {"type": "result",
+                             "data": {"stock_info": stock_info, **event['data']}}
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            if not analysis_handed_off and admitted_at is not None:
+                # 客户端在分析开始之前断开
+                admission.release(admitted_at)
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/stocks/{stock_code}/sentiment-history")
+async def get_sentiment_history(
+    stock_code: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    windows: str = "1,3,7,30"
+) -> Dict:
+    """获取股票的情感历史
+
+    Args:
+        stock_code: 股票代码
+        start_date: 开始日期（YYYY-MM-DD），默认为结束日期前30天
+        end_date: 结束日期（YYYY-MM-DD），默认为今天
+        windows: 滚动聚合窗口天数，逗号分隔，每个不超过Config.SENTIMENT_HISTORY_MAX_WINDOW
+
+    Returns:
+        Dict: 情感历史，包含:
+            - daily: 每日情感得分及新闻数
+            - runs: 每个分析日的整体得分、置信度和主题得分
+            - rolling: 以结束日期为终点的各窗口聚合
+    """
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.now()
+        start = (datetime.strptime(start_date, '%Y-%m-%d') if start_date
+                 else end - timedelta(days=30))
+        window_days = [int(w) for w in windows.split(',') if w.strip()]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"参数格式错误: {e}")
+    if start > end:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    if any(w <= 0 or w > Config.SENTIMENT_HISTORY_MAX_WINDOW for w in window_days):
+        raise HTTPException(
+            status_code=400,
+            detail=f"窗口天数必须为1到{Config.SENTIMENT_HISTORY_MAX_WINDOW}之间的整数")
+
+    try:
+        return await asyncio.to_thread(
+            get_history_store().query,
+            stock_code,
+            start.strftime('%Y-%m-%d'),
+            end.strftime('%Y-%m-%d'),
+            window_days
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/news/search")
+async def search_news(
+    q: str,
+    codes: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = 20
+) -> List[Dict]:
+    """在全部已缓存的新闻中全文检索
+
+    Args:
+        q: 查询词，空格分隔的多个词须同时出现
+        codes: 只检索这些股票的新闻，逗号分隔
+        since: 只检索该日期（YYYY-MM-DD）及之后发布的新闻
+        limit: 最多返回的条数
+
+    Returns:
+        List[Dict]: 按相关度排序的新闻，包含股票代码、标题、来源、链接、发布时间和得分
+    """
+    if since:
+        try:
+            since = datetime.strptime(since, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"参数格式错误: {e}")
+    if not 0 < limit <= Config.NEWS_SEARCH_MAX_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit必须在1到{Config.NEWS_SEARCH_MAX_LIMIT}之间"
+        )
+    stock_codes = [code.strip() for code in codes.split(',') if code.strip()] if codes else None
+
+    try:
+        return await asyncio.to_thread(
+            get_news_crawler().search_index.search, q, stock_codes, since, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sectors")
+async def list_sectors() -> List[str]:
+    """获取行业板块名称列表"""
+    try:
+        return await asyncio.to_thread(get_sector_aggregator().membership.get_industries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sectors/{sector_name}/sentiment")
+async def get_sector_sentiment(
+    sector_name: str,
+    weighting: str = "equal",
+    refresh: bool = False
+) -> Dict:
+    """获取行业板块情感
+
+    基于各成分股有效期内已有的分析结果加权聚合，不会为聚合本身调用大模型。
+
+    Args:
+        sector_name: 行业板块名称，如"半导体"
+        weighting: 加权方式，equal（等权）或market_cap（市值加权）
+        refresh: 是否在后台为结果过期或缺失的成分股补做分析
+
+    Returns:
+        Dict: 聚合结果，包含:
+            - score/label: 加权情感得分及标签
+            - dispersion: 成分股得分的加权标准差
+            - coverage: 有有效结果的成分股所占权重
+            - topic_scores: 各主题的加权得分
+            - top_constituents/bottom_constituents: 得分最高/最低的成分股
+            - stale_codes: 结果过期或缺失的成分股
+            - refreshing: 本次在后台补做分析的成分股
+    """
+    if weighting not in SECTOR_WEIGHTINGS:
+        raise HTTPException(status_code=400, detail=f"不支持的加权方式: {weighting}")
+    sector_aggregator = get_sector_aggregator()
+    try:
+        result = await asyncio.to_thread(
+            sector_aggregator.aggregate_industry, sector_name, weighting)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    result['refreshing'] = (
+        sector_aggregator.schedule_refresh(result['stale_codes']) if refresh else [])
+    return result
+
+
+@router.get("/indexes/{index_code}/sentiment")
+async def get_index_sentiment(
+    index_code: str,
+    weighting: str = "index",
+    refresh: bool = False
+) -> Dict:
+    """获取指数情感
+
+    Args:
+        index_code: 指数代码，如000300（沪深300）
+        weighting: 加权方式，index（指数权重）、equal（等权）或market_cap（市值加权）
+        refresh: 是否在后台为结果过期或缺失的成分股补做分析
+
+    Returns:
+        Dict: 聚合结果，字段同行业板块情感
+    """
+    if weighting not in INDEX_WEIGHTINGS:
+        raise HTTPException(status_code=400, detail=f"不支持的加权方式: {weighting}")
+    sector_aggregator = get_sector_aggregator()
+    try:
+        result = await asyncio.to_thread(
+            sector_aggregator.aggregate_index, index_code, weighting)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    result['refreshing'] = (
+        sector_aggregator.schedule_refresh(result['stale_codes']) if refresh else [])
+    return result
@@ -0,0 +1,113 @@
+import threading
+from typing import Dict
+
+# 各服务在第一次使用时才导入并构造，导入路由模块不会加载akshare、pandas、
+# 大模型SDK，也不会读取股票缓存文件，worker可以很快开始接受请求
+_instances: Dict[str, object] = {}
+_lock = threading.RLock()
+
+
+def _get_or_create(name: str, factory):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def is_created(name: str) -> bool:
+    """服务是否已经构造"""
+    return name in _instances
+
+
+def get_news_crawler():
+    """获取新闻爬虫单例"""
+    def create():
+        from backend.core.news_crawler import NewsCrawler
+        return NewsCrawler(get_stock_cache())
+    return _get_or_create('news_crawler', create)
+
+
+def get_history_store():
+    """获取情感历史存储单例，只读查询不需要构造情感分析器（也不需要大模型API密钥）"""
+    def create():
+        from backend.core.sentiment_history import SentimentHistoryStore
+        return SentimentHistoryStore()
+    return _get_or_create('history_store', create)
+
+
+def get_sentiment_analyzer():
+    """获取情感分析器单例"""
+    def create():
+        from backend.core.sentiment_analyzer import SentimentAnalyzer
+        return SentimentAnalyzer(history_store=get_history_store())
+    return _get_or_create('sentiment_analyzer', create)
+
+
+def get_stock_cache():
+    """获取股票缓存单例"""
+    def create():
+        from backend.core.stock_cache import StockCache
+        return StockCache()
+    return _get_or_create('stock_cache', create)
+
+
+def get_cache_manager():
+    """获取缓存管理器单例"""
+    def create():
+        from backend.core.cache_manager import CacheManager
+        return CacheManager(get_news_crawler(), get_sentiment_analyzer())
+    return _get_or_create('cache_manager', create)
+
+
+def get_job_queue():
+    """获取异步分析任务队列单例"""
+    def create():
+        from backend.core.job_queue import AnalysisJobQueue
+        return AnalysisJobQueue(get_news_crawler(), get_sentiment_analyzer())
+    return _get_or_create('job_queue', create)
+
+
+def get_sector_aggregator():
+    """获取行业与指数情感聚合服务单例"""
+    def create():
+        from backend.core.sector_aggregator import SectorAggregator
+        return SectorAggregator(get_news_crawler(), get_sentiment_analyzer(),
+                                get_history_store())
+    return _get_or_create('sector_aggregator', create)
+
+
+def get_watchlist_hub():
+    """获取自选股订阅中心单例"""
+    def create():
+        from backend.core.watchlist_hub import WatchlistHub
+        return WatchlistHub(get_news_crawler(), get_sentiment_analyzer())
+    return _get_or_create('watchlist_hub', create)
+
+
+def get_admission_controller():
+    """获取分析接口准入控制单例"""
+    def create():
+        from backend.core.admission import AdmissionController
+        return AdmissionController()
+    return _get_or_create('admission_controller', create)
+
+
+def get_request_profiler():
+    """获取请求CPU分析器单例"""
+    def create():
+        from backend.utils.profiling import RequestProfiler
+        return RequestProfiler()
+    return _get_or_create('request_profiler', create)
+
+
+def get_memory_profiler():
+    """获取内存快照分析器单例"""
+    def create():
+        from backend.utils.config import Config
+        from backend.utils.profiling import MemoryProfiler
+        return MemoryProfiler(Config.TRACEMALLOC_MAX_SNAPSHOTS, Config.TRACEMALLOC_FRAMES)
+    return _get_or_create('memory_profiler', create)
@@ -0,0 +1,62 @@
+import json
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from backend.api.services import get_watchlist_hub
+
+watchlist_router = APIRouter()
+
+
+async def _send_messages(websocket: WebSocket, subscriber):
+    """把订阅中心推送的消息发送给客户端，积压过多时以1013关闭连接"""
+    while True:
+        message = await subscriber.queue.get()
+        if message is None:
+            await websocket.close(code=1013)
+            return
+        await websocket.send_json(message)
+
+
+@watchlist_router.websocket("/ws")
+async def watchlist_socket(websocket: WebSocket):
+    """自选股订阅
+
+    客户端发送：
+        - {"action": "subscribe", "codes": ["600519", ...]}
+        - {"action": "unsubscribe", "codes": [...]}
+    服务端推送：
+        - {"type": "subscribed", "codes": 当前订阅的全部股票}
+        - {"type": "snapshot", "stock_code", "news", "sentiment"}: 订阅后的当前状态
+        - {"type": "news", "stock_code", "data": 新增的新闻}
+        - {"type": "sentiment", "stock_code", "data": 情感摘要}，得分变化超过阈值时推送
+        - {"type": "error", "detail": 错误信息}
+    """
+    await websocket.accept()
+    hub = await asyncio.to_thread(get_watchlist_hub)
+    subscriber = hub.connect()
+    sender = asyncio.create_task(_send_messages(websocket, subscriber))
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                if not isinstance(message, dict):
+                    raise ValueError("消息必须是JSON对象")
+                action = message.get('action')
+                codes = message.get('codes', [])
+                if not isinstance(codes, list) or not all(
+                        isinstance(code, str) and code.isdigit() and len(code) == 6
+                        for code in codes):
+                    raise ValueError("codes必须是6位股票代码列表")
+                if action == 'subscribe':
+                    hub.subscribe(subscriber, codes)
+                elif action == 'unsubscribe':
+                    hub.unsubscribe(subscriber, codes)
+                else:
+                    raise ValueError("action必须是subscribe或unsubscribe")
+            except ValueError as e:
+                # 包括json.JSONDecodeError
+                subscriber.send({'type': 'error', 'detail': str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.disconnect(subscriber)
@@ -0,0 +1,157 @@
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+from backend.utils.config import Config
+
+
+class Overloaded(Exception):
+    """在途分析和等待队列都已满，或排队超时，请求被拒绝"""
+
+    def __init__(self, retry_after: int, reason: str):
+        """初始化
+
+        Args:
+            retry_after: 建议客户端重试前等待的秒数
+            reason: 拒绝原因
+        """
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """分析接口的准入控制（每个worker进程一个）
+
+    只限制需要调用大模型的冷分析，命中缓存的请求不经过这里。
+    同时进行的冷分析不超过max_in_flight个，超出的按先来后到排队，队列不超过max_queue个；
+    队列已满或排队超过queue_timeout秒的请求立即被拒绝，而不是让它们在大模型后面排队到
+    客户端超时。拒绝时按观测到的平均服务时间估算Retry-After。
+    """
+
+    def __init__(self, max_in_flight: int = Config.ADMISSION_MAX_IN_FLIGHT,
+                 max_queue: int = Config.ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = Config.ADMISSION_QUEUE_TIMEOUT):
+        """初始化准入控制
+
+        Args:
+            max_in_flight: 同时进行的冷分析上限
+            max_queue: 等待队列长度上限
+            queue_timeout: 排队的最长时间（秒）
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # 最近完成的冷分析耗时（秒），用于估算服务速率
+        self.durations = deque(maxlen=100)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def service_seconds(self) -> float:
+        """最近冷分析的平均耗时，还没有观测时使用Config.ADMISSION_DEFAULT_SERVICE_SECONDS"""
+        if not self.durations:
+            return Config.ADMISSION_DEFAULT_SERVICE_SECONDS
+        return sum(self.durations) / len(self.durations)
+
+    def retry_after(self) -> int:
+        """按服务速率（max_in_flight / 平均耗时）估算排在队尾的请求还需等待的秒数"""
+        seconds = self.service_seconds() * (self.queued + 1) / self.max_in_flight
+        return max(1, min(Config.ADMISSION_MAX_RETRY_AFTER, math.ceil(seconds)))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        raise Overloaded(self.retry_after(), reason)
+
+    async def acquire(self) -> float:
+        """等待一个冷分析名额
+
+        Returns:
+            float: 获得名额的时间（time.monotonic()），归还时传给release
+
+        Raises:
+            Overloaded: 队列已满或排队超时
+        """
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return time.monotonic()
+        if self.queued >= self.max_queue:
+            self._reject(f"分析请求过多，排队已达{self.max_queue}个")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # 超时的同时刚好分配到名额，直接使用
+                self.admitted += 1
+                return time.monotonic()
+            waiter.cancel()
+            self.timed_out += 1
+            self._reject(f"排队超过{self.queue_timeout}秒")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经分配到名额后才被取消，归还名额
+                self.in_flight -= 1
+                self._dispatch()
+            else:
+                waiter.cancel()
+            raise
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started_at: float):
+        """归还名额并记录本次冷分析的耗时
+
+        Args:
+            started_at: acquire返回的时间
+        """
+        self.durations.append(time.monotonic() - started_at)
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """把空闲名额按先来后到分配给等待者，跳过已取消的"""
+        while self._waiters and self.in_flight < self.max_in_flight:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self):
+        """占用一个冷分析名额的上下文管理器
+
+        用法:
+            async with admission.admit():
+                ...
+        """
+        started_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started_at)
+
+    def metrics(self) -> Dict:
+        """在途数、排队数、拒绝数和估算的服务时间"""
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'service_seconds': round(self.service_seconds(), 2),
+            'retry_after': self.retry_after()
+        }
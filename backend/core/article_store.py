@@ -0,0 +1,150 @@
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord
+
+
+class ArticleStore:
+    """按内容寻址的新闻正文存储（SQLite，zlib压缩）
+
+    同一篇新闻（行业政策、指数调整等）常出现在多只股票的新闻缓存中，正文只按
+    NewsRecord.digest保存一份，各股票的新闻缓存只保存摘要列表。
+    进程内按摘要保留已解析的NewsRecord，提到同一篇新闻的所有股票共享同一个对象，
+    发布时间、来源类别等字段以及按摘要缓存的单篇分析结果只计算一次。
+    数据库使用WAL模式，多个worker可以同时读写。
+    """
+
+    def __init__(self, db_path: Path = None,
+                 max_records: int = Config.ARTICLE_RECORD_CACHE_SIZE):
+        """初始化新闻正文存储
+
+        Args:
+            db_path: 数据库文件路径，默认Config.ARTICLE_STORE_DB
+            max_records: 进程内保留的已解析新闻条数
+        """
+        self.db_path = Path(db_path or Config.ARTICLE_STORE_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_records = max_records
+        self._records: 'OrderedDict[str, NewsRecord]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_schema(self):
+        """创建表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+CREATE TABLE IF NOT EXISTS articles (
+    digest TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    last_seen REAL NOT NULL
+)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_last_seen "
+                         "ON articles (last_seen)")
+
+    def _remember(self, news: NewsRecord) -> NewsRecord:
+        """放入进程内的已解析新闻，已有同一摘要的对象时返回已有对象"""
+        with self._lock:
+            existing = self._records.get(news.digest)
+            if existing is not None:
+                self._records.move_to_end(news.digest)
+                return existing
+            self._records[news.digest] = news
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+            return news
+
+    def put_many(self, news_list: Iterable[NewsRecord]) -> List[NewsRecord]:
+        """保存新闻正文，已保存的只更新最近引用时间
+
+        Args:
+            news_list: 新闻列表
+
+        Returns:
+            List[NewsRecord]: 与输入一一对应的新闻，已在进程内的替换为共享的对象
+        """
+        news_list = [self._remember(news) for news in news_list]
+        now = time.time()
+        rows = []
+        for news in news_list:
+            raw = json.dumps(news.to_dict(), ensure_ascii=False).encode('utf-8')
+            rows.append((news.digest, zlib.compress(raw), len(raw), now))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO articles (digest, body, raw_bytes, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (digest) DO UPDATE SET last_seen = excluded.last_seen",
+                rows
+            )
+        return news_list
+
+    def get_many(self, digests: List[str]) -> Dict[str, NewsRecord]:
+        """按摘要读取新闻
+
+        Args:
+            digests: 新闻摘要列表
+
+        Returns:
+            Dict[str, NewsRecord]: 摘要到新闻的映射，不存在的摘要不在结果中
+        """
+        found = {}
+        with self._lock:
+            for digest in digests:
+                news = self._records.get(digest)
+                if news is not None:
+                    self._records.move_to_end(digest)
+                    found[digest] = news
+        missing = [digest for digest in digests if digest not in found]
+        if not missing:
+            return found
+
+        with self._connect() as conn:
+            # 分批查询，避免超过SQLite的参数个数上限
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT digest, body FROM articles "
+                    f"WHERE digest IN ({', '.join(['?'] * len(batch))})",
+                    batch
+                ).fetchall()
+                for digest, body in rows:
+                    news = NewsRecord.from_dict(json.loads(zlib.decompress(body)))
+                    found[digest] = self._remember(news)
+        return found
+
+    def prune(self, max_age_days: float) -> int:
+        """删除超过max_age_days没有被任何新闻缓存引用的正文
+
+        Args:
+            max_age_days: 最近一次被引用距今的最长天数
+
+        Returns:
+            int: 删除的条数
+        """
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM articles WHERE last_seen < ?",
+                                  (time.time() - max_age_days * 86400,))
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """统计保存的新闻条数、压缩前后的字节数以及进程内的已解析新闻数"""
+        with self._connect() as conn:
+            count, raw_bytes, stored_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), "
+                "COALESCE(SUM(LENGTH(body)), 0) FROM articles"
+            ).fetchone()
+        return {
+            'entries': count,
+            'raw_bytes': raw_bytes,
+            'stored_bytes': stored_bytes,
+            'records_in_memory': len(self._records)
+        }
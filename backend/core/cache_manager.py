@@ -0,0 +1,263 @@
+import os
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from backend.utils.config import Config
+from backend.utils.file_utils import get_lock_path, FileLock
+from backend.utils.memory_cache import MemoryCache
+from backend.utils.cache_stats import CacheStats
+
+
+class CacheRetention:
+    """单个磁盘缓存目录的保留策略
+
+    清理顺序：
+    1. 把内存中记录的访问时间回写到缓存文件的atime（保持mtime不变）
+    2. 删除超过max_age_days的条目（按mtime，即写入时间）
+    3. 条目数或总字节数超出上限时，按atime从旧到新淘汰（LRU）
+    4. 清理残留的临时文件和不再使用的锁文件
+    """
+
+    def __init__(self, name: str, cache_dir: Path, memory_cache: MemoryCache,
+                 cache_stats: CacheStats, policy: Dict):
+        """初始化保留策略
+
+        Args:
+            name: 缓存名称
+            cache_dir: 缓存目录
+            memory_cache: 该缓存对应的内存层
+            cache_stats: 该缓存的命中统计
+            policy: 保留策略，包含max_age_days、max_entries、max_bytes
+        """
+        self.name = name
+        self.cache_dir = Path(cache_dir)
+        self.memory_cache = memory_cache
+        self.cache_stats = cache_stats
+        self.max_age_seconds = policy['max_age_days'] * 86400
+        self.max_entries = policy['max_entries']
+        self.max_bytes = policy['max_bytes']
+        self.last_sweep: Optional[Dict] = None
+
+    def _scan(self) -> List[os.DirEntry]:
+        """列出目录中的缓存文件"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [entry for entry in it
+                        if entry.is_file() and entry.name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+
+    def _flush_accesses(self):
+        """把访问记录回写到文件atime，使LRU淘汰同时反映内存层的命中"""
+        for key, accessed_at in self.cache_stats.drain_accesses().items():
+            path = self.cache_dir / f"{key}.json"
+            try:
+                stat = os.stat(path)
+                # 保持mtime_ns不变，内存层依赖mtime判断文件是否被重写
+                os.utime(path, ns=(int(accessed_at * 1e9), stat.st_mtime_ns))
+            except OSError:
+                continue
+
+    def _delete(self, path: Path) -> bool:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        self.memory_cache.invalidate(path.stem)
+        return True
+
+    def _cleanup_auxiliary_files(self, now: float):
+        """清理写入中断留下的临时文件，以及对应缓存已不存在的锁文件"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if (entry.name.endswith('.tmp') and
+                            now - entry.stat().st_mtime > 3600):
+                        try:
+                            os.unlink(entry.path)
+                        except OSError:
+                            pass
+        except FileNotFoundError:
+            return
+
+        lock_dir = self.cache_dir / '.locks'
+        try:
+            with os.scandir(lock_dir) as it:
+                lock_entries = list(it)
+        except FileNotFoundError:
+            return
+        for entry in lock_entries:
+            key = entry.name[:-len('.lock')]
+            if (self.cache_dir / f"{key}.json").exists():
+                continue
+            # 只删除当前无人持有的锁；删除后仍在等待旧文件的进程获取锁时
+            # 会发现文件已不在路径上并重新打开（见FileLock._is_current）
+            lock = FileLock(Path(entry.path), timeout=0)
+            if lock.acquire():
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+                finally:
+                    lock.release()
+
+    def sweep(self) -> Dict:
+        """执行一次清理
+
+        Returns:
+            Dict: 清理结果统计
+        """
+        started = time.time()
+        self._flush_accesses()
+
+        expired = 0
+        files = []
+        for entry in self._scan():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if started - stat.st_mtime > self.max_age_seconds:
+                if self._delete(Path(entry.path)):
+                    expired += 1
+                continue
+            files.append((stat.st_atime, stat.st_size, Path(entry.path)))
+
+        total_bytes = sum(size for _, size, _ in files)
+        evicted = 0
+        if len(files) > self.max_entries or total_bytes > self.max_bytes:
+            files.sort(key=lambda item: item[0])
+            remaining = len(files)
+            for _, size, path in files:
+                if remaining <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                if self._delete(path):
+                    evicted += 1
+                remaining -= 1
+                total_bytes -= size
+
+        self._cleanup_auxiliary_files(started)
+
+        self.last_sweep = {
+            'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_ms': round((time.time() - started) * 1000, 1),
+            'expired': expired,
+            'evicted': evicted
+        }
+        if expired or evicted:
+            print(f"缓存清理[{self.name}]：过期删除{expired}个，淘汰{evicted}个")
+        return self.last_sweep
+
+    def purge(self, pattern: str) -> int:
+        """删除匹配通配符的缓存文件
+
+        Args:
+            pattern: 文件名通配符，如 "600519_*.json"
+
+        Returns:
+            int: 删除的文件数
+        """
+        return sum(1 for path in self.cache_dir.glob(pattern) if self._delete(path))
+
+    def stats(self) -> Dict:
+        """统计缓存目录的条目数、字节数以及命中率"""
+        entries = 0
+        total_bytes = 0
+        for entry in self._scan():
+            try:
+                total_bytes += entry.stat().st_size
+                entries += 1
+            except FileNotFoundError:
+                continue
+        return {
+            'entries': entries,
+            'bytes': total_bytes,
+            'policy': {
+                'max_age_days': self.max_age_seconds / 86400,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            },
+            **self.cache_stats.to_dict(),
+            'memory': self.memory_cache.stats(),
+            'last_sweep': self.last_sweep
+        }
+
+
+class CacheManager:
+    """磁盘缓存管理器：后台定期清理、统计以及按股票清除"""
+
+    def __init__(self, news_crawler, sentiment_analyzer):
+        """初始化缓存管理器
+
+        Args:
+            news_crawler: 新闻爬虫实例
+            sentiment_analyzer: 情感分析器实例
+        """
+        self.news = CacheRetention(
+            'news', news_crawler.cache_dir, news_crawler.memory_cache,
+            news_crawler.cache_stats, Config.CACHE_RETENTION['news'])
+        self.sentiment = CacheRetention(
+            'sentiment', sentiment_analyzer.cache_dir, sentiment_analyzer.memory_cache,
+            sentiment_analyzer.cache_stats, Config.CACHE_RETENTION['sentiment'])
+        self.article_store = news_crawler.article_store
+        self._sweep_lock = threading.Lock()
+
+    def sweep(self) -> Dict:
+        """清理所有缓存
+
+        多个worker中同一时间只有一个执行清理，其他worker直接跳过。
+        """
+        if not self._sweep_lock.acquire(blocking=False):
+            return {'skipped': True}
+        try:
+            lock = FileLock(get_lock_path(Config.NEWS_CACHE_DIR.parent, 'cache_sweeper'),
+                            timeout=0)
+            if not lock.acquire():
+                return {'skipped': True}
+            try:
+                result = {
+                    'news': self.news.sweep(),
+                    'sentiment': self.sentiment.sweep()
+                }
+                # 新闻缓存最长保留max_age_days，正文多保留一天后不会再被任何缓存引用
+                result['articles'] = {'deleted': self.article_store.prune(
+                    Config.CACHE_RETENTION['news']['max_age_days'] + 1)}
+                return result
+            finally:
+                lock.release()
+        finally:
+            self._sweep_lock.release()
+
+    async def run_sweeper(self, interval: float = Config.CACHE_SWEEP_INTERVAL_SECONDS):
+        """后台定期清理任务，在线程中执行文件操作以免阻塞事件循环"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"缓存清理出错: {e}")
+            await asyncio.sleep(interval)
+
+    def purge_stock(self, stock_code: str) -> Dict:
+        """删除指定股票的新闻缓存和情感分析缓存
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            Dict: 各缓存删除的条目数
+        """
+        self.sentiment.memory_cache.invalidate_prefix(f"{stock_code}_")
+        return {
+            'news': self.news.purge(f"{stock_code}.json"),
+            'sentiment': self.sentiment.purge(f"{stock_code}_*.json")
+        }
+
+    def stats(self) -> Dict:
+        """获取所有缓存的统计信息"""
+        return {
+            'news': self.news.stats(),
+            'sentiment': self.sentiment.stats(),
+            'articles': self.article_store.stats()
+        }
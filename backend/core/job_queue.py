@@ -0,0 +1,362 @@
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+from backend.utils.config import Config
+from backend.utils.http_utils import check_webhook_url, pin_webhook_request
+
+
+class AnalysisJobQueue:
+    """股票分析异步任务队列
+
+    任务保存在SQLite中（WAL模式），服务重启或worker进程退出后未完成的任务会被重新执行，
+    多个worker进程共享同一个任务表，任意进程都可以查询任务状态。
+    相同(股票代码, 天数, 新闻数)的任务在排队或执行期间只保留一个。
+    执行中的任务定期续期（heartbeat_at），超过Config.JOB_RUNNING_TIMEOUT没有续期才会被重新领取；
+    领取次数（attempts）作为执行权的凭证，被重新领取后原执行者的结果不再写入，也不再回调。
+
+    任务状态: queued -> running -> succeeded / failed
+    """
+
+    def __init__(self, news_crawler, sentiment_analyzer, db_path: Path = None):
+        """初始化任务队列
+
+        Args:
+            news_crawler: 新闻爬虫实例
+            sentiment_analyzer: 情感分析器实例
+            db_path: 数据库文件路径，默认Config.JOB_DB
+        """
+        self.news_crawler = news_crawler
+        self.sentiment_analyzer = sentiment_analyzer
+        self.db_path = Path(db_path or Config.JOB_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: set = set()
+        self._last_cleanup = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        """创建表和索引"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    dedup_key TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    days INTEGER NOT NULL,
+    max_news INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    consumer TEXT NOT NULL DEFAULT 'default',
+    heartbeat_at REAL
+)""")
+            # 早期版本的任务表没有consumer和heartbeat_at列
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'consumer' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN consumer TEXT NOT NULL DEFAULT 'default'")
+            if 'heartbeat_at' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("""
+CREATE TABLE IF NOT EXISTS job_webhooks (
+    job_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (job_id, url)
+)""")
+            # 同一参数同一时间只能有一个排队或执行中的任务，多进程并发提交时由数据库保证去重
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_dedup "
+                         "ON jobs (dedup_key) WHERE status IN ('queued', 'running')")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created "
+                         "ON jobs (status, created_at)")
+
+    @staticmethod
+    def _dedup_key(stock_code: str, days: int, max_news: int) -> str:
+        return f"{stock_code}:{days}:{max_news}"
+
+    def submit(self, stock_code: str, days: int, max_news: int,
+               webhook_url: Optional[str] = None, consumer: str = 'default') -> Dict:
+        """提交分析任务，已有相同参数的任务在排队或执行时直接返回该任务
+
+        Args:
+            stock_code: 股票代码
+            days: 获取最近几天的新闻
+            max_news: 最大新闻条数
+            webhook_url: 任务完成后回调的地址
+            consumer: 提交任务的调用方，执行时按调用方公平排队
+
+        Returns:
+            Dict: 任务信息
+        """
+        dedup_key = self._dedup_key(stock_code, days, max_news)
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (id, dedup_key, stock_code, days, max_news, status, "
+                    "created_at, consumer) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                    (job_id, dedup_key, stock_code, days, max_news, time.time(), consumer)
+                )
+            except sqlite3.IntegrityError:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')",
+                    (dedup_key,)
+                ).fetchone()
+                if row is not None:
+                    job_id = row['id']
+                else:
+                    # 已有的任务恰好刚结束，重新提交一次
+                    return self.submit(stock_code, days, max_news, webhook_url, consumer)
+            if webhook_url:
+                conn.execute("INSERT OR IGNORE INTO job_webhooks (job_id, url) VALUES (?, ?)",
+                             (job_id, webhook_url))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """获取任务状态和结果
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            Optional[Dict]: 任务信息，任务不存在时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'stock_code': row['stock_code'],
+            'days': row['days'],
+            'max_news': row['max_news'],
+            'created_at': _format_time(row['created_at']),
+            'started_at': _format_time(row['started_at']),
+            'finished_at': _format_time(row['finished_at']),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error']
+        }
+
+    def _claim(self) -> Optional[Dict]:
+        """领取最早的排队任务；超时没有续期（进程退出）的执行中任务重新排队
+
+        Returns:
+            Optional[Dict]: 任务，attempts为本次领取后的次数，续期和写入结果时作为凭证
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' "
+                "AND COALESCE(heartbeat_at, started_at) < ?",
+                (now - Config.JOB_RUNNING_TIMEOUT,)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (now, now, row['id'])
+            )
+        job = dict(row)
+        job['attempts'] += 1
+        return job
+
+    def _renew(self, job_id: str, attempt: int) -> bool:
+        """续期执行中的任务
+
+        Returns:
+            bool: 任务是否仍由本次执行持有
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (time.time(), job_id, attempt)
+            )
+        return cursor.rowcount > 0
+
+    async def _heartbeat(self, job_id: str, attempt: int):
+        """执行期间定期续期，其他进程不会把仍在执行的任务当作超时重新领取"""
+        while True:
+            await asyncio.sleep(Config.JOB_HEARTBEAT_INTERVAL)
+            try:
+                if not await asyncio.to_thread(self._renew, job_id, attempt):
+                    print(f"分析任务 {job_id} 已被重新领取，停止续期")
+                    return
+            except Exception as e:
+                print(f"续期分析任务 {job_id} 出错: {e}")
+
+    def _finish(self, job_id: str, attempt: int, result: Optional[Dict] = None,
+                error: Optional[str] = None) -> bool:
+        """记录任务结果
+
+        Returns:
+            bool: 是否写入；任务已被重新领取时不写入
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (
+                    'failed' if error else 'succeeded',
+                    time.time(),
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    job_id,
+                    attempt
+                )
+            )
+        return cursor.rowcount > 0
+
+    def _cleanup(self):
+        """删除超过保留期的已完成任务，至多每小时执行一次"""
+        now = time.time()
+        if now - self._last_cleanup < 3600:
+            return
+        self._last_cleanup = now
+        cutoff = now - Config.JOB_RETENTION_DAYS * 86400
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_webhooks WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?)",
+                (cutoff,)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (cutoff,)
+            )
+
+    async def _run_job(self, job: Dict):
+        """执行一个分析任务"""
+        print(f"开始执行分析任务 {job['id']}（{job['stock_code']}）")
+        heartbeat = asyncio.create_task(self._heartbeat(job['id'], job['attempts']))
+        try:
+            news_list = await asyncio.to_thread(
+                self.news_crawler.get_stock_news,
+                stock_code=job['stock_code'],
+                days=job['days'],
+                max_news=job['max_news']
+            )
+            analysis_result = await self.sentiment_analyzer.analyze_sentiment(
+                news_list=news_list,
+                stock_code=job['stock_code'],
+                priority='batch',
+                consumer=job['consumer']
+            )
+            finished = await asyncio.to_thread(
+                self._finish, job['id'], job['attempts'], analysis_result)
+        except Exception as e:
+            print(f"分析任务 {job['id']} 出错: {e}")
+            finished = await asyncio.to_thread(
+                self._finish, job['id'], job['attempts'], None, str(e))
+        finally:
+            heartbeat.cancel()
+        if not finished:
+            print(f"分析任务 {job['id']} 已被重新领取，丢弃本次结果")
+            return
+        await self._notify(job['id'])
+
+    async def _notify(self, job_id: str):
+        """把任务结果POST到提交时登记的回调地址，失败时按指数退避重试
+
+        发送前重新校验地址，提交后主机名被改为解析到内网地址时不回调；请求直接连接
+        校验通过的IP地址（Host头和SNI保持原主机名），不会在发送时再次解析DNS被重绑定到内网；
+        不跟随重定向。
+        """
+        with self._connect() as conn:
+            urls = [row['url'] for row in conn.execute(
+                "SELECT url FROM job_webhooks WHERE job_id = ?", (job_id,))]
+        if not urls:
+            return
+        payload = self.get(job_id)
+        async with httpx.AsyncClient(timeout=Config.JOB_WEBHOOK_TIMEOUT) as client:
+            for url in urls:
+                for attempt in range(Config.JOB_WEBHOOK_RETRIES):
+                    try:
+                        addresses = await asyncio.to_thread(check_webhook_url, url)
+                    except ValueError as e:
+                        print(f"任务 {job_id} 不回调 {url}: {e}")
+                        break
+                    target, headers, extensions = pin_webhook_request(
+                        url, addresses[0] if addresses else None)
+                    try:
+                        response = await client.post(target, json=payload, headers=headers,
+                                                     extensions=extensions)
+                        response.raise_for_status()
+                        break
+                    except Exception as e:
+                        print(f"任务 {job_id} 回调 {url} 失败（第{attempt + 1}次）: {e}")
+                        if attempt < Config.JOB_WEBHOOK_RETRIES - 1:
+                            await asyncio.sleep(2 ** attempt)
+
+    async def _worker(self):
+        """循环领取并执行任务，没有任务时等待新提交或定期轮询（其他进程提交的任务）"""
+        while True:
+            try:
+                await asyncio.to_thread(self._cleanup)
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"领取分析任务出错: {e}")
+                job = None
+            if job is not None:
+                self._running.add(job['id'])
+                try:
+                    await self._run_job(job)
+                finally:
+                    self._running.discard(job['id'])
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), Config.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, workers: int = Config.JOB_WORKERS):
+        """启动后台worker，需在事件循环中调用"""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    def stop(self):
+        """停止后台worker，把本进程执行中的任务重新排队，由下次启动或其他进程继续执行"""
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+        if self._running:
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "UPDATE jobs SET status = 'queued' WHERE id = ? AND status = 'running'",
+                        [(job_id,) for job_id in self._running]
+                    )
+            except Exception as e:
+                print(f"重新排队未完成的分析任务出错: {e}")
+            self._running.clear()
+
+
+def _format_time(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
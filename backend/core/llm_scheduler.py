@@ -0,0 +1,182 @@
+import time
+import asyncio
+import heapq
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from backend.utils.config import Config
+
+# 优先级从高到低
+PRIORITIES = ('interactive', 'batch', 'background')
+
+
+class _Waiter:
+    __slots__ = ('future', 'consumer', 'enqueued_at')
+
+    def __init__(self, future: asyncio.Future, consumer: str):
+        self.future = future
+        self.consumer = consumer
+        self.enqueued_at = time.monotonic()
+
+
+class _Lane:
+    """单个优先级的等待队列，按加权公平排队（WFQ）在调用方之间分配"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.heap = []
+        self.virtual_time = 0.0
+        self.consumer_finish: Dict[str, float] = {}
+        self.seq = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.started = 0
+        self.cancelled = 0
+        self.waits = deque(maxlen=1000)
+        self.max_wait = 0.0
+
+    def push(self, waiter: _Waiter, weight: float):
+        """入队：每个请求的虚拟完成时间 = max(队列虚拟时间, 该调用方上一个请求的完成时间) + 1/权重"""
+        if len(self.consumer_finish) > 1000:
+            # 完成时间不晚于当前虚拟时间的调用方与未出现过的调用方等价，可以丢弃
+            self.consumer_finish = {
+                consumer: finish for consumer, finish in self.consumer_finish.items()
+                if finish > self.virtual_time
+            }
+        start = max(self.virtual_time, self.consumer_finish.get(waiter.consumer, 0.0))
+        finish = start + 1.0 / weight
+        self.consumer_finish[waiter.consumer] = finish
+        heapq.heappush(self.heap, (finish, self.seq, waiter))
+        self.seq += 1
+        self.queued += 1
+
+    def pop(self) -> Optional[_Waiter]:
+        """取出虚拟完成时间最小的等待者，跳过已取消的"""
+        while self.heap:
+            finish, _, waiter = heapq.heappop(self.heap)
+            if waiter.future.done():
+                continue
+            self.virtual_time = finish
+            self.queued -= 1
+            return waiter
+        return None
+
+
+class LLMScheduler:
+    """大模型调用调度器
+
+    - 优先级：interactive > batch > background，有空闲名额时总是先分配给高优先级的等待者，
+      排队中的低优先级请求会被新到的交互请求插队（已经开始的调用不会被中断）
+    - 同一优先级内按调用方加权公平排队，一个调用方的大量请求不会饿死其他调用方
+    - 保留Config.LLM_INTERACTIVE_RESERVED_SLOTS个名额只给交互请求，
+      批量任务占满其余名额时交互请求仍可立即开始
+    """
+
+    def __init__(self, max_concurrency: int = Config.LLM_MAX_CONCURRENCY,
+                 interactive_reserved: int = Config.LLM_INTERACTIVE_RESERVED_SLOTS,
+                 consumer_weights: Dict[str, float] = None):
+        """初始化调度器
+
+        Args:
+            max_concurrency: 同时进行的大模型调用上限
+            interactive_reserved: 只给交互请求使用的名额数
+            consumer_weights: 调用方权重，未配置的调用方权重为1
+        """
+        self.max_concurrency = max_concurrency
+        self.interactive_reserved = min(interactive_reserved, max_concurrency - 1)
+        self.consumer_weights = (consumer_weights if consumer_weights is not None
+                                 else Config.LLM_CONSUMER_WEIGHTS)
+        self.lanes = {name: _Lane(name) for name in PRIORITIES}
+        self.active = 0
+
+    def _has_capacity(self, priority: str) -> bool:
+        limit = self.max_concurrency
+        if priority != 'interactive':
+            limit -= self.interactive_reserved
+        return self.active < limit
+
+    def _dispatch(self):
+        """按优先级把空闲名额分配给等待者"""
+        for name in PRIORITIES:
+            lane = self.lanes[name]
+            while lane.queued and self._has_capacity(name):
+                waiter = lane.pop()
+                if waiter is None:
+                    break
+                wait = time.monotonic() - waiter.enqueued_at
+                lane.waits.append(wait)
+                lane.max_wait = max(lane.max_wait, wait)
+                lane.started += 1
+                lane.in_flight += 1
+                self.active += 1
+                waiter.future.set_result(None)
+
+    async def acquire(self, priority: str = 'interactive', consumer: str = 'default'):
+        """等待一个调用名额
+
+        Args:
+            priority: 优先级，interactive、batch或background
+            consumer: 调用方标识，用于同一优先级内的公平排队
+        """
+        if priority not in self.lanes:
+            raise ValueError(f"未知的优先级: {priority}")
+        lane = self.lanes[priority]
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), consumer)
+        lane.push(waiter, self.consumer_weights.get(consumer, 1.0))
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                # 排队中被取消，留在堆中的条目出队时跳过
+                lane.queued -= 1
+                lane.cancelled += 1
+            else:
+                # 已经分配到名额后才被取消，归还名额
+                self.release(priority)
+            raise
+
+    def release(self, priority: str):
+        """归还调用名额"""
+        lane = self.lanes[priority]
+        lane.in_flight -= 1
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = 'interactive', consumer: str = 'default'):
+        """占用一个调用名额的上下文管理器
+
+        用法:
+            async with scheduler.slot('batch', consumer):
+                ...
+        """
+        await self.acquire(priority, consumer)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def metrics(self) -> Dict:
+        """各优先级的排队深度、执行数和等待时间统计"""
+        lanes = {}
+        for name, lane in self.lanes.items():
+            waits = sorted(lane.waits)
+            lanes[name] = {
+                'queued': lane.queued,
+                'in_flight': lane.in_flight,
+                'started': lane.started,
+                'cancelled': lane.cancelled,
+                'wait_ms': {
+                    'mean': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                    'p95': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                    'max': round(lane.max_wait * 1000, 1)
+                }
+            }
+        return {
+            'max_concurrency': self.max_concurrency,
+            'interactive_reserved': self.interactive_reserved,
+            'active': self.active,
+            'lanes': lanes
+        }
@@ -0,0 +1,319 @@
+import math
+import time
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, List, Tuple
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord, SourceCategory
+
+
+def score_to_label(score: float) -> str:
+    """把0-1之间的情感得分转换为情感标签"""
+    if score >= 0.85:
+        return "极度看好"
+    elif score >= 0.65:
+        return "看好"
+    elif score >= 0.35:
+        return "中性"
+    elif score >= 0.15:
+        return "看空"
+    return "极度看空"
+
+
+# 情感词及其强度，正数为正面，负数为负面
+SENTIMENT_LEXICON: Dict[str, float] = {
+    # 正面
+    '利好': 2.0, '增长': 1.0, '突破': 1.5, '创新高': 2.0, '获得': 0.5, '中标': 1.5,
+    '战略合作': 1.5, '预增': 2.0, '扭亏': 2.0, '超预期': 2.0, '大增': 2.0, '上涨': 1.0,
+    '涨停': 2.0, '增持': 1.5, '回购': 1.5, '分红': 1.0, '签约': 1.0, '订单': 0.5,
+    '获批': 1.5, '买入': 1.0, '推荐': 1.0, '上调': 1.0, '景气': 1.0, '复苏': 1.0,
+    '提升': 0.5, '领先': 1.0, '新高': 1.5, '盈利': 1.0, '净流入': 1.0, '看好': 1.0,
+    # 负面
+    '下滑': -1.5, '亏损': -2.0, '违规': -2.0, '处罚': -2.0, '风险': -1.0, '下跌': -1.0,
+    '减持': -1.5, '预减': -2.0, '预亏': -2.0, '跌停': -2.0, '立案': -2.5, '调查': -1.5,
+    '诉讼': -1.5, '冻结': -2.0, '质押': -0.5, '解禁': -1.0, '下调': -1.0, '暴跌': -2.5,
+    '退市': -3.0, '问询': -1.0, '警示': -1.5, '低于预期': -2.0, '净流出': -1.0,
+    '终止': -1.0, '失败': -1.5, '下降': -1.0, '萎缩': -1.5, '承压': -1.0, '卖出': -1.0,
+}
+
+# 否定词出现在情感词之前时情感方向反转，如"未减持"、"不存在违规"
+NEGATIONS = ('不', '未', '没', '无', '非', '否', '停止')
+# 程度词出现在情感词之前时强度加倍
+INTENSIFIERS = ('大幅', '显著', '明显', '持续', '巨额', '严重')
+
+# 各主题的识别词，键与Config.NEWS_TOPICS一致
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'company_operation': ('经营', '业务', '订单', '中标', '合同', '签约', '产能', '管理层', '重组', '收购', '项目'),
+    'financial_performance': ('营收', '净利润', '业绩', '利润', '财报', '季报', '年报', '毛利率', '亏损', '预增', '预减'),
+    'market_competition': ('市场份额', '竞争', '对手', '龙头', '市占率', '行业地位', '份额'),
+    'product_technology': ('产品', '技术', '研发', '专利', '新品', '创新', '量产', '发布'),
+    'industry_policy': ('政策', '监管', '补贴', '规划', '发改委', '证监会', '工信部', '国务院'),
+    'capital_market': ('股价', '增持', '减持', '回购', '解禁', '融资', '定增', '分红', '评级',
+                       '北向资金', '涨停', '跌停', '主力资金', '机构'),
+}
+
+# 来源可靠性，与置信度指数的计算一致
+SOURCE_RELIABILITY: Dict[SourceCategory, float] = {
+    SourceCategory.OFFICIAL_ANNOUNCEMENT: 1.0,
+    SourceCategory.MAINSTREAM_MEDIA: 0.8,
+    SourceCategory.INDUSTRY_MEDIA: 0.6,
+    SourceCategory.SELF_MEDIA: 0.4,
+}
+
+_SOURCE_NAMES = {
+    SourceCategory.OFFICIAL_ANNOUNCEMENT: '官方发布',
+    SourceCategory.MAINSTREAM_MEDIA: '主流媒体',
+    SourceCategory.INDUSTRY_MEDIA: '行业媒体',
+    SourceCategory.SELF_MEDIA: '自媒体',
+}
+
+
+class _ScoredNews:
+    __slots__ = ('news', 'score', 'polarity', 'weight', 'hits', 'topics')
+
+    def __init__(self, news: NewsRecord, score: float, polarity: float, weight: float,
+                 hits: Dict[str, float], topics: List[str]):
+        self.news = news
+        self.score = score
+        self.polarity = polarity
+        self.weight = weight
+        self.hits = hits
+        self.topics = topics
+
+
+class LocalSentimentScorer:
+    """不调用大模型的本地情感打分器
+
+    基于带强度的情感词典逐条打分，处理否定词和程度词，标题命中加倍；
+    汇总时按来源可靠性和时效性加权，并按主题、来源、日期分组，
+    输出与大模型分析结果相同结构的字典，耗时在毫秒级。
+    """
+
+    def __init__(self, half_life_days: float = Config.LOCAL_SCORER_HALF_LIFE_DAYS):
+        """初始化打分器
+
+        Args:
+            half_life_days: 新闻权重随发布时间衰减的半衰期（天）
+        """
+        self.half_life_days = half_life_days
+        # 单篇新闻的情感词命中和主题与时间无关，按摘要缓存，
+        # 同一篇新闻出现在多只股票中时只匹配一次
+        self._features: 'OrderedDict[str, Tuple[Dict[str, float], List[str]]]' = OrderedDict()
+        self._features_lock = threading.Lock()
+
+    @staticmethod
+    def _match(text: str) -> Dict[str, float]:
+        """在文本中查找情感词，返回情感词到带方向强度的映射"""
+        hits = {}
+        for word, strength in SENTIMENT_LEXICON.items():
+            start = text.find(word)
+            if start < 0:
+                continue
+            value = strength
+            prefix = text[max(0, start - 4):start]
+            if any(negation in prefix[-3:] for negation in NEGATIONS):
+                # 否定后的情感弱于直接表达，如"未减持"不等同于"增持"
+                value = -value * 0.5
+            elif any(intensifier in prefix for intensifier in INTENSIFIERS):
+                value *= 2
+            hits[word] = value
+        # "创新高"与"新高"这类包含关系只计一次
+        for word in list(hits):
+            if any(word != other and word in other for other in hits):
+                del hits[word]
+        return hits
+
+    def _news_features(self, news: NewsRecord) -> Tuple[Dict[str, float], List[str]]:
+        """单篇新闻的情感词命中（标题命中权重加倍）和所属主题"""
+        with self._features_lock:
+            features = self._features.get(news.digest)
+            if features is not None:
+                self._features.move_to_end(news.digest)
+                return features
+
+        title_hits = self._match(news.title)
+        content_hits = self._match(news.content)
+        hits = dict(content_hits)
+        for word, value in title_hits.items():
+            # 标题命中权重加倍
+            hits[word] = hits.get(word, 0.0) + value * 2
+        text = news.title + news.content
+        topics = [topic for topic, keywords in TOPIC_KEYWORDS.items()
+                  if any(keyword in text for keyword in keywords)]
+
+        with self._features_lock:
+            self._features[news.digest] = (hits, topics)
+            while len(self._features) > Config.ARTICLE_RECORD_CACHE_SIZE:
+                self._features.popitem(last=False)
+        return hits, topics
+
+    def _score_news(self, news: NewsRecord, now: float) -> _ScoredNews:
+        hits, topics = self._news_features(news)
+        polarity = sum(hits.values())
+        # tanh把任意强度压缩到(-1, 1)，3分左右的强度已接近明确的正面或负面
+        score = 0.5 + 0.5 * math.tanh(polarity / 3)
+
+        age_days = max(0.0, (now - news.timestamp) / 86400)
+        weight = SOURCE_RELIABILITY[news.source_category] * 0.5 ** (age_days / self.half_life_days)
+        if not hits:
+            # 没有情感词的新闻只说明中性的可能性，证据较弱
+            weight *= 0.5
+        return _ScoredNews(news, score, polarity, weight, hits, topics)
+
+    @staticmethod
+    def _weighted_score(items: List[_ScoredNews]) -> float:
+        total_weight = sum(item.weight for item in items)
+        if not total_weight:
+            return 0.5
+        return sum(item.score * item.weight for item in items) / total_weight
+
+    @staticmethod
+    def _top_titles(items: List[_ScoredNews], limit: int = 3) -> List[str]:
+        ranked = sorted(items, key=lambda item: abs(item.polarity), reverse=True)
+        return [item.news.title for item in ranked[:limit]]
+
+    @staticmethod
+    def _tone(score: float) -> str:
+        if score >= 0.65:
+            return '偏正面'
+        if score < 0.35:
+            return '偏负面'
+        return '中性'
+
+    def analyze(self, news_list: List[NewsRecord]) -> Dict:
+        """分析新闻情感
+
+        Args:
+            news_list: 新闻列表
+
+        Returns:
+            Dict: 与大模型分析结果结构相同的分析结果
+        """
+        now = time.time()
+        items = [self._score_news(news, now) for news in news_list]
+        overall = self._weighted_score(items)
+        label = score_to_label(overall)
+        positive = sum(1 for item in items if item.polarity > 0)
+        negative = sum(1 for item in items if item.polarity < 0)
+
+        # 时间维度：按日期汇总，时间正序
+        by_date = defaultdict(list)
+        for item in items:
+            by_date[item.news.date].append(item)
+        trend = []
+        for date in sorted(by_date):
+            day_items = by_date[date]
+            key_events = []
+            for item in sorted(day_items, key=lambda i: abs(i.polarity), reverse=True)[:2]:
+                if not item.hits:
+                    continue
+                word = max(item.hits, key=lambda w: abs(item.hits[w]))
+                key_events.append({'title': word[:5], 'description': item.news.title[:20]})
+            trend.append({
+                'date': date,
+                'score': round(self._weighted_score(day_items), 2),
+                'key_events': key_events
+            })
+        if len(trend) >= 2:
+            half = len(trend) // 2
+            earlier = sum(day['score'] for day in trend[:half]) / half
+            recent = sum(day['score'] for day in trend[half:]) / (len(trend) - half)
+            if recent - earlier > 0.05:
+                trend_prediction = '近期新闻情绪较前期改善，短期情绪可能延续回暖'
+            elif earlier - recent > 0.05:
+                trend_prediction = '近期新闻情绪较前期转弱，需关注后续负面消息'
+            else:
+                trend_prediction = '新闻情绪整体平稳，短期内大概率维持当前水平'
+        else:
+            trend_prediction = '新闻覆盖的日期较少，无法判断趋势'
+
+        # 主题维度
+        topic_analysis = {}
+        for topic, topic_name in Config.NEWS_TOPICS.items():
+            topic_items = [item for item in items if topic in item.topics]
+            if topic_items:
+                topic_score = self._weighted_score(topic_items)
+                summary = f"{len(topic_items)}条{topic_name}相关新闻，整体{self._tone(topic_score)}"
+            else:
+                topic_score = 0.5
+                summary = f"暂无{topic_name}相关新闻"
+            topic_analysis[topic] = {
+                'score': round(topic_score, 2),
+                'summary': summary,
+                'key_points': self._top_titles(topic_items)
+            }
+
+        # 来源维度
+        source_analysis = {}
+        for category, category_name in _SOURCE_NAMES.items():
+            source_items = [item for item in items if item.news.source_category == category]
+            if source_items:
+                source_score = self._weighted_score(source_items)
+                summary = f"{category_name}{len(source_items)}条，观点{self._tone(source_score)}"
+            else:
+                source_score = 0.5
+                summary = f"暂无{category_name}新闻"
+            source_analysis[category.value] = {'score': round(source_score, 2), 'summary': summary}
+
+        # 投资者情绪只依据资本市场相关的新闻
+        capital_items = [item for item in items if 'capital_market' in item.topics]
+        investor_sentiment = (round(self._weighted_score(capital_items) * 100)
+                              if capital_items else '无')
+
+        # 影响力与风险
+        factor_strength = Counter()
+        for item in items:
+            for word, value in item.hits.items():
+                factor_strength[word] += abs(value) * item.weight
+        deviation = abs(overall - 0.5) * 2
+        official = any(item.news.source_category == SourceCategory.OFFICIAL_ANNOUNCEMENT
+                       and item.hits for item in items)
+        importance = '高' if deviation > 0.6 or (official and deviation > 0.3) \
+            else '中' if deviation > 0.3 else '低'
+        long_term = any(topic_analysis[topic]['key_points']
+                        for topic in ('financial_performance', 'industry_policy'))
+
+        risk_factors = []
+        negative_words = Counter()
+        for item in items:
+            for word, value in item.hits.items():
+                if value < 0:
+                    negative_words[word] += 1
+        for word, count in negative_words.most_common(3):
+            worst = min((item.score for item in items if item.hits.get(word, 0) < 0), default=0.5)
+            risk_factors.append({
+                'factor': word,
+                'description': f"{count}条新闻提到{word}相关内容，需要关注",
+                'severity': '高' if worst < 0.2 else '中' if worst < 0.4 else '低'
+            })
+
+        return {
+            'overall_sentiment': {
+                'score': round(overall, 4),
+                'label': label,
+                'summary': (f"本地模型分析{len(items)}条新闻，正面{positive}条、负面{negative}条，"
+                            f"整体情感{label}，得分{overall:.2f}"),
+                'market_expectation': f"新闻面{self._tone(overall)}，" +
+                                      ('市场预期偏乐观' if overall >= 0.65 else
+                                       '市场预期偏谨慎' if overall < 0.35 else '市场预期分歧不大'),
+                'investor_sentiment': investor_sentiment
+            },
+            'time_analysis': {
+                'trend': trend,
+                'trend_prediction': trend_prediction
+            },
+            'topic_analysis': topic_analysis,
+            'source_analysis': source_analysis,
+            'impact_analysis': {
+                'importance_level': importance,
+                'market_impact': {
+                    'score': round(deviation, 2),
+                    'duration': '中期' if long_term and deviation > 0.3 else '短期',
+                    'key_factors': [word for word, _ in factor_strength.most_common(3)]
+                }
+            },
+            'risk_analysis': {
+                'risk_level': '高' if overall < 0.35 else '中' if overall < 0.65 else '低',
+                'risk_factors': risk_factors
+            }
+        }
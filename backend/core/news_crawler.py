@@ -1,21 +1,42 @@
 import os
 import json
-import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
-import akshare as ak
+from typing import Iterator, List, Dict, Optional, Tuple
 from backend.utils.config import Config
-from collections import defaultdict
+from backend.utils.file_utils import atomic_write_json, read_json, get_lock_path, FileLock
+from backend.utils.memory_cache import MemoryCache, expiry_from_cache_date
+from backend.utils.cache_stats import CacheStats
+from backend.core.news_record import NewsRecord, to_records
+from backend.core.relevance_ranker import RelevanceRanker, stock_aliases, cached_industries
+from backend.core.news_index import NewsSearchIndex
+from backend.core.article_store import ArticleStore
 
 
 class NewsCrawler:
     """新闻爬虫类"""
 
-    def __init__(self):
-        """初始化新闻爬虫"""
+    def __init__(self, stock_cache=None):
+        """初始化新闻爬虫
+
+        Args:
+            stock_cache: 股票缓存，用于按股票名称筛选相关新闻；为None时不做相关度筛选
+        """
         self.cache_dir = Config.NEWS_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 磁盘缓存前面的进程内缓存，热门股票直接从内存返回
+        self.memory_cache = MemoryCache(
+            max_bytes=Config.NEWS_MEMORY_CACHE_BYTES,
+            revalidate_seconds=Config.MEMORY_CACHE_REVALIDATE_SECONDS
+        )
+        self.cache_stats = CacheStats()
+        self.stock_cache = stock_cache
+        self.ranker = RelevanceRanker()
+        # 新闻正文按摘要只保存一份，各股票的缓存文件只保存摘要列表
+        self.article_store = ArticleStore()
+        # 每次保存缓存时增量更新全文索引，首次启动时在后台导入已有的缓存
+        self.search_index = NewsSearchIndex()
+        self.search_index.start_backfill(self.iter_cached_news)
 
     def _get_cache_path(self, stock_code: str) -> Path:
         """获取缓存文件路径"""
@@ -23,41 +44,103 @@ class NewsCrawler:
 
     def _load_cache(self, stock_code: str) -> Optional[Dict]:
         """加载缓存的新闻数据"""
+        cache_path = self._get_cache_path(stock_code)
+        cache_data = self.memory_cache.get(stock_code, cache_path)
+        if cache_data is not None:
+            self.cache_stats.record_hit(stock_code)
+            return cache_data
+
         try:
-            cache_path = self._get_cache_path(stock_code)
-            if not cache_path.exists():
+            # 在读取之前stat，保证记录的mtime不会比读到的内容更新
+            stat = os.stat(cache_path)
+            cache_data = read_json(cache_path)
+            if cache_data is None:
+                self.cache_stats.record_miss()
                 return None
 
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-
             # 检查缓存是否过期
             cache_date = datetime.strptime(cache_data['date'], '%Y-%m-%d')
+            news_list = None
             if (datetime.now() - cache_date).days <= Config.CACHE_VALID_DAYS:
+                news_list = self._resolve_news(cache_data['news'])
+            if news_list is not None:
+                # 内存层保存解析后的NewsRecord，命中时无需再次解析
+                cache_data['news'] = news_list
+                self.memory_cache.set(
+                    stock_code, cache_data,
+                    expires_at=expiry_from_cache_date(
+                        cache_data['date'], Config.CACHE_VALID_DAYS),
+                    path=cache_path, stat=stat
+                )
+                self.cache_stats.record_hit(stock_code)
                 return cache_data
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"读取新闻缓存出错: {e}")
+        self.cache_stats.record_miss()
         return None
 
-    def _save_cache(self, stock_code: str, news_list: List[Dict]):
+    def _resolve_news(self, entries: List) -> Optional[List[NewsRecord]]:
+        """把缓存中的新闻条目转换为NewsRecord
+
+        条目为新闻摘要时从正文存储中读取，旧格式的缓存中条目为完整的新闻字典。
+
+        Returns:
+            Optional[List[NewsRecord]]: 新闻列表，有正文已被清理时返回None
+        """
+        digests = [entry for entry in entries if isinstance(entry, str)]
+        if not digests:
+            return to_records(entries)
+        articles = self.article_store.get_many(digests)
+        if len(articles) < len(set(digests)):
+            print(f"新闻缓存引用的{len(set(digests)) - len(articles)}篇新闻正文已被清理")
+            return None
+        return [articles[entry] if isinstance(entry, str) else NewsRecord.from_dict(entry)
+                for entry in entries]
+
+    def iter_cached_news(self) -> Iterator[Tuple[str, List[NewsRecord]]]:
+        """遍历磁盘上全部股票的新闻缓存，不检查有效期
+
+        Yields:
+            Tuple[str, List[NewsRecord]]: (股票代码, 新闻列表)
+        """
+        for cache_path in self.cache_dir.glob('*.json'):
+            try:
+                cache_data = read_json(cache_path)
+                news_list = self._resolve_news(cache_data['news']) if cache_data else None
+            except Exception as e:
+                print(f"读取新闻缓存 {cache_path.name} 出错: {e}")
+                continue
+            if news_list:
+                yield cache_path.stem, news_list
+
+    def _save_cache(self, stock_code: str, news_list: List[NewsRecord]):
         """保存新闻数据到缓存"""
         try:
-            # 确保缓存目录存在
-            self.cache_dir.mkdir(parents=True, exist_ok=True)
-            
-            cache_data = {
-                'date': datetime.now().strftime('%Y-%m-%d'),
-                'news': news_list
-            }
-            
+            cache_date = datetime.now().strftime('%Y-%m-%d')
+            # 正文写入共享的正文存储，已在其他股票缓存中的新闻换成同一个对象
+            news_list = self.article_store.put_many(news_list)
+            # 先写临时文件再重命名，避免其他worker读到写了一半的文件
             cache_path = self._get_cache_path(stock_code)
-            # 确保父目录存在
-            cache_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            atomic_write_json(cache_path, {
+                'date': cache_date,
+                'news': [news.digest for news in news_list]
+            })
+            # 磁盘缓存重写后同步更新内存缓存
+            cache_data = {'date': cache_date, 'news': news_list}
+            self.memory_cache.set(
+                stock_code, cache_data,
+                expires_at=expiry_from_cache_date(
+                    cache_data['date'], Config.CACHE_VALID_DAYS),
+                path=cache_path
+            )
         except Exception as e:
             print(f"保存新闻缓存出错: {e}")
+        try:
+            self.search_index.add(stock_code, news_list)
+        except Exception as e:
+            print(f"更新新闻全文索引出错: {e}")
 
 
     def get_stock_news(
@@ -65,7 +148,7 @@ class NewsCrawler:
         stock_code: str,
         days: int = Config.DEFAULT_DAYS,
         max_news: int = Config.MAX_NEWS_PER_STOCK
-    ) -> List[Dict]:
+    ) -> List[NewsRecord]:
         """获取股票新闻
 
         Args:
@@ -74,25 +157,77 @@ class NewsCrawler:
             max_news: 最大新闻条数
 
         Returns:
-            List[Dict]: 新闻列表，每条新闻包含:
-                - title: 标题
-                - content: 内容
-                - publish_time: 发布时间
-                - source: 来源
-                - url: 链接
+            List[NewsRecord]: 按发布时间倒序排列的新闻列表
         """
         # 尝试加载缓存
+        cached_news = self._get_cached_news(stock_code, days)
+        if cached_news is not None:
+            return cached_news
+
+        # 同一股票同一时间只允许一个进程去抓取，其他进程等待后直接读取其写入的缓存
+        with FileLock(get_lock_path(self.cache_dir, stock_code),
+                      timeout=Config.CACHE_LOCK_TIMEOUT) as lock:
+            if lock.waited:
+                cached_news = self._get_cached_news(stock_code, days)
+                if cached_news is not None:
+                    return cached_news
+            return self._fetch_news(stock_code, days, max_news)
+
+    def refresh_stock_news(
+        self,
+        stock_code: str,
+        days: int = Config.DEFAULT_DAYS,
+        max_news: int = Config.MAX_NEWS_PER_STOCK
+    ) -> List[NewsRecord]:
+        """忽略缓存，从数据源重新抓取股票新闻并更新缓存
+
+        Args:
+            stock_code: 股票代码
+            days: 获取有新闻的天数
+            max_news: 最大新闻条数
+
+        Returns:
+            List[NewsRecord]: 按发布时间倒序排列的新闻列表，抓取失败时为空列表
+        """
+        with FileLock(get_lock_path(self.cache_dir, stock_code),
+                      timeout=Config.CACHE_LOCK_TIMEOUT):
+            return self._fetch_news(stock_code, days, max_news)
+
+    def get_cached_stock_news(self, stock_code: str,
+                              days: int = Config.DEFAULT_DAYS) -> Optional[List[NewsRecord]]:
+        """只从缓存获取股票新闻，不请求数据源
+
+        Args:
+            stock_code: 股票代码
+            days: 获取有新闻的天数
+
+        Returns:
+            Optional[List[NewsRecord]]: 新闻列表，缓存无效时返回None
+        """
+        return self._get_cached_news(stock_code, days)
+
+    def _get_cached_news(self, stock_code: str, days: int) -> Optional[List[NewsRecord]]:
+        """从缓存获取满足天数要求的新闻，缓存无效时返回None"""
         cache_data = self._load_cache(stock_code)
         if cache_data:
-            news_list = cache_data['news']
-            # 对缓存的新闻进行日期分组处理
-            date_grouped_news = self._group_news_by_date(news_list)
-            if len(date_grouped_news) >= days:  # 只有缓存的日期数满足要求才使用缓存
-                print(f"使用缓存数据，共{len(date_grouped_news)}个日期的新闻")
-                return self._process_grouped_news(date_grouped_news, days)
+            if not cache_data['news']:
+                # 抓取到的新闻都与该股票无关，有效期内不再重复抓取
+                print("缓存中没有与该股票相关的新闻")
+                return []
+            # 缓存中的新闻已经按时间倒序排列
+            recent_news, date_count = self._select_recent_news(cache_data['news'], days)
+            if date_count >= days:  # 只有缓存的日期数满足要求才使用缓存
+                print(f"使用缓存数据，共{date_count}个日期的新闻")
+                return recent_news
             else:
-                print(f"缓存数据日期数({len(date_grouped_news)})不足，需要重新获取")
+                print(f"缓存数据日期数({date_count})不足，需要重新获取")
+        return None
 
+    def _fetch_news(self, stock_code: str, days: int, max_news: int) -> List[NewsRecord]:
+        """从数据源抓取新闻并写入缓存"""
+        # akshare和pandas导入较慢，只在真正需要抓取时导入
+        import pandas as pd
+        import akshare as ak
         try:
             # 设置pandas显示选项
             pd.set_option('display.max_columns', None)
@@ -121,28 +256,26 @@ class NewsCrawler:
                     if len(content) < 10:  # 内容太短的跳过
                         continue
 
-                    # 构建新闻项
-                    news_item = {
-                        'title': row['新闻标题'].strip(),
-                        'content': content,
-                        'publish_time': row['发布时间'],
-                        'source': row['文章来源'].strip(),
-                        'url': row['新闻链接'].strip()
-                    }
+                    # 构建新闻项，发布时间等字段只在这里解析一次
+                    news_item = NewsRecord(
+                        title=row['新闻标题'].strip(),
+                        content=content,
+                        publish_time=str(row['发布时间']),
+                        source=row['文章来源'].strip(),
+                        url=row['新闻链接'].strip()
+                    )
                     news_list.append(news_item)
 
                 except Exception as e:
                     print(f"处理新闻出错: {e}")
                     continue
-            # 要先截取再排序，不然前面都是无关新闻
-            news_list = news_list[:max_news]
+            # 数据源返回的新闻混有大量无关内容，按相关度筛选后再按时间排序
+            news_list = self._select_relevant_news(stock_code, news_list, max_news)
             # 按时间排序
-            news_list.sort(key=lambda x: x['publish_time'], reverse=True)
+            news_list.sort(key=lambda news: news.timestamp, reverse=True)
 
-            # 按日期分组并处理
-            date_grouped_news = self._group_news_by_date(news_list)
-            processed_news = self._process_grouped_news(
-                date_grouped_news, days)
+            # 按日期选取新闻
+            processed_news, _ = self._select_recent_news(news_list, days)
 
             # 保存缓存
             self._save_cache(stock_code, processed_news)
@@ -153,35 +286,53 @@ class NewsCrawler:
             print(f"爬取新闻出错: {e}")
             return []
 
-    def _group_news_by_date(self, news_list: List[Dict]) -> Dict[str, List[Dict]]:
-        """将新闻按日期分组"""
-        date_grouped_news = defaultdict(list)
-        for news in news_list:
-            date = news['publish_time'].split()[0]  # 提取日期部分
-            date_grouped_news[date].append(news)
-        return dict(date_grouped_news)
+    def _select_relevant_news(self, stock_code: str, news_list: List[NewsRecord],
+                              max_news: int) -> List[NewsRecord]:
+        """按与股票的相关度筛选新闻，只保留相关度达到阈值的前max_news条
 
-    def _process_grouped_news(self, date_grouped_news: Dict[str, List[Dict]], required_days: int) -> List[Dict]:
-        """处理分组后的新闻数据"""
-        # 按日期排序
-        sorted_dates = sorted(date_grouped_news.keys(), reverse=True)
+        Args:
+            stock_code: 股票代码
+            news_list: 数据源返回的新闻
+            max_news: 最大新闻条数
 
-        # 获取指定天数的新闻
-        processed_news = []
-        days_count = 0
+        Returns:
+            List[NewsRecord]: 相关的新闻，不保证时间顺序
+        """
+        stock = self.stock_cache.get_cached_stock(stock_code) if self.stock_cache else None
+        if stock is None:
+            # 不知道股票名称时无法判断相关度，保持数据源的顺序截取
+            print(f"本地没有{stock_code}的名称，跳过相关度筛选")
+            return news_list[:max_news]
 
-        for date in sorted_dates:
-            if days_count >= required_days:
-                break
+        names = stock_aliases(stock['name']) + Config.STOCK_ALIASES.get(stock_code, [])
+        industries = cached_industries(stock_code)
+        relevant = self.ranker.select(news_list, stock_code, names, industries, max_news)
+        print(f"相关度筛选: {len(news_list)}条新闻中{len(relevant)}条与{stock['name']}相关")
+        return relevant
 
-            # 对每天的新闻按时间排序并限制数量
-            day_news = sorted(date_grouped_news[date],
-                              key=lambda x: x['publish_time'],
-                              reverse=True)
+    def _select_recent_news(self, news_list: List[NewsRecord],
+                            required_days: int) -> Tuple[List[NewsRecord], int]:
+        """从按时间倒序排列的新闻中选取最近required_days个日期的新闻，每天最多5条
 
-            # 每天最多取5条新闻
-            day_news = day_news[:5]
-            processed_news.extend(day_news)
-            days_count += 1
+        Args:
+            news_list: 按时间倒序排列的新闻
+            required_days: 需要的日期数
+
+        Returns:
+            Tuple[List[NewsRecord], int]: 选取的新闻（保持时间倒序）以及新闻覆盖的日期总数
+        """
+        processed_news = []
+        date_count = 0
+        current_date = None
+        day_count = 0
+
+        for news in news_list:
+            if news.date != current_date:
+                current_date = news.date
+                date_count += 1
+                day_count = 0
+            if date_count <= required_days and day_count < 5:
+                processed_news.append(news)
+            day_count += 1
 
-        return processed_news
+        return processed_news, date_count
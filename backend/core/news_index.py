@@ -0,0 +1,209 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord
+
+# 连续的中日韩字符切分为字符二元组，连续的字母数字作为一个词
+_TOKEN_RUNS = re.compile(r'([㐀-鿿豈-﫿]+)|([0-9a-z]+)')
+# 已缓存新闻的迭代器，每项为(股票代码, 新闻列表)
+CachedNews = Iterable[Tuple[str, List[NewsRecord]]]
+
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分为索引词：中文为重叠的字符二元组，字母数字按整词
+
+    FTS5自带的unicode61分词器会把一整句中文当作一个词，预先切分后用空格连接再写入索引，
+    查询时按同样方式切分，二元组按顺序相邻即等价于子串匹配，不需要中文分词词典。
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        List[str]: 索引词列表
+    """
+    tokens = []
+    for cjk, word in _TOKEN_RUNS.findall(text.lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """把用户输入转换为FTS5查询：空格分隔的每个词为一个短语，各短语同时出现才命中
+
+    Args:
+        query: 用户输入的查询
+
+    Returns:
+        Optional[str]: FTS5 MATCH表达式，查询中没有可索引的字符时返回None
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and not tokens[0].isascii():
+            # 单个汉字不是索引词，按前缀匹配以它开头的二元组
+            phrases.append(f'"{tokens[0]}"*')
+        else:
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return ' AND '.join(phrases) if phrases else None
+
+
+class NewsSearchIndex:
+    """全部已缓存新闻的全文索引（SQLite FTS5）
+
+    新闻爬虫每次保存缓存时把新增的新闻写入索引，按(股票代码, 新闻摘要)去重，增量更新。
+    news_docs保存新闻的元数据，news_fts只保存切分后的索引词（不保存原文），
+    两者以rowid关联。索引不受新闻缓存清理的影响。数据库使用WAL模式，多个worker可以同时读写。
+    """
+
+    def __init__(self, db_path: Path = None):
+        """初始化全文索引
+
+        Args:
+            db_path: 数据库文件路径，默认Config.NEWS_INDEX_DB
+        """
+        self.db_path = Path(db_path or Config.NEWS_INDEX_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        """创建表和索引"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+CREATE TABLE IF NOT EXISTS news_docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stock_code TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    title TEXT NOT NULL,
+    source TEXT,
+    url TEXT,
+    publish_time TEXT,
+    date TEXT,
+    UNIQUE (stock_code, digest)
+)""")
+            conn.execute("""
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+    title, content, content='', tokenize='unicode61 remove_diacritics 0'
+)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_news_docs_date "
+                         "ON news_docs (date)")
+
+    def add(self, stock_code: str, news_list: List[NewsRecord]) -> int:
+        """把股票的新闻写入索引，已索引的新闻跳过
+
+        Args:
+            stock_code: 股票代码
+            news_list: 新闻列表
+
+        Returns:
+            int: 新写入的新闻数
+        """
+        added = 0
+        with self._connect() as conn:
+            for news in news_list:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO news_docs "
+                    "(stock_code, digest, title, source, url, publish_time, date) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (stock_code, news.digest, news.title, news.source, news.url,
+                     news.publish_time, news.date)
+                )
+                if not cursor.rowcount:
+                    continue
+                conn.execute(
+                    "INSERT INTO news_fts (rowid, title, content) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, ' '.join(tokenize(news.title)),
+                     ' '.join(tokenize(news.content)))
+                )
+                added += 1
+        return added
+
+    def is_empty(self) -> bool:
+        """索引中是否还没有新闻"""
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM news_docs LIMIT 1").fetchone() is None
+
+    def backfill(self, iter_cached_news: Callable[[], CachedNews]) -> int:
+        """把已缓存的全部新闻写入索引
+
+        Args:
+            iter_cached_news: 返回(股票代码, 新闻列表)迭代器的函数，即NewsCrawler.iter_cached_news
+
+        Returns:
+            int: 新写入的新闻数
+        """
+        added = 0
+        for stock_code, news_list in iter_cached_news():
+            try:
+                added += self.add(stock_code, news_list)
+            except Exception as e:
+                print(f"索引股票 {stock_code} 的新闻缓存出错: {e}")
+        print(f"新闻全文索引已导入{added}条已缓存的新闻")
+        return added
+
+    def start_backfill(self, iter_cached_news: Callable[[], CachedNews]):
+        """索引为空时在后台线程导入已有的新闻缓存，不阻塞服务启动"""
+        if not self.is_empty():
+            return
+        threading.Thread(target=self.backfill, args=(iter_cached_news,),
+                         name='news-index-backfill', daemon=True).start()
+
+    def search(self, query: str, stock_codes: Optional[List[str]] = None,
+               since: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """全文检索新闻，按BM25相关度排序
+
+        Args:
+            query: 查询词，空格分隔的多个词须同时出现
+            stock_codes: 只检索这些股票的新闻，None表示全部
+            since: 只检索该日期（YYYY-MM-DD）及之后发布的新闻
+            limit: 最多返回的条数
+
+        Returns:
+            List[Dict]: 命中的新闻，包含stock_code、title、source、url、publish_time和score
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+        conditions = ["news_fts MATCH ?"]
+        params: List = [match]
+        if stock_codes:
+            conditions.append(f"d.stock_code IN ({', '.join(['?'] * len(stock_codes))})")
+            params.extend(stock_codes)
+        if since:
+            conditions.append("d.date >= ?")
+            params.append(since)
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT d.stock_code, d.title, d.source, d.url, d.publish_time,
+                       bm25(news_fts, ?, 1.0) AS rank
+                FROM news_fts JOIN news_docs d ON d.id = news_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY rank LIMIT ?""",
+                [Config.NEWS_RELEVANCE_TITLE_BOOST, *params]
+            ).fetchall()
+        # bm25()越小越相关，取反后作为得分
+        return [{
+            'stock_code': row['stock_code'],
+            'title': row['title'],
+            'source': row['source'],
+            'url': row['url'],
+            'publish_time': row['publish_time'],
+            'score': round(-row['rank'], 4)
+        } for row in rows]
@@ -0,0 +1,97 @@
+import sys
+import hashlib
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Iterable, List, Union
+
+
+class SourceCategory(str, Enum):
+    """新闻来源类别，取值与分析结果中source_analysis的字段名一致"""
+    OFFICIAL_ANNOUNCEMENT = 'official_announcement'  # 官方公告
+    MAINSTREAM_MEDIA = 'mainstream_media'  # 主流媒体
+    INDUSTRY_MEDIA = 'industry_media'  # 行业媒体
+    SELF_MEDIA = 'self_media'  # 自媒体
+
+    @classmethod
+    def classify(cls, source: str) -> 'SourceCategory':
+        """根据来源名称判断来源类别"""
+        if '公告' in source or '互动易' in source:
+            return cls.OFFICIAL_ANNOUNCEMENT
+        if any(media in source for media in ('新闻', '日报', '时报')):
+            return cls.MAINSTREAM_MEDIA
+        if any(media in source for media in ('证券', '财经', '金融')):
+            return cls.INDUSTRY_MEDIA
+        return cls.SELF_MEDIA
+
+
+class NewsRecord:
+    """一条新闻
+
+    在进入系统时（抓取或从缓存加载）构造一次，发布时间、日期、来源类别和内容摘要
+    只在构造时计算，之后爬虫、分析器和格式化都直接使用这些字段。
+    磁盘缓存和API响应仍使用to_dict()得到的原有字典格式。
+    """
+
+    __slots__ = ('title', 'content', 'publish_time', 'source', 'url',
+                 'timestamp', 'date', 'source_category', 'digest')
+
+    def __init__(self, title: str, content: str, publish_time: str,
+                 source: str, url: str):
+        """初始化新闻
+
+        Args:
+            title: 标题
+            content: 内容
+            publish_time: 发布时间，格式YYYY-MM-DD HH:MM:SS
+            source: 来源
+            url: 链接
+        """
+        self.title = title
+        self.content = content
+        self.publish_time = publish_time
+        # 来源名称重复度很高，驻留后所有新闻共享同一个字符串对象
+        self.source = sys.intern(source)
+        self.url = url
+        published = datetime.fromisoformat(publish_time)
+        self.timestamp = published.timestamp()
+        self.date = published.strftime('%Y-%m-%d')
+        self.source_category = SourceCategory.classify(source)
+        self.digest = hashlib.md5(
+            f"{title}\n{content}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'NewsRecord':
+        """从缓存或API中的新闻字典构造"""
+        return cls(
+            title=data['title'],
+            content=data['content'],
+            publish_time=data['publish_time'],
+            source=data['source'],
+            url=data['url']
+        )
+
+    def to_dict(self) -> Dict:
+        """转换为可JSON序列化的新闻字典"""
+        return {
+            'title': self.title,
+            'content': self.content,
+            'publish_time': self.publish_time,
+            'source': self.source,
+            'url': self.url
+        }
+
+    def __repr__(self) -> str:
+        return f"NewsRecord({self.publish_time!r}, {self.title!r})"
+
+
+def to_records(news_list: Iterable[Union[NewsRecord, Dict]]) -> List[NewsRecord]:
+    """把新闻字典转换为NewsRecord，已经是NewsRecord的保持不变"""
+    return [news if isinstance(news, NewsRecord) else NewsRecord.from_dict(news)
+            for news in news_list]
+
+
+def sort_by_time(news_list: List[NewsRecord]) -> List[NewsRecord]:
+    """按发布时间倒序排列，已经有序（爬虫返回的新闻）时直接返回原列表"""
+    if all(a.timestamp >= b.timestamp for a, b in zip(news_list, news_list[1:])):
+        return news_list
+    return sorted(news_list, key=lambda news: news.timestamp, reverse=True)
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+from backend.utils.config import Config
+
+
+class _BatchItem:
+    __slots__ = ('stock_code', 'news_content', 'consumer', 'future')
+
+    def __init__(self, stock_code: str, news_content: str, consumer: str,
+                 future: asyncio.Future):
+        self.stock_code = stock_code
+        self.news_content = news_content
+        self.consumer = consumer
+        self.future = future
+
+
+class PromptBatcher:
+    """把多只股票的分析合并为一次大模型调用
+
+    批量和后台优先级的分析请求先在短时间窗口内收集，凑满Config.LLM_BATCH_MAX_STOCKS只
+    或窗口结束时一起发送，分析说明和输出格式只发送一次。
+    模型按股票代码逐个输出结果，每只股票的结果完成时立即返回给对应的调用方；
+    没有得到有效结果的股票返回None，由调用方改为单独分析。
+    """
+
+    def __init__(self, client, scheduler,
+                 max_stocks: int = Config.LLM_BATCH_MAX_STOCKS,
+                 window: float = Config.LLM_BATCH_WINDOW_SECONDS):
+        """初始化批量器
+
+        Args:
+            client: 大模型客户端，需提供stream_sections(prompt, system_prompt)
+            scheduler: 大模型调用调度器
+            max_stocks: 每批最多包含的股票数
+            window: 收集请求的时间窗口（秒）
+        """
+        self.client = client
+        self.scheduler = scheduler
+        self.max_stocks = max_stocks
+        self.window = window
+        self._pending: Dict[str, List[_BatchItem]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # 持有执行中批次的引用，避免执行中被垃圾回收
+        self._batches: Set[asyncio.Task] = set()
+
+    async def analyze(self, stock_code: str, news_content: str,
+                      priority: str, consumer: str) -> Optional[Dict]:
+        """加入当前批次并等待该股票的分析结果
+
+        Args:
+            stock_code: 股票代码
+            news_content: 该股票已格式化的新闻内容
+            priority: 大模型调用优先级
+            consumer: 调用方标识
+
+        Returns:
+            Optional[Dict]: 该股票的原始分析结果，批量分析未得到有效结果时返回None
+        """
+        loop = asyncio.get_running_loop()
+        bucket = self._pending.setdefault(priority, [])
+        # 同一批次中股票代码必须唯一，否则无法拆分结果
+        if any(item.stock_code == stock_code for item in bucket):
+            self._flush(priority)
+            bucket = self._pending.setdefault(priority, [])
+
+        item = _BatchItem(stock_code, news_content, consumer, loop.create_future())
+        bucket.append(item)
+        if len(bucket) >= self.max_stocks:
+            self._flush(priority)
+        elif len(bucket) == 1:
+            self._timers[priority] = loop.call_later(self.window, self._flush, priority)
+        return await item.future
+
+    def _flush(self, priority: str):
+        """发送当前批次"""
+        timer = self._timers.pop(priority, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(priority, [])
+        if items:
+            task = asyncio.create_task(self._run_batch(items, priority))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    def _build_prompt(self, items: List[_BatchItem]) -> str:
+        """构建多股票的新闻部分：各股票的新闻按代码分组，分析说明在系统提示词中只出现一次"""
+        news_content = "\n\n".join(
+            f"=== 股票 {item.stock_code} ===\n{item.news_content}" for item in items
+        )
+        stock_codes = "、".join(item.stock_code for item in items)
+        return (Config.SENTIMENT_NEWS_PROMPT.format(news_content=news_content)
+                + Config.MULTI_STOCK_PROMPT_SUFFIX.format(stock_codes=stock_codes))
+
+    async def _run_batch(self, items: List[_BatchItem], priority: str):
+        """执行一个批次，把结果按股票代码分发给各调用方"""
+        pending = {item.stock_code: item for item in items if not item.future.done()}
+        if len(pending) < 2:
+            # 只有一只股票时按单只股票的格式分析更可靠
+            for item in pending.values():
+                item.future.set_result(None)
+            return
+
+        print(f"批量分析 {len(pending)} 只股票: {', '.join(pending)}")
+        try:
+            # 批次按第一个请求的调用方排队
+            consumer = next(iter(pending.values())).consumer
+            async with self.scheduler.slot(priority, consumer):
+                async for stock_code, value in self.client.stream_sections(
+                        self._build_prompt(list(pending.values())),
+                        Config.SENTIMENT_SYSTEM_PROMPT):
+                    item = pending.pop(stock_code, None)
+                    if item is None or item.future.done():
+                        continue
+                    if isinstance(value, dict) and 'overall_sentiment' in value:
+                        item.future.set_result(value)
+                    else:
+                        item.future.set_result(None)
+        except Exception as e:
+            print(f"批量分析出错: {e}")
+        finally:
+            for item in pending.values():
+                if not item.future.done():
+                    item.future.set_result(None)
@@ -0,0 +1,176 @@
+import math
+import re
+from typing import Dict, Iterable, List, Optional
+from backend.utils.config import Config
+from backend.utils.file_utils import read_json
+from backend.core.news_record import NewsRecord
+
+# 股票简称中与公司本身无关的标记：ST/退市风险警示前缀、注册制标记（-U/-W）和A/B股后缀
+# 简称中的标记只在紧邻汉字时去掉，英文简称（如CATL）的首尾字母不是标记
+_NAME_PREFIX = re.compile(r'^(\*?ST|S\*?ST|N|C)(?=[\u4e00-\u9fff])')
+_NAME_SUFFIX = re.compile(r'(-[UW]+|(?<=[\u4e00-\u9fff])[AB])$')
+_SEPARATORS = re.compile(r'\s+')
+
+
+def _bigrams(text: str) -> List[str]:
+    """把词语切分为字符二元组，中文不分词也能做部分匹配"""
+    text = _SEPARATORS.sub('', text).lower()
+    if len(text) < 2:
+        return [text] if text else []
+    return list(dict.fromkeys(text[i:i + 2] for i in range(len(text) - 1)))
+
+
+def stock_aliases(name: str) -> List[str]:
+    """由股票简称推导新闻中常用的称呼，如"*ST某某"、"某某A"都称为"某某"
+
+    Args:
+        name: 股票简称
+
+    Returns:
+        List[str]: 去重后的称呼列表，包含简称本身
+    """
+    aliases = [name]
+    stripped = _NAME_SUFFIX.sub('', _NAME_PREFIX.sub('', name))
+    if len(stripped) >= 2:
+        aliases.append(stripped)
+    return list(dict.fromkeys(aliases))
+
+
+def cached_industries(stock_code: str) -> List[str]:
+    """从本地成分股缓存中查找股票所属的行业板块，不请求数据源
+
+    Args:
+        stock_code: 股票代码
+
+    Returns:
+        List[str]: 行业板块名称，缓存中没有时为空列表
+    """
+    try:
+        data = read_json(Config.SECTOR_CACHE_DIR / "membership.json") or {}
+    except Exception as e:
+        print(f"读取成分股缓存出错: {e}")
+        return []
+    return [industry for industry, entry in data.get('industries', {}).items()
+            if stock_code in entry.get('codes', ())]
+
+
+class RelevanceRanker:
+    """按与股票的相关度为新闻打分
+
+    查询词分为几组：股票简称及其别名、股票代码、所属行业。每组切分为字符二元组，
+    按BM25的词频饱和与文档长度归一化计算每篇新闻的匹配程度，标题中的命中乘以标题权重；
+    组内各二元组按IDF加权（"中国平安"中的"中国"在新闻里很常见，权重较低）。
+    每组得分在0到1之间，相关度 = max(名称组, 代码组) + 行业权重 × 行业组。
+    """
+
+    def __init__(self, title_boost: float = Config.NEWS_RELEVANCE_TITLE_BOOST,
+                 industry_weight: float = Config.NEWS_RELEVANCE_INDUSTRY_WEIGHT,
+                 k1: float = 1.2, b: float = 0.75):
+        """初始化打分器
+
+        Args:
+            title_boost: 标题命中相对正文命中的倍数
+            industry_weight: 行业组在相关度中的权重
+            k1: BM25词频饱和参数
+            b: BM25文档长度归一化参数
+        """
+        self.title_boost = title_boost
+        self.industry_weight = industry_weight
+        self.k1 = k1
+        self.b = b
+
+    def score(self, news_list: List[NewsRecord], stock_code: str,
+              names: Iterable[str], industries: Iterable[str] = ()) -> List[float]:
+        """计算每篇新闻的相关度
+
+        Args:
+            news_list: 新闻列表
+            stock_code: 股票代码
+            names: 股票简称及别名
+            industries: 所属行业名称
+
+        Returns:
+            List[float]: 与news_list一一对应的相关度
+        """
+        if not news_list:
+            return []
+        name_groups = [_bigrams(name) for name in names if name]
+        industry_groups = [_bigrams(industry) for industry in industries if industry]
+        # 股票代码整体匹配，不切分
+        code_group = [stock_code]
+        terms = {term for group in name_groups + industry_groups + [code_group]
+                 for term in group}
+
+        # 每篇新闻中各查询词的加权词频，以及文档长度
+        titles = [news.title.lower() for news in news_list]
+        contents = [news.content.lower() for news in news_list]
+        lengths = [len(title) * self.title_boost + len(content)
+                   for title, content in zip(titles, contents)]
+        avg_length = sum(lengths) / len(lengths) or 1.0
+        frequencies: List[Dict[str, float]] = []
+        document_counts = dict.fromkeys(terms, 0)
+        for title, content in zip(titles, contents):
+            tf = {}
+            for term in terms:
+                count = title.count(term) * self.title_boost + content.count(term)
+                if count:
+                    tf[term] = count
+                    document_counts[term] += 1
+            frequencies.append(tf)
+
+        total = len(news_list)
+        idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5))
+               for term, n in document_counts.items()}
+        weights = [self._group_weights(group, idf) for group in name_groups]
+        industry_weights = [self._group_weights(group, idf) for group in industry_groups]
+
+        scores = []
+        for tf, length in zip(frequencies, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            saturation = {term: count * (self.k1 + 1) / (count + norm) / (self.k1 + 1)
+                          for term, count in tf.items()}
+            name_score = max((self._group_score(group, saturation) for group in weights),
+                             default=0.0)
+            code_score = saturation.get(stock_code, 0.0)
+            industry_score = max((self._group_score(group, saturation)
+                                  for group in industry_weights), default=0.0)
+            scores.append(max(name_score, code_score)
+                          + self.industry_weight * industry_score)
+        return scores
+
+    @staticmethod
+    def _group_weights(group: List[str], idf: Dict[str, float]) -> Dict[str, float]:
+        """组内各二元组按IDF归一化的权重，权重之和为1"""
+        total = sum(idf[term] for term in group)
+        if total <= 0:
+            return {term: 1.0 / len(group) for term in group}
+        return {term: idf[term] / total for term in group}
+
+    @staticmethod
+    def _group_score(weights: Dict[str, float], saturation: Dict[str, float]) -> float:
+        return sum(weight * saturation.get(term, 0.0) for term, weight in weights.items())
+
+    def select(self, news_list: List[NewsRecord], stock_code: str, names: Iterable[str],
+               industries: Iterable[str] = (), max_news: Optional[int] = None,
+               threshold: float = Config.NEWS_RELEVANCE_THRESHOLD) -> List[NewsRecord]:
+        """只保留相关度不低于阈值的新闻，按相关度从高到低取前max_news条
+
+        Args:
+            news_list: 新闻列表
+            stock_code: 股票代码
+            names: 股票简称及别名
+            industries: 所属行业名称
+            max_news: 最多保留的条数
+            threshold: 相关度阈值
+
+        Returns:
+            List[NewsRecord]: 按相关度从高到低排列的新闻
+        """
+        scores = self.score(news_list, stock_code, names, industries)
+        ranked = sorted(
+            (pair for pair in zip(scores, news_list) if pair[0] >= threshold),
+            key=lambda pair: pair[0], reverse=True
+        )
+        if max_news is not None:
+            ranked = ranked[:max_news]
+        return [news for _, news in ranked]
@@ -0,0 +1,302 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import numpy as np
+from backend.utils.config import Config
+from backend.utils.file_utils import atomic_write_json, read_json, get_lock_path, FileLock
+from backend.core.local_scorer import score_to_label
+
+
+class MembershipTable:
+    """行业板块与指数成分股的本地缓存表
+
+    成分股按需从数据源获取并写入data/sector_cache/membership.json，
+    在有效期内直接使用本地数据，不重复请求。
+    """
+
+    def __init__(self):
+        """初始化成分股缓存表"""
+        self.cache_dir = Config.SECTOR_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_file = self.cache_dir / "membership.json"
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            data = read_json(self.cache_file)
+        except Exception as e:
+            print(f"读取成分股缓存出错: {e}")
+            data = None
+        data = data or {}
+        for section in ('industry_list', 'industries', 'indexes', 'market_caps'):
+            data.setdefault(section, {})
+        return data
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Dict], valid_days: int) -> bool:
+        if not entry or 'date' not in entry:
+            return False
+        cache_date = datetime.strptime(entry['date'], '%Y-%m-%d')
+        return (datetime.now() - cache_date).days <= valid_days
+
+    def _update(self, section: str, key: Optional[str], value: Dict):
+        """写入一项数据，先合并其他进程写入的内容再原子写回"""
+        value = {'date': datetime.now().strftime('%Y-%m-%d'), **value}
+        with FileLock(get_lock_path(self.cache_dir, "membership"),
+                      timeout=Config.CACHE_LOCK_TIMEOUT):
+            with self._lock:
+                self.data = self._load()
+                if key is None:
+                    self.data[section] = value
+                else:
+                    self.data[section][key] = value
+                atomic_write_json(self.cache_file, self.data)
+
+    def get_industries(self) -> List[str]:
+        """获取行业板块名称列表"""
+        entry = self.data['industry_list']
+        if not self._is_fresh(entry, Config.SECTOR_MEMBERSHIP_VALID_DAYS):
+            import akshare as ak
+            board_df = ak.stock_board_industry_name_em()
+            self._update('industry_list', None,
+                         {'names': board_df['板块名称'].tolist()})
+            entry = self.data['industry_list']
+        return entry['names']
+
+    def get_industry_members(self, industry: str) -> Dict[str, float]:
+        """获取行业板块成分股
+
+        Args:
+            industry: 行业板块名称
+
+        Returns:
+            Dict[str, float]: 股票代码到权重的映射（行业内等权）
+        """
+        entry = self.data['industries'].get(industry)
+        if not self._is_fresh(entry, Config.SECTOR_MEMBERSHIP_VALID_DAYS):
+            import akshare as ak
+            cons_df = ak.stock_board_industry_cons_em(symbol=industry)
+            self._update('industries', industry, {'codes': cons_df['代码'].tolist()})
+            entry = self.data['industries'][industry]
+        return {code: 1.0 for code in entry['codes']}
+
+    def get_index_members(self, index_code: str) -> Dict[str, float]:
+        """获取指数成分股及其指数权重
+
+        Args:
+            index_code: 指数代码，如000300（沪深300）
+
+        Returns:
+            Dict[str, float]: 股票代码到指数权重（%）的映射
+        """
+        entry = self.data['indexes'].get(index_code)
+        if not self._is_fresh(entry, Config.SECTOR_MEMBERSHIP_VALID_DAYS):
+            import akshare as ak
+            weight_df = ak.index_stock_cons_weight_csindex(symbol=index_code)
+            self._update('indexes', index_code, {
+                'codes': weight_df['成分券代码'].tolist(),
+                'weights': weight_df['权重'].fillna(0.0).tolist()
+            })
+            entry = self.data['indexes'][index_code]
+        return dict(zip(entry['codes'], entry['weights']))
+
+    def get_market_caps(self) -> Dict[str, float]:
+        """获取全部A股的总市值（按天缓存）"""
+        entry = self.data['market_caps']
+        if not self._is_fresh(entry, 0):
+            import akshare as ak
+            spot_df = ak.stock_zh_a_spot_em()
+            spot_df = spot_df[spot_df['总市值'].notna()]
+            self._update('market_caps', None, {
+                'caps': dict(zip(spot_df['代码'], spot_df['总市值'].astype(float)))
+            })
+            entry = self.data['market_caps']
+        return entry['caps']
+
+
+class SectorAggregator:
+    """行业与指数情感聚合服务
+
+    只使用已有的个股分析结果（情感历史存储中有效期内的最新一次分析）做加权聚合，
+    不为聚合本身调用大模型；可选地在后台为结果过期或缺失的成分股补做分析。
+    """
+
+    WEIGHTINGS = ('equal', 'market_cap', 'index')
+    TOPICS = list(Config.NEWS_TOPICS.keys())
+
+    def __init__(self, news_crawler, sentiment_analyzer, history_store):
+        """初始化聚合服务
+
+        Args:
+            news_crawler: 新闻爬虫实例
+            sentiment_analyzer: 情感分析器实例
+            history_store: 情感历史存储
+        """
+        self.news_crawler = news_crawler
+        self.sentiment_analyzer = sentiment_analyzer
+        self.history_store = history_store
+        self.membership = MembershipTable()
+        self._refreshing: Set[str] = set()
+        # 持有后台刷新任务的引用，避免执行中被垃圾回收
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._refresh_semaphore: Optional[asyncio.Semaphore] = None
+
+    def aggregate_industry(self, industry: str, weighting: str = 'equal') -> Dict:
+        """计算行业板块情感
+
+        Args:
+            industry: 行业板块名称
+            weighting: 加权方式，equal（等权）或market_cap（市值加权）
+
+        Returns:
+            Dict: 聚合结果
+        """
+        if weighting not in ('equal', 'market_cap'):
+            raise ValueError(f"行业聚合不支持的加权方式: {weighting}")
+        members = self.membership.get_industry_members(industry)
+        return {'industry': industry, **self._aggregate(members, weighting)}
+
+    def aggregate_index(self, index_code: str, weighting: str = 'index') -> Dict:
+        """计算指数情感
+
+        Args:
+            index_code: 指数代码
+            weighting: 加权方式，index（指数权重）、equal或market_cap
+
+        Returns:
+            Dict: 聚合结果
+        """
+        if weighting not in self.WEIGHTINGS:
+            raise ValueError(f"不支持的加权方式: {weighting}")
+        members = self.membership.get_index_members(index_code)
+        return {'index_code': index_code, **self._aggregate(members, weighting)}
+
+    def _aggregate(self, members: Dict[str, float], weighting: str) -> Dict:
+        """对成分股的已有分析结果做向量化加权聚合"""
+        codes = list(members.keys())
+        since_date = (datetime.now() - timedelta(days=Config.CACHE_VALID_DAYS)).strftime('%Y-%m-%d')
+        runs = self.history_store.latest_runs(codes, since_date)
+
+        if weighting == 'equal':
+            weights = np.ones(len(codes))
+        elif weighting == 'market_cap':
+            caps = self.membership.get_market_caps()
+            weights = np.array([caps.get(code, np.nan) for code in codes], dtype=float)
+        else:
+            weights = np.array([members[code] for code in codes], dtype=float)
+        weights = np.where(np.isfinite(weights) & (weights > 0), weights, 0.0)
+
+        scores = np.array([
+            runs[code]['overall_score'] if code in runs and runs[code]['overall_score'] is not None
+            else np.nan
+            for code in codes
+        ], dtype=float)
+        topic_scores = np.array([
+            [runs[code]['topic_scores'][topic] if code in runs else None for topic in self.TOPICS]
+            for code in codes
+        ], dtype=float).reshape(len(codes), len(self.TOPICS))
+
+        covered = np.isfinite(scores) & (weights > 0)
+        covered_weights = np.where(covered, weights, 0.0)
+        total_weight = weights.sum()
+        covered_weight = covered_weights.sum()
+        # 有效期内检查过但没有新闻的股票有记录而没有得分，不计入覆盖，也不算过期
+        stale_codes = [code for code, w in zip(codes, weights) if code not in runs and w > 0]
+
+        result = {
+            'weighting': weighting,
+            'constituents': len(codes),
+            'covered': int(covered.sum()),
+            'coverage': round(float(covered_weight / total_weight), 4) if total_weight else 0.0,
+            'stale_codes': stale_codes,
+            'score': None,
+            'label': None,
+            'dispersion': None,
+            'topic_scores': {topic: None for topic in self.TOPICS},
+            'top_constituents': [],
+            'bottom_constituents': []
+        }
+        if covered_weight == 0:
+            return result
+
+        filled_scores = np.where(covered, scores, 0.0)
+        score = float((covered_weights * filled_scores).sum() / covered_weight)
+        variance = float((covered_weights * (filled_scores - score) ** 2).sum() / covered_weight)
+
+        # 主题得分：每个主题只在有该主题得分的成分股上加权
+        topic_valid = np.isfinite(topic_scores) & covered[:, None]
+        topic_weights = np.where(topic_valid, weights[:, None], 0.0)
+        topic_weight_sums = topic_weights.sum(axis=0)
+        topic_means = np.divide(
+            (topic_weights * np.where(topic_valid, topic_scores, 0.0)).sum(axis=0),
+            topic_weight_sums,
+            out=np.full(len(self.TOPICS), np.nan),
+            where=topic_weight_sums > 0
+        )
+
+        covered_idx = np.flatnonzero(covered)
+        order = covered_idx[np.argsort(scores[covered_idx])]
+
+        def describe(i: int) -> Dict:
+            return {
+                'code': codes[i],
+                'score': float(scores[i]),
+                'weight': round(float(weights[i] / covered_weight), 4),
+                'label': runs[codes[i]]['label']
+            }
+
+        result.update({
+            'score': round(score, 4),
+            'label': score_to_label(score),
+            'dispersion': round(float(np.sqrt(variance)), 4),
+            'topic_scores': {
+                topic: (round(float(value), 4) if np.isfinite(value) else None)
+                for topic, value in zip(self.TOPICS, topic_means)
+            },
+            'top_constituents': [describe(i) for i in order[::-1][:5]],
+            'bottom_constituents': [describe(i) for i in order[:5]]
+        })
+        return result
+
+    def schedule_refresh(self, stock_codes: List[str]) -> List[str]:
+        """在后台为过期或缺失结果的成分股补做分析
+
+        已在分析中的股票不会重复调度，单次最多调度Config.SECTOR_REFRESH_MAX_STOCKS只。
+
+        Args:
+            stock_codes: 需要刷新的股票代码
+
+        Returns:
+            List[str]: 本次实际调度的股票代码
+        """
+        if self._refresh_semaphore is None:
+            self._refresh_semaphore = asyncio.Semaphore(Config.SECTOR_REFRESH_CONCURRENCY)
+        scheduled = [code for code in stock_codes if code not in self._refreshing]
+        scheduled = scheduled[:Config.SECTOR_REFRESH_MAX_STOCKS]
+        for code in scheduled:
+            self._refreshing.add(code)
+            task = asyncio.create_task(self._refresh_stock(code))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        return scheduled
+
+    async def _refresh_stock(self, stock_code: str):
+        """分析单只成分股，结果通过情感历史存储进入下一次聚合"""
+        try:
+            async with self._refresh_semaphore:
+                news_list = await asyncio.to_thread(
+                    self.news_crawler.get_stock_news, stock_code)
+                if not news_list:
+                    # 没有新闻时不会产生分析记录，记下本次检查，避免每次聚合都重新调度
+                    await asyncio.to_thread(
+                        self.history_store.record_empty, stock_code)
+                    return
+                await self.sentiment_analyzer.analyze_sentiment(
+                    news_list=news_list, stock_code=stock_code,
+                    priority='background', consumer='sector_refresh')
+        except Exception as e:
+            print(f"刷新成分股{stock_code}分析出错: {e}")
+        finally:
+            self._refreshing.discard(stock_code)
@@ -1,26 +1,59 @@
 import os
+import copy
 import json
+import time
 import asyncio
+import hashlib
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Awaitable, List, Dict, Optional, Tuple, Union
 from backend.utils.config import Config
-from backend.utils.gemini_utils import GeminiClient
-from backend.utils.openai_utils import DeepSeekClient
+from backend.utils.file_utils import atomic_write_json, read_json, get_lock_path, FileLock
+from backend.utils.memory_cache import MemoryCache, expiry_from_cache_date
+from backend.utils.cache_stats import CacheStats
+from backend.utils.deadline import Deadline
+from backend.core.sentiment_history import SentimentHistoryStore
+from backend.core.news_record import NewsRecord, SourceCategory, to_records, sort_by_time
+from backend.core.llm_scheduler import LLMScheduler
+from backend.core.prompt_batcher import PromptBatcher
+from backend.core.local_scorer import LocalSentimentScorer
 import math
 
+# 分析模式：fast为本地打分器，deep为大模型，auto先返回本地结果并在后台补做大模型分析
+ANALYSIS_MODES = ('fast', 'deep', 'auto')
+
 
 class SentimentAnalyzer:
     """情感分析类"""
 
-    def __init__(self):
-        """初始化情感分析器"""
+    def __init__(self, history_store: Optional[SentimentHistoryStore] = None):
+        """初始化情感分析器
+
+        Args:
+            history_store: 情感历史存储，默认新建一个
+        """
         # 确保缓存目录存在
         self.cache_dir = Config.SENTIMENT_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-
-
+        # 磁盘缓存前面的进程内缓存，热门股票直接从内存返回
+        self.memory_cache = MemoryCache(
+            max_bytes=Config.SENTIMENT_MEMORY_CACHE_BYTES,
+            revalidate_seconds=Config.MEMORY_CACHE_REVALIDATE_SECONDS
+        )
+        self.cache_stats = CacheStats()
+        # 每次大模型分析的结果追加到时间序列存储，用于查询历史情感走势
+        self.history_store = history_store or SentimentHistoryStore()
+        # 所有大模型调用按优先级和调用方排队
+        self.scheduler = LLMScheduler()
+
+        # 本地打分器（快速模式，以及大模型不可用时的备选分析）
+        self.local_scorer = LocalSentimentScorer()
+        # 自动模式下后台补做的大模型分析，按缓存键去重
+        self._upgrades: Dict[str, asyncio.Task] = {}
+
+        # 只导入实际使用的大模型SDK
         if Config.DEEPSEEK_API_KEY:
+            from backend.utils.openai_utils import DeepSeekClient
             # 初始化DeepSeek客户端
             self.client = DeepSeekClient(
                 api_key=Config.DEEPSEEK_API_KEY,
@@ -29,6 +62,7 @@ class SentimentAnalyzer:
             self.client_name = Config.DEEPSEEK_MODEL
 
         elif Config.GEMINI_API_KEY:
+            from backend.utils.gemini_utils import GeminiClient
             # 初始化Gemini客户端
             self.client = GeminiClient(
                 api_key=Config.GEMINI_API_KEY,
@@ -38,27 +72,46 @@ class SentimentAnalyzer:
         else:
             raise ValueError("未设置Gemini或DeepSeek API密钥")
 
-            # 关键词配置
-            self.positive_keywords = ['利好', '增长', '突破', '创新高', '获得', '中标', '战略合作']
-            self.negative_keywords = ['下滑', '亏损', '违规', '处罚', '风险', '下跌', '减持']
+        # 批量和后台优先级的分析合并多只股票为一次调用
+        self.batcher = PromptBatcher(self.client, self.scheduler)
+
+    async def warmup(self):
+        """预先建立到大模型服务的连接，失败不影响启动"""
+        try:
+            await self.client.warmup()
+            print(f"已预热 {self.client_name} 连接")
+        except Exception as e:
+            print(f"预热 {self.client_name} 连接失败: {e}")
+
+    async def aclose(self):
+        """取消未完成的后台分析并释放大模型客户端的连接池"""
+        for task in self._upgrades.values():
+            task.cancel()
+        self._upgrades.clear()
+        await self.client.aclose()
 
-    def _generate_cache_key(self, news_list: List[Dict], max_news: int) -> str:
+    def _generate_cache_key(self, news_list: List[NewsRecord], max_news: int,
+                            stock_code: Optional[str] = None) -> str:
         """生成缓存键
 
         Args:
             news_list: 新闻列表
             max_news: 分析的新闻数量
+            stock_code: 股票代码，作为缓存键前缀以便按股票清理缓存
 
         Returns:
             str: 缓存键
         """
-        # 使用新闻内容和参数生成唯一标识
+        # 使用新闻内容摘要和参数生成唯一标识
         news_key = "|".join(
-            f"{news['title']}|{news['publish_time']}"
+            f"{news.digest}|{news.publish_time}"
             for news in news_list[:max_news]  # 只使用实际分析的新闻生成缓存键
         )
-        # 使用abs确保hash值为正数
-        return f"{abs(hash(news_key))}_{max_news}"
+        # 内置hash()在每个进程中随机加盐，多个worker之间无法共享缓存，这里使用稳定的摘要
+        digest = hashlib.md5(news_key.encode('utf-8')).hexdigest()
+        if stock_code:
+            return f"{stock_code}_{digest}_{max_news}"
+        return f"{digest}_{max_news}"
 
     def _get_cache_file_path(self, cache_key: str) -> Path:
         """获取缓存文件路径
@@ -71,52 +124,63 @@ class SentimentAnalyzer:
         """
         return self.cache_dir / f"{cache_key}.json"
 
-    def _load_from_cache(self, news_list: List[Dict], max_news: int) -> Optional[Dict]:
+    def _load_from_cache(self, news_list: List[NewsRecord], max_news: int,
+                         stock_code: Optional[str] = None) -> Optional[Dict]:
         """从缓存加载情感分析结果
 
         Args:
             news_list: 新闻列表
             max_news: 分析的新闻数量
+            stock_code: 股票代码
 
         Returns:
             Optional[Dict]: 缓存的分析结果，如果没有有效缓存则返回None
         """
         try:
-            cache_key = self._generate_cache_key(news_list, max_news)
+            cache_key = self._generate_cache_key(news_list, max_news, stock_code)
             cache_path = self._get_cache_file_path(cache_key)
-
-            if not cache_path.exists():
+            analysis_result = self.memory_cache.get(cache_key, cache_path)
+            if analysis_result is not None:
+                self.cache_stats.record_hit(cache_key)
+                return analysis_result
+
+            # 在读取之前stat，保证记录的mtime不会比读到的内容更新
+            stat = os.stat(cache_path)
+            cache_data = read_json(cache_path)
+            if cache_data is None:
+                self.cache_stats.record_miss()
                 return None
 
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                cache_date = datetime.strptime(cache_data['date'], '%Y-%m-%d')
-                if (datetime.now() - cache_date).days <= Config.CACHE_VALID_DAYS:
-                    return cache_data['analysis_result']
+            cache_date = datetime.strptime(cache_data['date'], '%Y-%m-%d')
+            if (datetime.now() - cache_date).days <= Config.CACHE_VALID_DAYS:
+                self.memory_cache.set(
+                    cache_key, cache_data['analysis_result'],
+                    expires_at=expiry_from_cache_date(
+                        cache_data['date'], Config.CACHE_VALID_DAYS),
+                    path=cache_path, stat=stat
+                )
+                self.cache_stats.record_hit(cache_key)
+                return cache_data['analysis_result']
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"读取情感分析缓存出错: {e}")
+        self.cache_stats.record_miss()
         return None
 
-    def _save_to_cache(self, news_list: List[Dict], max_news: int, analysis_result: Dict):
+    def _save_to_cache(self, news_list: List[NewsRecord], max_news: int, analysis_result: Dict,
+                       stock_code: Optional[str] = None):
         """保存情感分析结果到缓存
 
         Args:
             news_list: 新闻列表
             max_news: 分析的新闻数量
             analysis_result: 分析结果
+            stock_code: 股票代码
         """
         try:
-            cache_key = self._generate_cache_key(news_list, max_news)
+            cache_key = self._generate_cache_key(news_list, max_news, stock_code)
             cache_path = self._get_cache_file_path(cache_key)
-
-            # 打印调试信息
-            print(f"缓存目录: {self.cache_dir}")
-            print(f"缓存目录是否存在: {self.cache_dir.exists()}")
-
-            # 确保缓存目录存在（包括所有父目录）
-            os.makedirs(str(self.cache_dir), exist_ok=True)
-
-            print(f"创建目录后，缓存目录是否存在: {self.cache_dir.exists()}")
             print(f"正在保存缓存到: {cache_path}")
 
             cache_data = {
@@ -124,205 +188,531 @@ class SentimentAnalyzer:
                 'analysis_result': analysis_result
             }
 
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # 先写临时文件再重命名，避免其他worker读到写了一半的文件
+            atomic_write_json(cache_path, cache_data)
+            # 磁盘缓存重写后同步更新内存缓存
+            self.memory_cache.set(
+                cache_key, analysis_result,
+                expires_at=expiry_from_cache_date(
+                    cache_data['date'], Config.CACHE_VALID_DAYS),
+                path=cache_path
+            )
 
             print(f"缓存保存成功: {cache_path}")
         except Exception as e:
             print(f"保存情感分析缓存出错: {e}")
-            print(f"缓存路径: {cache_path}")
-            print(f"缓存目录是否存在: {self.cache_dir.exists()}")
+            print(f"缓存目录: {self.cache_dir}")
             # 打印完整的异常堆栈
             import traceback
             print(f"异常堆栈: {traceback.format_exc()}")
 
-    def _analyze_by_keywords(self, news_list: List[Dict]) -> Dict:
-        """使用关键词进行简单情感分析"""
-        total_score = 0.0
-        risk_factors = []
+    def _get_latest_path(self, stock_code: str) -> Path:
+        """股票最近一次大模型分析的记录，用于增量分析"""
+        return self.cache_dir / f"{stock_code}_latest.json"
 
-        for news in news_list:
-            title = news['title'].lower()
-            content = news['content'].lower()
-            text = title + ' ' + content
-
-            # 计算情感得分
-            positive_count = sum(
-                1 for word in self.positive_keywords if word in text)
-            negative_count = sum(
-                1 for word in self.negative_keywords if word in text)
-
-            # 标题权重加倍
-            title_positive = sum(
-                1 for word in self.positive_keywords if word in title)
-            title_negative = sum(
-                1 for word in self.negative_keywords if word in title)
-
-            # 计算得分并归一化到0-1范围
-            raw_score = (positive_count + title_positive * 2 -
-                         negative_count - title_negative * 2) / 10
-            score = (raw_score + 1) / 2  # 将-1到1的范围转换为0到1
-            score = max(0.0, min(1.0, score))  # 限制在0到1之间
-            total_score += score
-
-            # 收集风险因素
-            for word in self.negative_keywords:
-                if word in text:
-                    risk_factors.append({
-                        "factor": word,
-                        "description": f"新闻中提到{word}相关内容，需要关注",
-                        "severity": "高" if score < 0.2 else "中" if score < 0.5 else "低"
-                    })
-
-        # 计算平均得分
-        avg_score = total_score / \
-                    len(news_list) if news_list else 0.5  # 默认为中性0.5
-
-        # 确定情感标签
-        if avg_score >= 0.85:
-            label = "极度看好"
-        elif avg_score >= 0.65:
-            label = "看好"
-        elif avg_score >= 0.35:
-            label = "中性"
-        elif avg_score >= 0.15:
-            label = "看空"
-        else:
-            label = "极度看空"
-
-        # 生成分析结果
-        return {
-            "overall_sentiment": {
-                "score": avg_score,
-                "label": label,
-                "summary": f"基于关键词分析，新闻整体情感倾向为{label}，得分为{avg_score:.2f}"
-            },
-            "time_analysis": {
-                "trend": [],
-                "trend_prediction": "基于关键词分析无法提供准确的趋势预测"
-            },
-            "topic_analysis": {
-                topic: {
-                    "score": avg_score,
-                    "summary": "基于关键词的简单分析",
-                    "key_points": []
-                } for topic in Config.NEWS_TOPICS.keys()
-            },
-            "source_analysis": {
-                "mainstream_media": {"score": avg_score, "summary": "基于关键词分析"},
-                "industry_media": {"score": avg_score, "summary": "基于关键词分析"},
-                "self_media": {"score": avg_score, "summary": "基于关键词分析"},
-                "official_announcement": {"score": avg_score, "summary": "基于关键词分析"}
-            },
-            "impact_analysis": {
-                "importance_level": "高" if avg_score > 0.8 or avg_score < 0.2 else "中" if avg_score > 0.65 or avg_score < 0.35 else "低",
-                "market_impact": {
-                    # 将0-1范围的偏离中性程度转换为0-1的影响力
-                    "score": abs(avg_score - 0.5) * 2,
-                    "duration": "短期",
-                    "key_factors": []
-                }
-            },
-            "risk_analysis": {
-                "risk_level": "高" if avg_score < 0.35 else "中" if avg_score < 0.65 else "低",
-                "risk_factors": risk_factors[:3]  # 最多返回3个风险因素
-            }
-        }
+    def _save_latest(self, stock_code: Optional[str], news_list: List[NewsRecord],
+                     analysis_result: Dict, delta_count: int):
+        """记录股票最近一次大模型分析的新闻和结果
+
+        Args:
+            stock_code: 股票代码
+            news_list: 分析的新闻
+            analysis_result: 分析结果
+            delta_count: 自上次完整分析以来的增量更新次数
+        """
+        if not stock_code:
+            return
+        try:
+            atomic_write_json(self._get_latest_path(stock_code), {
+                'date': datetime.now().strftime('%Y-%m-%d'),
+                'digests': [news.digest for news in news_list],
+                'delta_count': delta_count,
+                'analysis_result': analysis_result
+            })
+        except Exception as e:
+            print(f"保存最近分析记录出错: {e}")
+
+    @staticmethod
+    def _compress_analysis(analysis_result: Dict) -> str:
+        """把分析结果压缩为紧凑的JSON：去掉缩进和空白，浮点数保留两位小数"""
+        def compact(value):
+            if isinstance(value, float):
+                return round(value, 2)
+            if isinstance(value, dict):
+                return {key: compact(item) for key, item in value.items()
+                        if item not in ('', [], {}, None)}
+            if isinstance(value, list):
+                return [compact(item) for item in value]
+            return value
+        return json.dumps(compact(analysis_result), ensure_ascii=False, separators=(',', ':'))
+
+    async def _try_delta_update(self, news_list: List[NewsRecord], stock_code: Optional[str],
+                                priority: str, consumer: str) -> Optional[Tuple[Dict, int]]:
+        """在上次分析的基础上只分析新增新闻
+
+        只有当天已有完整或增量分析、新增新闻不超过Config.DELTA_MAX_NEW_ARTICLES条、
+        且连续增量更新次数未达到Config.DELTA_MAX_UPDATES时才进行，否则返回None由调用方完整分析。
+
+        Args:
+            news_list: 当前的新闻列表
+            stock_code: 股票代码
+            priority: 大模型调用优先级
+            consumer: 调用方标识
+
+        Returns:
+            Optional[Tuple[Dict, int]]: (修订后的分析结果, 增量更新次数)，无法增量分析时返回None
+        """
+        if not stock_code or Config.DELTA_MAX_UPDATES <= 0:
+            return None
+        try:
+            latest = read_json(self._get_latest_path(stock_code))
+        except Exception as e:
+            print(f"读取最近分析记录出错: {e}")
+            return None
+        if latest is None:
+            return None
+        if latest['date'] != datetime.now().strftime('%Y-%m-%d'):
+            print("最近一次分析不是今天的，完整重新分析")
+            return None
+        if latest['delta_count'] >= Config.DELTA_MAX_UPDATES:
+            print(f"已连续增量更新{latest['delta_count']}次，完整重新分析")
+            return None
+        known = set(latest['digests'])
+        added = [news for news in news_list if news.digest not in known]
+        if not added or len(added) > Config.DELTA_MAX_NEW_ARTICLES:
+            return None
+
+        print(f"增量分析：在上次结果基础上分析新增的{len(added)}条新闻")
+        previous = latest['analysis_result']
+        prompt = Config.SENTIMENT_DELTA_PROMPT.format(
+            previous_analysis=self._compress_analysis(previous),
+            news_content=self._format_news_content(added)
+        )
+        revised = {}
+        try:
+            async with self.scheduler.slot(priority, consumer):
+                async for key, value in self.client.stream_sections(
+                        prompt, Config.SENTIMENT_SYSTEM_PROMPT):
+                    revised[key] = value
+        except Exception as e:
+            print(f"增量分析出错，改为完整分析: {e}")
+            return None
+        if 'overall_sentiment' not in revised:
+            print("增量分析结果缺少overall_sentiment，改为完整分析")
+            return None
+        # 模型省略的维度沿用上次的结果
+        return {**previous, **revised}, latest['delta_count'] + 1
+
+    def _record_history(self, stock_code: Optional[str], analysis_result: Dict,
+                        news_list: List[NewsRecord]):
+        """把分析结果追加到情感历史存储，失败不影响分析结果返回"""
+        if not stock_code:
+            return
+        try:
+            self.history_store.record(stock_code, analysis_result, news_list)
+        except Exception as e:
+            print(f"记录情感历史出错: {e}")
+
+    def _analyze_by_keywords(self, news_list: List[NewsRecord]) -> Dict:
+        """使用本地情感词典快速分析（快速模式，以及大模型不可用时的备选分析）"""
+        return self.local_scorer.analyze(news_list)
 
     async def analyze_sentiment(
             self,
-            news_list: List[Dict],
+            news_list: List[Union[NewsRecord, Dict]],
+            stock_code: Optional[str] = None,
+            priority: str = 'interactive',
+            consumer: str = 'default',
+            mode: str = 'deep'
     ) -> Dict:
         """分析新闻情感
 
         Args:
             news_list: 新闻列表
+            stock_code: 股票代码，用于按股票组织缓存
+            priority: 大模型调用优先级，interactive、batch或background
+            consumer: 调用方标识，同一优先级内按调用方公平排队
+            mode: 分析模式，见stream_sentiment
 
         Returns:
             Dict: 情感分析结果，包含多维度分析
         """
+        result = None
+        async for event in self.stream_sentiment(news_list, stock_code, priority, consumer, mode):
+            if event['type'] == 'result':
+                result = event['data']
+        return result
+
+    async def stream_sentiment(
+            self,
+            news_list: List[Union[NewsRecord, Dict]],
+            stock_code: Optional[str] = None,
+            priority: str = 'interactive',
+            consumer: str = 'default',
+            mode: str = 'deep'
+    ) -> AsyncIterator[Dict]:
+        """流式分析新闻情感
+
+        大模型每完成一个顶层分析维度（overall_sentiment、time_analysis等）就立即产出，
+        调用方无需等待整个响应结束；命中缓存时依次产出缓存中的各个维度。
+
+        Args:
+            news_list: 新闻列表，也可以是与API响应中news_analysis格式相同的新闻字典
+            stock_code: 股票代码，用于按股票组织缓存
+            priority: 大模型调用优先级，interactive、batch或background
+            consumer: 调用方标识，同一优先级内按调用方公平排队
+            mode: 分析模式
+                - deep: 调用大模型分析（默认）
+                - fast: 没有大模型分析缓存时用本地打分器分析，毫秒级返回
+                - auto: 同fast，并在后台以background优先级补做大模型分析写入缓存，
+                  之后的请求直接得到大模型结果
+
+        Yields:
+            Dict: 分析事件
+                - {'type': 'section', 'key': 维度名, 'data': 该维度的分析结果}
+                - {'type': 'result', 'data': 格式化后的完整结果}，总是最后一个事件
+        """
         print(f"开始情感分析，新闻数量: {len(news_list)}")
 
         if not news_list:
             print("没有新闻数据可供分析")
-            return self._format_response({
+            yield {'type': 'result', 'data': self._format_response({
                 'overall_sentiment': {
                     'score': 0.0,
                     'label': '中性',
                     'summary': '没有可分析的新闻',
                     'market_expectation': ''
                 }
-            }, [])
+            }, [])}
+            return
 
-        # 按时间排序新闻
-        news_to_analyze = sorted(
-            news_list,
-            key=lambda x: x['publish_time'],
-            reverse=True
-        )
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"未知的分析模式: {mode}")
+
+        # 按时间排序新闻（爬虫返回的新闻已经有序）
+        news_to_analyze = sort_by_time(to_records(news_list))
 
         print(f"将分析 {len(news_to_analyze)} 条新闻")
 
         # 尝试加载缓存
         cached_result = self._load_from_cache(
-            news_to_analyze, len(news_to_analyze))
+            news_to_analyze, len(news_to_analyze), stock_code)
         if cached_result is not None:
             print("使用缓存的分析结果")
-            return self._format_response(cached_result, news_to_analyze)
+            for event in self._cached_events(cached_result, news_to_analyze):
+                yield event
+            return
+
+        if mode != 'deep':
+            print("使用本地打分器快速分析")
+            if mode == 'auto' and stock_code:
+                self._schedule_upgrade(news_to_analyze, stock_code, consumer)
+            for event in self._cached_events(self._analyze_by_keywords(news_to_analyze),
+                                             news_to_analyze, analysis_mode='fast'):
+                yield event
+            return
+
+        # 相同新闻集合同一时间只允许一个进程调用大模型，其他进程等待后直接复用其缓存结果
+        cache_key = self._generate_cache_key(
+            news_to_analyze, len(news_to_analyze), stock_code)
+        async with FileLock(get_lock_path(self.cache_dir, cache_key),
+                            timeout=Config.CACHE_LOCK_TIMEOUT) as lock:
+            if lock.waited:
+                cached_result = self._load_from_cache(
+                    news_to_analyze, len(news_to_analyze), stock_code)
+                if cached_result is not None:
+                    print("使用其他进程写入的缓存分析结果")
+                    for event in self._cached_events(cached_result, news_to_analyze):
+                        yield event
+                    return
+            async for event in self._stream_with_llm(
+                    news_to_analyze, stock_code, priority, consumer):
+                yield event
+
+    def _schedule_upgrade(self, news_list: List[NewsRecord], stock_code: str, consumer: str):
+        """在后台补做大模型分析并写入缓存，同一新闻集合同时只有一个"""
+        cache_key = self._generate_cache_key(news_list, len(news_list), stock_code)
+        if cache_key in self._upgrades:
+            return
+
+        async def upgrade():
+            try:
+                await self.analyze_sentiment(news_list, stock_code, priority='background',
+                                             consumer=consumer, mode='deep')
+                print(f"已在后台完成 {stock_code} 的大模型分析")
+            except Exception as e:
+                print(f"后台大模型分析 {stock_code} 出错: {e}")
+            finally:
+                self._upgrades.pop(cache_key, None)
+
+        self._upgrades[cache_key] = asyncio.create_task(upgrade())
+
+    async def analyze_within_deadline(self, analysis: Awaitable[Dict],
+                                      news_list: List[Union[NewsRecord, Dict]],
+                                      stock_code: Optional[str], deadline: Deadline) -> Dict:
+        """在截止时间内等待大模型分析，来不及时返回本地打分器的结果
+
+        本地打分器与大模型分析同时开始；大模型分析在截止时间前完成（或出错）时返回其结果，
+        否则返回本地结果（analysis_mode为fast，deadline_exceeded为True），
+        大模型分析在后台继续完成并写入缓存，之后的请求直接命中缓存。
+
+        Args:
+            analysis: 大模型分析，如analyze_sentiment(..., mode='deep')的协程
+            news_list: 新闻列表
+            stock_code: 股票代码
+            deadline: 请求的截止时间
 
+        Returns:
+            Dict: 格式化后的分析结果
+        """
+        news_to_analyze = sort_by_time(to_records(news_list))
+        task = asyncio.ensure_future(analysis)
+        local = asyncio.ensure_future(asyncio.to_thread(
+            self._analyze_by_keywords, news_to_analyze))
         try:
-            # 准备新闻内容
-            news_content = "\n\n".join([
-                f"标题：{news['title']}\n"
-                f"来源：{news['source']}\n"
-                f"时间：{news['publish_time']}\n"
-                f"内容：{news['content']}"
-                for news in news_to_analyze
-            ])
+            return await asyncio.wait_for(
+                asyncio.shield(task), deadline.remaining(Config.DEADLINE_FORMAT_RESERVE_SECONDS))
+        except asyncio.TimeoutError:
+            print("大模型分析未能在截止时间内完成，返回本地打分器结果，大模型分析在后台继续")
+            self._continue_in_background(task, news_to_analyze, stock_code)
+        local_result = await local
+        return {**self._format_response(local_result, news_to_analyze, analysis_mode='fast'),
+                'deadline_exceeded': True}
+
+    async def stream_within_deadline(self, events: AsyncIterator[Dict],
+                                     news_list: List[Union[NewsRecord, Dict]],
+                                     stock_code: Optional[str],
+                                     deadline: Deadline) -> AsyncIterator[Dict]:
+        """流式版本的analyze_within_deadline
+
+        截止时间前逐个转发大模型分析的事件；到达截止时间时还没有得到result事件，
+        则以本地打分器的结果（analysis_mode为fast，deadline_exceeded为True）作为result事件结束，
+        已推送的维度不受影响。大模型分析在后台继续完成并写入缓存，客户端提前断开时同样如此。
 
-            print("已准备新闻内容用于分析")
+        Args:
+            events: 大模型分析的事件流，如stream_sentiment(..., mode='deep')
+            news_list: 新闻列表
+            stock_code: 股票代码
+            deadline: 请求的截止时间
+
+        Yields:
+            Dict: 分析事件，格式同stream_sentiment
+        """
+        news_to_analyze = sort_by_time(to_records(news_list))
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            async for event in events:
+                queue.put_nowait(event)
+
+        # 事件流在独立的任务中消费，截止时间后可以在后台继续
+        task = asyncio.ensure_future(pump())
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), deadline.remaining(Config.DEADLINE_FORMAT_RESERVE_SECONDS))
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    # 事件流没有result就结束了，分析出错时在这里抛出
+                    task.result()
+                    return
+                yield event
+                if event['type'] == 'result':
+                    # result之后事件流只剩释放文件锁等收尾
+                    await task
+                    return
+            print("大模型分析未能在截止时间内完成，返回本地打分器结果，大模型分析在后台继续")
+            # 本地打分器是毫秒级的，在截止时间到达后再计算，预留的格式化时间足够
+            local_result = await asyncio.to_thread(self._analyze_by_keywords, news_to_analyze)
+            yield {'type': 'result', 'data': {
+                **self._format_response(local_result, news_to_analyze, analysis_mode='fast'),
+                'deadline_exceeded': True
+            }}
+        finally:
+            if not task.done():
+                self._continue_in_background(task, news_to_analyze, stock_code)
+
+    def _continue_in_background(self, task: asyncio.Future, news_list: List[NewsRecord],
+                                stock_code: Optional[str]):
+        """超过截止时间的大模型分析在后台继续，与自动模式的后台分析共用去重和关闭时的取消"""
+        cache_key = self._generate_cache_key(news_list, len(news_list), stock_code)
+        self._upgrades.setdefault(cache_key, task)
+
+        def done(finished: asyncio.Future):
+            if self._upgrades.get(cache_key) is finished:
+                self._upgrades.pop(cache_key, None)
+            if finished.cancelled():
+                return
+            if finished.exception() is not None:
+                print(f"后台大模型分析 {stock_code} 出错: {finished.exception()}")
+            else:
+                print(f"已在后台完成 {stock_code} 的大模型分析")
+
+        task.add_done_callback(done)
+
+    def get_cached_analysis(self, news_list: List[Union[NewsRecord, Dict]],
+                            stock_code: Optional[str] = None) -> Optional[Dict]:
+        """只从缓存获取分析结果，不调用大模型
 
-            # 使用模板构建提示词
-            prompt = Config.SENTIMENT_PROMPT.format(news_content=news_content)
-            print(prompt)
-            print("已构建分析提示词")
+        Args:
+            news_list: 新闻列表
+            stock_code: 股票代码
 
-            #  try:
-            print(f"开始调用 {self.client_name} API 进行分析...")
-            # 使用大模型Client进行分析
-            analysis_result = await self.client.analyze_sentiment(prompt)
-            print("大模型 API 分析完成，结果类型:", type(analysis_result))
+        Returns:
+            Optional[Dict]: 格式化后的分析结果，没有有效缓存时返回None
+        """
+        if not news_list:
+            return None
+        news_to_analyze = sort_by_time(to_records(news_list))
+        cached_result = self._load_from_cache(
+            news_to_analyze, len(news_to_analyze), stock_code)
+        if cached_result is None:
+            return None
+        return self._format_response(cached_result, news_to_analyze)
+
+    def get_stale_analysis(self, news_list: List[Union[NewsRecord, Dict]],
+                           stock_code: str) -> Optional[Dict]:
+        """获取股票最近一次的大模型分析结果，不要求与当前新闻一致，用于过载时降级返回
+
+        Args:
+            news_list: 当前的新闻列表
+            stock_code: 股票代码
+
+        Returns:
+            Optional[Dict]: 格式化后的分析结果，没有记录时返回None
+        """
+        try:
+            latest = read_json(self._get_latest_path(stock_code))
+        except Exception as e:
+            print(f"读取最近分析记录出错: {e}")
+            return None
+        if latest is None:
+            return None
+        news_to_analyze = sort_by_time(to_records(news_list))
+        return self._format_response(latest['analysis_result'], news_to_analyze)
+
+    def _cached_events(self, analysis_result: Dict, news_list: List[NewsRecord],
+                       analysis_mode: str = 'deep') -> List[Dict]:
+        """把已有的分析结果转换为流式事件"""
+        events = [
+            {'type': 'section', 'key': key, 'data': value}
+            for key, value in analysis_result.items()
+        ]
+        events.append({
+            'type': 'result',
+            'data': self._format_response(analysis_result, news_list, analysis_mode)
+        })
+        return events
+
+    @staticmethod
+    def _format_news_content(news_list: List[NewsRecord]) -> str:
+        """把新闻列表格式化为提示词中的新闻内容"""
+        return "\n\n".join([
+            f"标题：{news.title}\n"
+            f"来源：{news.source}\n"
+            f"时间：{news.publish_time}\n"
+            f"内容：{news.content}"
+            for news in news_list
+        ])
+
+    async def _stream_with_llm(self, news_to_analyze: List[NewsRecord],
+                               stock_code: Optional[str] = None,
+                               priority: str = 'interactive',
+                               consumer: str = 'default') -> AsyncIterator[Dict]:
+        """流式调用大模型分析新闻并写入缓存
+
+        响应被截断或中途出错时，若overall_sentiment已经完成，则用已完成的维度作为部分结果
+        （不写入缓存）；否则降级为关键词分析。
+
+        Args:
+            news_to_analyze: 按时间倒序排列的新闻列表
+            stock_code: 股票代码
+            priority: 大模型调用优先级
+            consumer: 调用方标识
+
+        Yields:
+            Dict: 分析事件，格式同stream_sentiment
+        """
+        analysis_result = {}
+        try:
+            # 准备新闻内容
+            news_content = self._format_news_content(news_to_analyze)
+            print("已准备新闻内容用于分析")
+
+            # 当天已有分析且只新增了少量新闻时，只把新增的新闻发给大模型
+            delta = await self._try_delta_update(news_to_analyze, stock_code, priority, consumer)
+            delta_count = 0
+
+            batched = None
+            if (delta is None and priority != 'interactive' and stock_code
+                    and Config.LLM_BATCH_MAX_STOCKS > 1):
+                # 非交互请求与其他股票合并为一次调用
+                batched = await self.batcher.analyze(
+                    stock_code, news_content, priority, consumer)
+                if batched is None:
+                    print(f"股票 {stock_code} 未能批量分析，改为单独分析")
+
+            if delta is not None or batched is not None:
+                analysis_result, delta_count = delta if delta is not None else (batched, 0)
+                for key, value in analysis_result.items():
+                    yield {'type': 'section', 'key': key, 'data': value}
+            else:
+                # 使用模板构建提示词
+                prompt = Config.SENTIMENT_NEWS_PROMPT.format(news_content=news_content)
+                print(prompt)
+                print("已构建分析提示词")
+
+                # 等待调度器分配调用名额
+                async with self.scheduler.slot(priority, consumer):
+                    print(f"开始调用 {self.client_name} API 进行分析...")
+                    # 使用大模型Client流式分析，每个维度完成后立即产出
+                    async for key, value in self.client.stream_sections(
+                            prompt, Config.SENTIMENT_SYSTEM_PROMPT):
+                        analysis_result[key] = value
+                        print(f"已完成分析维度: {key}")
+                        yield {'type': 'section', 'key': key, 'data': value}
+            print("大模型 API 分析完成")
             print("分析结果:", json.dumps(
                 analysis_result, ensure_ascii=False, indent=2))
 
+            if 'overall_sentiment' not in analysis_result:
+                raise ValueError("大模型响应缺少overall_sentiment")
+
             # 保存缓存
             print("正在保存分析结果到缓存...")
             self._save_to_cache(news_to_analyze, len(
-                news_to_analyze), analysis_result)
-            # except Exception as e:
-            #  print(f"大模型 API分析失败，详细错误: {str(e)}")
-            #  print("使用关键词分析作为备选方案")
-            #  # 如果API调用失败，使用关键词分析
-            #  analysis_result = self._analyze_by_keywords(news_to_analyze)
+                news_to_analyze), analysis_result, stock_code)
+            self._save_latest(stock_code, news_to_analyze, analysis_result, delta_count)
+            self._record_history(stock_code, analysis_result, news_to_analyze)
 
             # 格式化响应
             print("正在格式化分析结果...")
             formatted_result = self._format_response(
                 analysis_result, news_to_analyze)
             print("格式化完成")
-            return formatted_result
 
         except Exception as e:
             print(f"情感分析过程中出错: {str(e)}")
             print("错误的完整堆栈跟踪:")
             import traceback
             print(traceback.format_exc())
-            # 发生错误时使用关键词分析作为备选方案
-            print("使用关键词分析作为备选方案")
-            analysis_result = self._analyze_by_keywords(news_to_analyze)
-            return self._format_response(analysis_result, news_to_analyze)
-
-    def _calculate_confidence_index(self, news_list: List[Dict], analysis_result: Dict) -> float:
+            if 'overall_sentiment' in analysis_result:
+                # 响应被截断时保留已经完成的维度，部分结果不写入缓存
+                print(f"使用已完成的 {len(analysis_result)} 个分析维度作为部分结果")
+                formatted_result = self._format_response(
+                    analysis_result, news_to_analyze)
+            else:
+                # 发生错误时使用关键词分析作为备选方案
+                print("使用关键词分析作为备选方案")
+                formatted_result = self._format_response(
+                    self._analyze_by_keywords(news_to_analyze), news_to_analyze, 'fast')
+
+        yield {'type': 'result', 'data': formatted_result}
+
+    def _calculate_confidence_index(self, news_list: List[NewsRecord], analysis_result: Dict) -> float:
         """计算置信度指数
 
         基于以下因素计算：
@@ -338,32 +728,21 @@ class SentimentAnalyzer:
 
         # 1. 计算来源可靠性得分
         source_weights = {
-            'official_announcement': 1.0,  # 官方公告
-            'mainstream_media': 0.8,  # 主流媒体
-            'industry_media': 0.6,  # 行业媒体
-            'self_media': 0.4  # 自媒体
+            SourceCategory.OFFICIAL_ANNOUNCEMENT: 1.0,  # 官方公告
+            SourceCategory.MAINSTREAM_MEDIA: 0.8,  # 主流媒体
+            SourceCategory.INDUSTRY_MEDIA: 0.6,  # 行业媒体
+            SourceCategory.SELF_MEDIA: 0.4  # 自媒体
         }
 
-        source_scores = []
-        for news in news_list:
-            source_type = 'self_media'  # 默认为自媒体
-            if '公告' in news['source'] or '互动易' in news['source']:
-                source_type = 'official_announcement'
-            elif any(media in news['source'] for media in ['新闻', '日报', '时报']):
-                source_type = 'mainstream_media'
-            elif any(media in news['source'] for media in ['证券', '财经', '金融']):
-                source_type = 'industry_media'
-            source_scores.append(source_weights[source_type])
+        source_scores = [source_weights[news.source_category] for news in news_list]
 
         source_reliability = sum(source_scores) / len(source_scores)
 
         # 2. 计算时效性得分
-        current_time = datetime.now()
+        current_time = time.time()
         time_scores = []
         for news in news_list:
-            news_time = datetime.strptime(
-                news['publish_time'], '%Y-%m-%d %H:%M:%S')
-            days_diff = (current_time - news_time).days
+            days_diff = int((current_time - news.timestamp) // 86400)
             # 使用指数衰减，7天以内的新闻时效性较高
             time_score = max(0.2, min(1.0, math.exp(-days_diff / 7)))
             time_scores.append(time_score)
@@ -423,8 +802,17 @@ class SentimentAnalyzer:
             # 忽略其他格式
         return formatted_events
 
-    def _format_response(self, analysis_result: Dict, news_list: List[Dict]) -> Dict:
-        """格式化API响应"""
+    def _format_response(self, analysis_result: Dict, news_list: List[NewsRecord],
+                         analysis_mode: str = 'deep') -> Dict:
+        """格式化API响应
+
+        Args:
+            analysis_result: 大模型或本地打分器的分析结果
+            news_list: 分析的新闻
+            analysis_mode: 结果来源，deep为大模型分析，fast为本地打分器
+        """
+        # 传入的结果可能是内存缓存中共享的对象，格式化会修改嵌套的列表（如key_events），先深拷贝
+        analysis_result = copy.deepcopy(analysis_result)
         print("开始格式化响应...")
         print("输入的 analysis_result 类型:", type(analysis_result))
         print("输入的 analysis_result 内容:", json.dumps(
@@ -432,8 +820,7 @@ class SentimentAnalyzer:
 
         try:
             # 获取分析时间范围
-            dates = [datetime.strptime(
-                news['publish_time'], '%Y-%m-%d %H:%M:%S') for news in news_list]
+            dates = [news.date for news in news_list]
             start_date = min(dates) if dates else None
             end_date = max(dates) if dates else None
 
@@ -473,8 +860,8 @@ class SentimentAnalyzer:
                     'market_expectation': analysis_result['overall_sentiment'].get('market_expectation', ''),
                     'investor_sentiment': analysis_result['overall_sentiment'].get('investor_sentiment', '无'),
                     'analysis_period': {
-                        'start_date': start_date.strftime('%Y-%m-%d') if start_date else None,
-                        'end_date': end_date.strftime('%Y-%m-%d') if end_date else None
+                        'start_date': start_date,
+                        'end_date': end_date
                     },
                     'confidence_index': confidence_index
                 },
@@ -507,7 +894,8 @@ class SentimentAnalyzer:
                     'risk_level': '中',
                     'risk_factors': []
                 }),
-                'news_analysis': news_list
+                'news_analysis': [news.to_dict() for news in news_list],
+                'analysis_mode': analysis_mode
             }
 
             print("响应格式化成功")
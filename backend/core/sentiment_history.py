@@ -0,0 +1,255 @@
+import time
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord
+
+
+class SentimentHistoryStore:
+    """按股票记录每日情感得分的时间序列存储（SQLite，只追加）
+
+    每次大模型分析完成后追加一条运行记录（整体得分、置信度、各主题得分、新闻数）
+    以及该次分析中按日期的得分。同一股票同一日期被多次分析时，查询取最新一次的结果。
+    数据库使用WAL模式，多个worker可以同时读写。
+    """
+
+    TOPICS = list(Config.NEWS_TOPICS.keys())
+
+    def __init__(self, db_path: Path = None):
+        """初始化时间序列存储
+
+        Args:
+            db_path: 数据库文件路径，默认Config.SENTIMENT_HISTORY_DB
+        """
+        self.db_path = Path(db_path or Config.SENTIMENT_HISTORY_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        """创建表和索引"""
+        topic_columns = ",\n".join(f"    topic_{topic} REAL" for topic in self.TOPICS)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+CREATE TABLE IF NOT EXISTS sentiment_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stock_code TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    overall_score REAL,
+    label TEXT,
+    confidence REAL,
+    article_count INTEGER,
+    start_date TEXT,
+    end_date TEXT,
+{topic_columns}
+)""")
+            conn.execute("""
+CREATE TABLE IF NOT EXISTS daily_scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    stock_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score REAL NOT NULL,
+    article_count INTEGER NOT NULL
+)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_stock_date "
+                         "ON sentiment_runs (stock_code, run_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_stock_date "
+                         "ON daily_scores (stock_code, date)")
+
+    def record(self, stock_code: str, analysis_result: Dict, news_list: List[NewsRecord]):
+        """追加一次分析结果
+
+        Args:
+            stock_code: 股票代码
+            analysis_result: 大模型返回的原始分析结果
+            news_list: 参与分析的新闻列表
+        """
+        overall = analysis_result.get('overall_sentiment', {})
+        topics = analysis_result.get('topic_analysis', {})
+        dates = [news.date for news in news_list]
+        articles_per_date = Counter(dates)
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"""INSERT INTO sentiment_runs (
+                    stock_code, run_date, run_at, overall_score, label, confidence,
+                    article_count, start_date, end_date,
+                    {', '.join(f'topic_{topic}' for topic in self.TOPICS)}
+                ) VALUES ({', '.join(['?'] * (9 + len(self.TOPICS)))})""",
+                [
+                    stock_code,
+                    datetime.now().strftime('%Y-%m-%d'),
+                    time.time(),
+                    _to_float(overall.get('score')),
+                    overall.get('label'),
+                    _to_float(overall.get('confidence_index')),
+                    len(news_list),
+                    min(dates) if dates else None,
+                    max(dates) if dates else None,
+                    *[_to_float(topics.get(topic, {}).get('score')) for topic in self.TOPICS]
+                ]
+            )
+            run_id = cursor.lastrowid
+            daily_rows = []
+            for trend in analysis_result.get('time_analysis', {}).get('trend', []):
+                score = _to_float(trend.get('score'))
+                if score is None or not trend.get('date'):
+                    continue
+                daily_rows.append((run_id, stock_code, trend['date'], score,
+                                   articles_per_date.get(trend['date'], 0)))
+            conn.executemany(
+                "INSERT INTO daily_scores (run_id, stock_code, date, score, article_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                daily_rows
+            )
+
+    def record_empty(self, stock_code: str):
+        """记录一次没有新闻可分析的检查，各项得分为空
+
+        latest_runs会返回这条记录，聚合时该股票视为结果有效但没有得分。
+
+        Args:
+            stock_code: 股票代码
+        """
+        self.record(stock_code, {}, [])
+
+    def query(self, stock_code: str, start_date: str, end_date: str,
+              windows: Iterable[int] = (1, 3, 7, 30)) -> Dict:
+        """查询股票在日期范围内的情感历史及滚动聚合
+
+        Args:
+            stock_code: 股票代码
+            start_date: 开始日期（YYYY-MM-DD，含）
+            end_date: 结束日期（YYYY-MM-DD，含）
+            windows: 滚动窗口天数，以end_date为窗口终点
+
+        Returns:
+            Dict: 包含daily（每日最新得分）、runs（每个分析日最新一次的整体结果）和rolling
+        """
+        windows = sorted(set(windows))
+        # 滚动窗口可能早于start_date，多取一段数据
+        lookback_start = min(
+            start_date,
+            (datetime.strptime(end_date, '%Y-%m-%d')
+             - timedelta(days=max(windows, default=1) - 1)).strftime('%Y-%m-%d')
+        )
+
+        with self._connect() as conn:
+            # SQLite中与MAX()同时查询的裸列取自MAX所在的行，即每个日期最新一次的分析
+            daily_rows = conn.execute(
+                """SELECT date, score, article_count, MAX(id) AS latest_id
+                   FROM daily_scores
+                   WHERE stock_code = ? AND date BETWEEN ? AND ?
+                   GROUP BY date ORDER BY date""",
+                (stock_code, lookback_start, end_date)
+            ).fetchall()
+            run_rows = conn.execute(
+                f"""SELECT run_date, overall_score, label, confidence, article_count,
+                          {', '.join(f'topic_{topic}' for topic in self.TOPICS)},
+                          MAX(id) AS latest_id
+                   FROM sentiment_runs
+                   WHERE stock_code = ? AND run_date BETWEEN ? AND ?
+                   GROUP BY run_date ORDER BY run_date""",
+                (stock_code, start_date, end_date)
+            ).fetchall()
+
+        daily = [
+            {'date': row['date'], 'score': row['score'], 'article_count': row['article_count']}
+            for row in daily_rows
+        ]
+        runs = [
+            {
+                'date': row['run_date'],
+                'overall_score': row['overall_score'],
+                'label': row['label'],
+                'confidence': row['confidence'],
+                'article_count': row['article_count'],
+                'topic_scores': {topic: row[f'topic_{topic}'] for topic in self.TOPICS}
+            }
+            for row in run_rows
+        ]
+
+        return {
+            'stock_code': stock_code,
+            'start_date': start_date,
+            'end_date': end_date,
+            'daily': [item for item in daily if item['date'] >= start_date],
+            'runs': runs,
+            'rolling': {
+                f"{window}d": self._aggregate(daily, end_date, window)
+                for window in windows
+            }
+        }
+
+    def latest_runs(self, stock_codes: List[str], since_date: str) -> Dict[str, Dict]:
+        """批量获取多只股票自since_date以来最新一次的分析结果
+
+        Args:
+            stock_codes: 股票代码列表
+            since_date: 最早分析日期（YYYY-MM-DD，含）
+
+        Returns:
+            Dict[str, Dict]: 股票代码到最新分析结果的映射，没有记录的股票不包含在内
+        """
+        results = {}
+        # SQLite单条语句的参数个数有限，分批查询
+        for i in range(0, len(stock_codes), 500):
+            batch = stock_codes[i:i + 500]
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"""SELECT stock_code, run_date, overall_score, label, confidence,
+                              {', '.join(f'topic_{topic}' for topic in self.TOPICS)},
+                              MAX(id) AS latest_id
+                       FROM sentiment_runs
+                       WHERE run_date >= ? AND stock_code IN ({', '.join(['?'] * len(batch))})
+                       GROUP BY stock_code""",
+                    (since_date, *batch)
+                ).fetchall()
+            for row in rows:
+                results[row['stock_code']] = {
+                    'run_date': row['run_date'],
+                    'overall_score': row['overall_score'],
+                    'label': row['label'],
+                    'confidence': row['confidence'],
+                    'topic_scores': {topic: row[f'topic_{topic}'] for topic in self.TOPICS}
+                }
+        return results
+
+    @staticmethod
+    def _aggregate(daily: List[Dict], end_date: str, window: int) -> Dict:
+        """计算以end_date为终点、长度为window天的聚合"""
+        window_start = (datetime.strptime(end_date, '%Y-%m-%d')
+                        - timedelta(days=window - 1)).strftime('%Y-%m-%d')
+        items = [item for item in daily if window_start <= item['date'] <= end_date]
+        if not items:
+            return {'days': 0, 'articles': 0, 'mean_score': None, 'weighted_score': None}
+        articles = sum(item['article_count'] for item in items)
+        mean_score = sum(item['score'] for item in items) / len(items)
+        weighted_score = (
+            sum(item['score'] * item['article_count'] for item in items) / articles
+            if articles else mean_score
+        )
+        return {
+            'days': len(items),
+            'articles': articles,
+            'mean_score': round(mean_score, 4),
+            'weighted_score': round(weighted_score, 4)
+        }
+
+
+def _to_float(value) -> Optional[float]:
+    """把大模型返回的数值转换为float，无法转换（如"无"）时返回None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
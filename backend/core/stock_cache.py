@@ -1,85 +1,132 @@
 import os
-import json
-from pathlib import Path
+import time
+import threading
 from typing import Dict, Optional, List
 from backend.utils.config import Config
-
-
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.is_end = False
-        self.stock_info = None
+from backend.utils.file_utils import atomic_write_json, read_json, get_lock_path, FileLock
+from backend.utils.stock_index import StockIndex, build_stock_index
 
 
 class StockCache:
-    """股票数据缓存类"""
+    """股票数据缓存类
+
+    stocks.json保存股票列表，搜索使用由它编译出的二进制快照stocks.idx（通过mmap打开），
+    worker启动时不再解析stocks.json或构建前缀树。股票列表变化时重建快照，
+    其他worker至多在Config.MEMORY_CACHE_REVALIDATE_SECONDS秒后发现并重新打开。
+    """
 
     def __init__(self):
         """初始化股票数据缓存"""
         self.cache_dir = Config.STOCKS_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_file = self.cache_dir / "stocks.json"
-        self.root = TrieNode()
-        self.stocks_data = self._load_all_stocks()
-        self._build_trie()
+        self.index_file = self.cache_dir / "stocks.idx"
+        self._lock = threading.Lock()
+        self._checked_at = time.time()
+        self.index = self._open_index()
 
     def _load_all_stocks(self) -> Dict:
         """加载所有股票数据
-        
+
         Returns:
             Dict: 所有股票数据的字典，如果文件不存在则返回空字典
         """
-        if not self.cache_file.exists():
-            return {'stocks': []}
-
         try:
-            with open(self.cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stocks_data = read_json(self.cache_file)
+            return stocks_data if stocks_data is not None else {'stocks': []}
         except Exception as e:
             print(f"读取股票数据缓存出错: {e}")
             return {'stocks': []}
 
-    def _save_all_stocks(self):
-        """保存所有股票数据到缓存文件"""
+    def _open_index(self) -> Optional[StockIndex]:
+        """打开搜索快照，快照不存在或落后于stocks.json时先重建"""
         try:
-            self.cache_dir.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stocks_data, f, ensure_ascii=False, indent=2)
+            index = self._try_open_index()
+            if index is None:
+                with FileLock(get_lock_path(self.cache_dir, "stocks"),
+                              timeout=Config.CACHE_LOCK_TIMEOUT):
+                    # 等锁期间其他worker可能已经重建
+                    index = self._try_open_index()
+                    if index is None:
+                        self._rebuild_index(self._load_all_stocks())
+                        index = StockIndex(self.index_file)
+            return index
         except Exception as e:
-            print(f"保存股票数据缓存出错: {e}")
+            print(f"打开股票索引快照出错: {e}")
+            return None
 
-    def _build_trie(self):
-        """构建前缀树"""
-        for stock in self.stocks_data.get('stocks', []):
-            code = stock['code']
-            current = self.root
-            for char in code:
-                if char not in current.children:
-                    current.children[char] = TrieNode()
-                current = current.children[char]
-            current.is_end = True
-            current.stock_info = stock
-
-    def _search_in_trie(self, code: str) -> Optional[Dict]:
-        """在前缀树中搜索股票
-        
-        Args:
-            code: 股票代码
+    def _try_open_index(self) -> Optional[StockIndex]:
+        """打开与stocks.json一致的快照，不存在、格式不兼容或已过期时返回None"""
+        try:
+            index = StockIndex(self.index_file)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            stat = os.stat(self.cache_file)
+        except FileNotFoundError:
+            return index
+        if (index.source_mtime_ns, index.source_size) != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return index
 
-        Returns:
-            Optional[Dict]: 股票信息，如果未找到则返回None
+    def _rebuild_index(self, stocks_data: Dict):
+        """根据stocks.json的内容重建快照，调用方需持有stocks文件锁"""
+        try:
+            stat = os.stat(self.cache_file)
+            source = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            source = (0, 0)
+        count = build_stock_index(
+            stocks_data.get('stocks', []), self.index_file,
+            complete=stocks_data.get('complete', False),
+            source_mtime_ns=source[0], source_size=source[1]
+        )
+        print(f"已重建股票索引快照，共{count}只股票")
+
+    def _refresh_index(self, force: bool = False):
+        """其他worker重建快照后重新打开，至多每隔一段时间检查一次"""
+        now = time.time()
+        if not force and now - self._checked_at < Config.MEMORY_CACHE_REVALIDATE_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            stat = os.stat(self.index_file)
+        except FileNotFoundError:
+            return
+        index = self.index
+        if index is None or index.file_id != (stat.st_ino, stat.st_mtime_ns):
+            # 旧快照的映射在没有引用后由垃圾回收释放，正在使用它的请求不受影响
+            self.index = self._open_index()
+
+    def _save_all_stocks(self, stocks: List[Dict], replace: bool = False):
+        """保存股票数据到缓存文件并重建快照
+
+        Args:
+            stocks: 股票列表
+            replace: 是否用stocks替换全部股票（视为完整列表）；否则合并到已有股票中
         """
-        current = self.root
-        for char in code:
-            if char not in current.children:
-                return None
-            current = current.children[char]
-        return current.stock_info if current.is_end else None
+        try:
+            with FileLock(get_lock_path(self.cache_dir, "stocks"),
+                          timeout=Config.CACHE_LOCK_TIMEOUT):
+                if replace:
+                    stocks_data = {'stocks': stocks, 'complete': True}
+                else:
+                    # 先读取磁盘上其他进程新增的股票，避免多个worker互相覆盖
+                    stocks_data = self._load_all_stocks()
+                    known = {stock['code'] for stock in stocks_data['stocks']}
+                    added = [stock for stock in stocks if stock['code'] not in known]
+                    if not added:
+                        return
+                    stocks_data['stocks'].extend(added)
+                atomic_write_json(self.cache_file, stocks_data)
+                self._rebuild_index(stocks_data)
+            self._refresh_index(force=True)
+        except Exception as e:
+            print(f"保存股票数据缓存出错: {e}")
 
     def get_stocks(self, query: str, fetch_func) -> Dict:
-        """获取股票数据，优先从前缀树获取
-        
+        """获取股票数据，优先从快照获取
+
         Args:
             query: 搜索关键词
             fetch_func: 获取股票数据的函数，当缓存不存在时调用
@@ -87,36 +134,49 @@ class StockCache:
         Returns:
             Dict: 股票数据
         """
-        # 如果是完整的股票代码，先在前缀树中查找
-        if query.isdigit() and len(query) == 6:
-            result = self._search_in_trie(query)
-            if result:
-                return {'stocks': [result]}
+        self._refresh_index()
+        index = self.index
+
+        if index is not None:
+            # 如果是完整的股票代码，先在快照中查找
+            if query.isdigit() and len(query) == 6:
+                result = index.get(query)
+                if result:
+                    return {'stocks': [result]}
+                if index.complete:
+                    # 快照包含全部A股时代码不存在只可能是输错了，返回相近的代码
+                    return {'stocks': index.fuzzy_search(query)}
+            elif index.complete:
+                # 快照包含全部A股时，名称和代码片段的搜索直接在本地完成，没有结果时返回相近的名称
+                return {'stocks': index.search(query) or index.fuzzy_search(query)}
 
-        # 如果前缀树中未找到或者不是完整代码，则调用fetch_func
+        # 如果快照中未找到或者不是完整代码，则调用fetch_func
         new_data = fetch_func(query)
         if new_data.get('stocks'):
-            # 更新缓存和前缀树
-            for stock in new_data['stocks']:
-                if not self._search_in_trie(stock['code']):
-                    self.stocks_data['stocks'].append(stock)
-                    current = self.root
-                    for char in stock['code']:
-                        if char not in current.children:
-                            current.children[char] = TrieNode()
-                        current = current.children[char]
-                    current.is_end = True
-                    current.stock_info = stock
-            self._save_all_stocks()
+            # 只有出现快照中没有的股票时才更新缓存和快照
+            if index is None or any(index.get(stock['code']) is None
+                                    for stock in new_data['stocks']):
+                with self._lock:
+                    self._save_all_stocks(new_data['stocks'])
         return new_data
 
+    def get_cached_stock(self, stock_code: str) -> Optional[Dict]:
+        """只在本地快照中按代码查找股票，不请求数据源
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            Optional[Dict]: 股票数据，快照中没有时返回None
+        """
+        self._refresh_index()
+        index = self.index
+        return index.get(stock_code) if index is not None else None
+
     def update_stocks(self, stocks_data: Dict):
-        """更新股票数据缓存
-        
+        """用完整的股票列表替换缓存并重建快照（股票列表变化时的重建步骤）
+
         Args:
-            stocks_data: 新的股票数据
+            stocks_data: 新的股票数据，包含全部A股
         """
-        self.stocks_data = stocks_data
-        self.root = TrieNode()
-        self._build_trie()
-        self._save_all_stocks()
\ No newline at end of file
+        self._save_all_stocks(stocks_data.get('stocks', []), replace=True)
@@ -0,0 +1,220 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord
+
+
+class WatchlistSubscriber:
+    """一个WebSocket连接的订阅状态和待发送消息队列"""
+
+    def __init__(self):
+        self.codes: Set[str] = set()
+        # 消息为None表示连接因积压过多被断开
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.overflowed = False
+
+    def send(self, message: Optional[Dict]):
+        """放入待发送消息，积压超过上限时通知发送方断开连接"""
+        if self.overflowed:
+            return
+        if message is not None and self.queue.qsize() >= Config.WATCHLIST_QUEUE_SIZE:
+            print(f"订阅连接积压超过{Config.WATCHLIST_QUEUE_SIZE}条消息，断开连接")
+            self.overflowed = True
+            message = None
+        self.queue.put_nowait(message)
+
+
+class _CodeState:
+    """一只股票的轮询任务和最近一次推送的状态"""
+
+    def __init__(self):
+        self.subscribers: Set[WatchlistSubscriber] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.digests: Set[str] = set()
+        self.news: Optional[List[NewsRecord]] = None
+        self.sentiment: Optional[Dict] = None
+
+
+class WatchlistHub:
+    """自选股订阅中心
+
+    每只被订阅的股票只有一个轮询任务，无论有多少连接订阅，每个轮询周期只请求一次数据源，
+    轮询量从 连接数×股票数 降为 股票数。轮询结果与上一次比较，只推送变化：
+        - {"type": "snapshot", "stock_code", "news", "sentiment"}: 订阅时的当前状态
+        - {"type": "news", "stock_code", "data": 新增的新闻}
+        - {"type": "sentiment", "stock_code", "data": 情感摘要}，得分变化达到
+          Config.WATCHLIST_SCORE_THRESHOLD、标签变化或分析结果来源变化时推送
+    最后一个订阅者退订后轮询任务停止。
+    """
+
+    def __init__(self, news_crawler, sentiment_analyzer):
+        """初始化订阅中心
+
+        Args:
+            news_crawler: 新闻爬虫实例
+            sentiment_analyzer: 情感分析器实例
+        """
+        self.news_crawler = news_crawler
+        self.sentiment_analyzer = sentiment_analyzer
+        self._states: Dict[str, _CodeState] = {}
+
+    def connect(self) -> WatchlistSubscriber:
+        """创建一个连接的订阅状态"""
+        return WatchlistSubscriber()
+
+    def disconnect(self, subscriber: WatchlistSubscriber):
+        """连接关闭时退订其全部股票"""
+        self._remove(subscriber, list(subscriber.codes))
+
+    def subscribe(self, subscriber: WatchlistSubscriber, stock_codes: List[str]) -> List[str]:
+        """订阅股票，向该连接确认当前订阅，已有状态的股票随后立即发送快照
+
+        Args:
+            subscriber: 订阅的连接
+            stock_codes: 股票代码列表
+
+        Returns:
+            List[str]: 该连接当前订阅的全部股票代码（已排序）
+
+        Raises:
+            ValueError: 订阅数超过Config.WATCHLIST_MAX_CODES
+        """
+        new_codes = [code for code in dict.fromkeys(stock_codes) if code not in subscriber.codes]
+        if len(subscriber.codes) + len(new_codes) > Config.WATCHLIST_MAX_CODES:
+            raise ValueError(f"每个连接最多订阅{Config.WATCHLIST_MAX_CODES}只股票")
+
+        snapshots = []
+        for stock_code in new_codes:
+            subscriber.codes.add(stock_code)
+            state = self._states.get(stock_code)
+            if state is None:
+                state = self._states[stock_code] = _CodeState()
+            state.subscribers.add(subscriber)
+            if state.task is None:
+                state.task = asyncio.create_task(self._poll(stock_code, state))
+            elif state.news is not None:
+                snapshots.append(self._snapshot(stock_code, state))
+        codes = sorted(subscriber.codes)
+        subscriber.send({'type': 'subscribed', 'codes': codes})
+        for snapshot in snapshots:
+            subscriber.send(snapshot)
+        return codes
+
+    def unsubscribe(self, subscriber: WatchlistSubscriber, stock_codes: List[str]):
+        """退订股票并向该连接确认当前订阅，没有订阅者的股票停止轮询
+
+        Args:
+            subscriber: 订阅的连接
+            stock_codes: 股票代码列表
+        """
+        self._remove(subscriber, stock_codes)
+        subscriber.send({'type': 'subscribed', 'codes': sorted(subscriber.codes)})
+
+    def _remove(self, subscriber: WatchlistSubscriber, stock_codes: List[str]):
+        for stock_code in stock_codes:
+            subscriber.codes.discard(stock_code)
+            state = self._states.get(stock_code)
+            if state is None:
+                continue
+            state.subscribers.discard(subscriber)
+            if not state.subscribers:
+                if state.task is not None:
+                    state.task.cancel()
+                del self._states[stock_code]
+
+    def stop(self):
+        """停止全部轮询任务"""
+        for state in self._states.values():
+            if state.task is not None:
+                state.task.cancel()
+        self._states.clear()
+
+    def metrics(self) -> Dict:
+        """被订阅的股票数和订阅连接数"""
+        return {
+            'codes': len(self._states),
+            'subscriptions': sum(len(state.subscribers) for state in self._states.values())
+        }
+
+    @staticmethod
+    def _snapshot(stock_code: str, state: _CodeState) -> Dict:
+        return {
+            'type': 'snapshot',
+            'stock_code': stock_code,
+            'news': [news.to_dict() for news in state.news],
+            'sentiment': state.sentiment
+        }
+
+    @staticmethod
+    def _publish(state: _CodeState, message: Dict):
+        for subscriber in list(state.subscribers):
+            subscriber.send(message)
+
+    @staticmethod
+    def _summarize(analysis_result: Dict) -> Dict:
+        summary = analysis_result['analysis_summary']
+        return {
+            'overall_score': summary['overall_score'],
+            'sentiment_label': summary['sentiment_label'],
+            'confidence_index': summary['confidence_index'],
+            'analysis_mode': analysis_result.get('analysis_mode', 'deep')
+        }
+
+    @staticmethod
+    def _sentiment_changed(previous: Optional[Dict], current: Dict) -> bool:
+        if previous is None:
+            return True
+        return (abs(current['overall_score'] - previous['overall_score'])
+                >= Config.WATCHLIST_SCORE_THRESHOLD
+                or current['sentiment_label'] != previous['sentiment_label']
+                or current['analysis_mode'] != previous['analysis_mode'])
+
+    async def _poll(self, stock_code: str, state: _CodeState):
+        """轮询一只股票：抓取新闻、与上次比较，新闻变化后重新分析"""
+        while True:
+            try:
+                await self._poll_once(stock_code, state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"轮询自选股 {stock_code} 出错: {e}")
+            await asyncio.sleep(Config.WATCHLIST_POLL_INTERVAL)
+
+    async def _poll_once(self, stock_code: str, state: _CodeState):
+        news_list = await asyncio.to_thread(self.news_crawler.refresh_stock_news, stock_code)
+        if not news_list and state.news:
+            # 抓取失败或数据源暂时为空，保留上一次的新闻
+            news_list = state.news
+        added = [news for news in news_list if news.digest not in state.digests]
+        first_poll = state.news is None
+        state.news = news_list
+        state.digests = {news.digest for news in news_list}
+
+        # 新闻集合不变时分析结果来自缓存，自动模式下后台完成的大模型分析也会在这里被发现
+        analysis_result = await self.sentiment_analyzer.analyze_sentiment(
+            news_list=news_list,
+            stock_code=stock_code,
+            priority='background',
+            consumer='watchlist',
+            mode=Config.WATCHLIST_ANALYSIS_MODE
+        )
+        sentiment = self._summarize(analysis_result)
+        sentiment_changed = self._sentiment_changed(state.sentiment, sentiment)
+        if sentiment_changed:
+            state.sentiment = sentiment
+
+        if first_poll:
+            self._publish(state, self._snapshot(stock_code, state))
+            return
+        if added:
+            self._publish(state, {
+                'type': 'news',
+                'stock_code': stock_code,
+                'data': [news.to_dict() for news in added]
+            })
+        if sentiment_changed:
+            self._publish(state, {
+                'type': 'sentiment',
+                'stock_code': stock_code,
+                'data': sentiment
+            })
@@ -1,11 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api.routes import router
+from backend.api.services import (
+    get_sentiment_analyzer, get_cache_manager, get_job_queue, get_watchlist_hub, is_created,
+    get_request_profiler
+)
+from backend.utils.config import Config
+from backend.api.admin_routes import admin_router
+from backend.api.job_routes import job_router
+from backend.api.watchlist_routes import watchlist_router
+
+
+async def run_background_services():
+    """在后台构造服务、预热大模型连接并运行缓存清理，不阻塞worker开始接受请求"""
+    if Config.LLM_PREWARM:
+        sentiment_analyzer = await asyncio.to_thread(get_sentiment_analyzer)
+        await sentiment_analyzer.warmup()
+    # 继续执行重启前未完成的分析任务
+    job_queue = await asyncio.to_thread(get_job_queue)
+    job_queue.start()
+    cache_manager = await asyncio.to_thread(get_cache_manager)
+    await cache_manager.run_sweeper()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动后台任务
+    background_task = asyncio.create_task(run_background_services())
+    yield
+    background_task.cancel()
+    if is_created('job_queue'):
+        get_job_queue().stop()
+    if is_created('watchlist_hub'):
+        get_watchlist_hub().stop()
+    if is_created('sentiment_analyzer'):
+        await get_sentiment_analyzer().aclose()
+
 
 app = FastAPI(
     title="Stock News Sentiment Analysis API",
     description="API for analyzing stock news sentiment",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -17,8 +55,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class ProfileRequestsMiddleware:
+    """管理接口开启CPU分析后，按采样率分析匹配路径的请求
+
+    纯ASGI中间件：未开启分析时直接转发，不包装请求；被采样的请求在响应体最后一条消息
+    发送后才结束分析，流式响应的整个生成过程都计入。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_request_profiler()
+        if scope['type'] != 'http' or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+        profile = profiler.begin(scope['path'])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                profiler.end(profile)
+
+        async def send_and_finish(message):
+            try:
+                await send(message)
+            finally:
+                if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                    finish()
+
+        try:
+            await self.app(scope, receive, send_and_finish)
+        finally:
+            finish()
+
+
+app.add_middleware(ProfileRequestsMiddleware)
+
+
 # 注册路由
 app.include_router(router, prefix="/api")
+app.include_router(admin_router, prefix="/api/admin")
+app.include_router(job_router, prefix="/api/jobs")
+app.include_router(watchlist_router, prefix="/api/watchlist")
 
 if __name__ == "__main__":
     import uvicorn
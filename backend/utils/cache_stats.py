@@ -0,0 +1,48 @@
+import time
+import threading
+from typing import Dict
+
+
+class CacheStats:
+    """缓存命中统计与访问记录
+
+    记录每个缓存键最近一次被访问的时间，供清理任务把访问时间回写到磁盘文件的atime上，
+    从而按最近访问时间（LRU）淘汰。命中内存层的访问不会触碰磁盘，只记录在这里。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accesses: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def record_hit(self, key: str):
+        """记录一次命中"""
+        with self._lock:
+            self.hits += 1
+            self._accesses[key] = time.time()
+
+    def record_miss(self):
+        """记录一次未命中"""
+        with self._lock:
+            self.misses += 1
+
+    def drain_accesses(self) -> Dict[str, float]:
+        """取出并清空自上次调用以来的访问记录
+
+        Returns:
+            Dict[str, float]: 缓存键到最近访问时间戳的映射
+        """
+        with self._lock:
+            accesses, self._accesses = self._accesses, {}
+        return accesses
+
+    def to_dict(self) -> Dict:
+        """导出统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
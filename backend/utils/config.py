@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Dict
+from typing import Dict, List
 
 # 加载.env文件
 env_path = Path(__file__).parent.parent.parent / '.env'
@@ -17,9 +17,44 @@ class Config:
 
     DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', '')
     DEEPSEEK_MODEL = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+
+    # 大模型HTTP连接设置
+    LLM_CONNECT_TIMEOUT = 10  # 建立连接超时（秒）
+    LLM_READ_TIMEOUT = 120  # 读取响应超时（秒）
+    LLM_MAX_CONNECTIONS = 20  # 连接池最大连接数
+    LLM_MAX_KEEPALIVE_CONNECTIONS = 10  # 连接池保持的空闲长连接数
+    LLM_KEEPALIVE_EXPIRY = 300  # 空闲长连接保持时间（秒）
+    LLM_PREWARM = True  # 启动时预先建立到大模型服务的TLS连接
+    # 大模型调用调度：每个进程同时进行的调用上限，以及只给交互请求使用的名额数
+    LLM_MAX_CONCURRENCY = 8
+    LLM_INTERACTIVE_RESERVED_SLOTS = 2
+    # 同一优先级内各调用方（请求头X-Consumer-Id，未提供时为客户端IP）的权重，默认为1
+    LLM_CONSUMER_WEIGHTS: Dict[str, float] = {}
+    # 批量和后台分析合并为多股票调用：每批最多股票数（受模型输出长度限制）和收集窗口（秒），
+    # 每批只有1只股票时按单只股票分析
+    LLM_BATCH_MAX_STOCKS = 3
+    LLM_BATCH_WINDOW_SECONDS = 0.5
+    # 增量分析：同一天内新增新闻不超过DELTA_MAX_NEW_ARTICLES条时，只把新增新闻和上次的分析结果
+    # 发给大模型修订；连续增量更新DELTA_MAX_UPDATES次后或跨日时完整重新分析，0表示不做增量分析
+    DELTA_MAX_UPDATES = 5
+    DELTA_MAX_NEW_ARTICLES = 5
+    # Gemini把系统提示词注册为缓存内容（cached content）的有效期（秒），0表示不注册，
+    # 只依赖服务端的隐式前缀缓存；系统提示词低于模型的最小缓存长度时自动退回隐式缓存
+    GEMINI_CONTEXT_CACHE_TTL = 3600
+
+    # 管理接口令牌，请求头X-Admin-Token需与之一致；未设置时管理接口不可用
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
     # News limits
     MAX_NEWS_PER_STOCK = 20  # 每个股票最大新闻数量
     DEFAULT_DAYS = 7  # 默认获取天数
+    # 新闻相关度筛选：只有相关度不低于阈值的新闻才会交给大模型，标题命中按倍数加权，
+    # 行业词命中按权重计入；STOCK_ALIASES为股票代码到额外称呼（如"茅台"）的映射
+    NEWS_RELEVANCE_THRESHOLD = 0.3
+    NEWS_RELEVANCE_TITLE_BOOST = 3.0
+    NEWS_RELEVANCE_INDUSTRY_WEIGHT = 0.3
+    STOCK_ALIASES: Dict[str, List[str]] = {}
+    # 本地快速分析中新闻权重随发布时间衰减的半衰期（天）
+    LOCAL_SCORER_HALF_LIFE_DAYS = 3
 
     # Cache settings
     CACHE_VALID_DAYS = 1  # 缓存有效期（天）
@@ -29,6 +64,89 @@ class Config:
         __file__).parent.parent.parent / 'data' / 'sentiment_cache'
     STOCKS_CACHE_DIR = Path(__file__).parent.parent.parent / \
         'data' / 'stocks_cache'
+    # 多worker并发填充同一缓存键时等待文件锁的最长时间（秒），需覆盖一次完整的大模型调用
+    CACHE_LOCK_TIMEOUT = 120
+    # 进程内一级缓存容量（字节）及对照磁盘文件重新校验的间隔（秒）
+    NEWS_MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+    SENTIMENT_MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+    MEMORY_CACHE_REVALIDATE_SECONDS = 5
+    # 磁盘缓存保留策略：超过max_age_days的条目直接删除，
+    # 条目数或总字节数超限时按最近访问时间淘汰
+    CACHE_RETENTION = {
+        'news': {
+            'max_age_days': 3,
+            'max_entries': 10000,
+            'max_bytes': 512 * 1024 * 1024
+        },
+        'sentiment': {
+            'max_age_days': 3,
+            'max_entries': 20000,
+            'max_bytes': 512 * 1024 * 1024
+        }
+    }
+    CACHE_SWEEP_INTERVAL_SECONDS = 600  # 后台清理间隔（秒）
+
+    # 情感历史时间序列数据库（长期保存，不受缓存清理影响）
+    SENTIMENT_HISTORY_DB = Path(__file__).parent.parent.parent / \
+        'data' / 'sentiment_history' / 'history.db'
+    SENTIMENT_HISTORY_MAX_WINDOW = 365  # 情感历史滚动聚合窗口的最大天数
+
+    # 按内容摘要去重的新闻正文存储，各股票的新闻缓存只保存摘要列表
+    ARTICLE_STORE_DB = Path(__file__).parent.parent.parent / \
+        'data' / 'articles' / 'articles.db'
+    ARTICLE_RECORD_CACHE_SIZE = 20000  # 进程内保留的已解析新闻条数
+
+    # 已缓存新闻的全文索引（长期保存，不受缓存清理影响）
+    NEWS_INDEX_DB = Path(__file__).parent.parent.parent / \
+        'data' / 'news_index' / 'news.db'
+    NEWS_SEARCH_MAX_LIMIT = 100  # 全文检索单次最多返回的条数
+
+    # 行业板块/指数成分股缓存及聚合设置
+    SECTOR_CACHE_DIR = Path(__file__).parent.parent.parent / \
+        'data' / 'sector_cache'
+    SECTOR_MEMBERSHIP_VALID_DAYS = 7  # 成分股列表有效期（天），市值按天刷新
+    SECTOR_REFRESH_MAX_STOCKS = 50  # 单次聚合请求最多在后台补做分析的成分股数
+    SECTOR_REFRESH_CONCURRENCY = 4  # 后台补做分析的并发数
+
+    # 异步分析任务队列
+    JOB_DB = Path(__file__).parent.parent.parent / 'data' / 'jobs' / 'jobs.db'
+    JOB_WORKERS = 2  # 每个进程执行任务的并发数
+    JOB_POLL_INTERVAL = 1.0  # 空闲时轮询任务表的间隔（秒），用于领取其他进程提交的任务
+    JOB_HEARTBEAT_INTERVAL = 30  # 执行中的任务续期（心跳）的间隔（秒）
+    JOB_RUNNING_TIMEOUT = 300  # 超过该时间（秒）没有心跳的执行中任务视为所在进程已退出，重新排队
+    JOB_RETENTION_DAYS = 7  # 已完成任务的保留天数
+    JOB_WEBHOOK_TIMEOUT = 10  # 回调请求超时（秒）
+    JOB_WEBHOOK_RETRIES = 3  # 回调失败重试次数
+    # 允许回调的主机名；为空时允许任意主机，但拒绝解析到回环、私有、链路本地等非公网地址的回调
+    JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+
+    # 分析接口的准入控制（每个worker进程），只限制需要调用大模型的冷分析，命中缓存的请求不受限制
+    ADMISSION_MAX_IN_FLIGHT = 8  # 同时进行的冷分析上限
+    ADMISSION_MAX_QUEUE = 16  # 等待队列长度上限，队列满时立即返回503
+    ADMISSION_QUEUE_TIMEOUT = 30  # 排队的最长时间（秒），超时返回503
+    ADMISSION_DEFAULT_SERVICE_SECONDS = 20  # 还没有观测数据时假定的单次冷分析耗时（秒）
+    ADMISSION_MAX_RETRY_AFTER = 120  # Retry-After的上限（秒）
+
+    # 分析接口的截止时间：请求可用查询参数deadline或请求头X-Request-Deadline（秒）指定
+    REQUEST_DEADLINE_SECONDS = 30  # 未指定时的默认时间预算（秒）
+    REQUEST_DEADLINE_MAX_SECONDS = 120  # 时间预算上限（秒）
+    DEADLINE_FORMAT_RESERVE_SECONDS = 0.2  # 为格式化和返回结果预留的时间（秒）
+
+    # worker导入backend.main的时间预算（秒），导入时不应加载数据源和大模型SDK
+    IMPORT_TIME_BUDGET_SECONDS = 2.0
+
+    # 管理接口按需开启的性能分析（只作用于收到请求的worker进程）
+    PROFILE_PATHS = ['/api/stock-analysis', '/api/stocks/search']  # 默认采样的请求路径前缀
+    PROFILE_MAX_REQUESTS = 100  # 分析的请求数达到该值后自动停止采样
+    TRACEMALLOC_FRAMES = 10  # 内存快照中每次分配记录的调用栈深度
+    TRACEMALLOC_MAX_SNAPSHOTS = 5  # 保留的内存快照数
+
+    # 自选股WebSocket订阅
+    WATCHLIST_POLL_INTERVAL = 60  # 每只股票轮询数据源的间隔（秒），与订阅人数无关
+    WATCHLIST_SCORE_THRESHOLD = 0.05  # 情感得分变化达到该值（或标签变化）时才推送
+    WATCHLIST_ANALYSIS_MODE = 'auto'  # 新闻变化后的分析模式，见SentimentAnalyzer.stream_sentiment
+    WATCHLIST_MAX_CODES = 50  # 每个连接最多订阅的股票数
+    WATCHLIST_QUEUE_SIZE = 100  # 每个连接待发送消息的上限，超过时断开过慢的客户端
 
     # News topics for analysis
     NEWS_TOPICS: Dict[str, str] = {
@@ -40,11 +158,9 @@ class Config:
         'capital_market': '资本市场'
     }
 
-    # Sentiment analysis prompt template
-    SENTIMENT_PROMPT = '''你是一位专业的股票分析师，请对以下新闻进行多维度分析，并以JSON格式返回分析结果。
-
-新闻内容：
-{news_content}
+    # 情感分析提示词分为两部分：固定的分析说明与输出格式作为系统提示词，每次调用完全相同并放在最前面，
+    # 大模型服务的前缀缓存（DeepSeek硬盘缓存、Gemini上下文缓存）可以命中；随股票变化的新闻放在其后
+    SENTIMENT_SYSTEM_PROMPT = '''你是一位专业的股票分析师，请对用户提供的新闻进行多维度分析，并以JSON格式返回分析结果。
 
 请从以下维度进行分析并返回结构化的JSON结果：
 
@@ -89,99 +205,99 @@ class Config:
 - 持续影响时间预测
 
 请按照以下JSON格式返回分析结果：
-{{
-    "overall_sentiment": {{
+{
+    "overall_sentiment": {
         "score": 0.0,  # 情感得分，范围0到1
         "label": "string",  # 情感标签：极度看好/看好/中性/看空/极度看空
         "summary": "string",  # 整体分析总结，100字以内
         "market_expectation": "string",  # 市场预期分析
         "investor_sentiment": 0,  # 投资者情绪指数，范围0-100，如无相关信息则为"无"
         "confidence_index": 0.0  # 置信度指数，范围0到1，基于新闻来源可靠性、时效性、一致性和数据支撑
-    }},
-    "time_analysis": {{
+    },
+    "time_analysis": {
         "trend": [
-            {{
+            {
                 "date": "YYYY-MM-DD",
                 "score": 0.0,
                 "key_events": [
-                    {{
+                    {
                         "title": "string",  # 事件标题，5字以内，如"解禁消息"
                         "description": "string"  # 事件描述，20字以内，如"1.2亿股限售股将于2月1日解禁"
-                    }}
+                    }
                 ]
-            }}
+            }
         ],
         "trend_prediction": "string"  # 趋势预测
-    }},
-    "topic_analysis": {{
-        "company_operation": {{
+    },
+    "topic_analysis": {
+        "company_operation": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }},
-        "financial_performance": {{
+        },
+        "financial_performance": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }},
-        "market_competition": {{
+        },
+        "market_competition": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }},
-        "product_technology": {{
+        },
+        "product_technology": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }},
-        "industry_policy": {{
+        },
+        "industry_policy": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }},
-        "capital_market": {{
+        },
+        "capital_market": {
             "score": 0.0,
             "summary": "string",
             "key_points": ["string"]
-        }}
-    }},
-    "source_analysis": {{
-        "mainstream_media": {{
+        }
+    },
+    "source_analysis": {
+        "mainstream_media": {
             "score": 0.0,
             "summary": "string"
-        }},
-        "industry_media": {{
+        },
+        "industry_media": {
             "score": 0.0,
             "summary": "string"
-        }},
-        "self_media": {{
+        },
+        "self_media": {
             "score": 0.0,
             "summary": "string"
-        }},
-        "official_announcement": {{
+        },
+        "official_announcement": {
             "score": 0.0,
             "summary": "string"
-        }}
-    }},
-    "impact_analysis": {{
+        }
+    },
+    "impact_analysis": {
         "importance_level": "string",  # 高/中/低
-        "market_impact": {{
+        "market_impact": {
             "score": 0.0,  # 影响力得分，范围0-1
             "duration": "string",  # 预计持续时间
             "key_factors": ["string"]
-        }}
-    }},
-    "risk_analysis": {{
+        }
+    },
+    "risk_analysis": {
         "risk_level": "string",  # 高/中/低
         "risk_factors": [
-            {{
+            {
                 "factor": "string",
                 "description": "string",
                 "severity": "string"  # 高/中/低
-            }}
+            }
         ]
-    }}
-}}
+    }
+}
 
 注意：
 1. 所有得分均在相应范围内
@@ -195,6 +311,31 @@ class Config:
 9. key_events中的每个事件必须包含title和description两个字段，title应该简短精炼（5字以内），description应该对title进行补充说明（20字以内）
 10. 投资者情绪指数必须基于新闻中的投资者行为相关信息，如果没有相关信息则返回"无"'''
 
+    SENTIMENT_NEWS_PROMPT = '''新闻内容：
+{news_content}'''
+
+    # 增量分析的用户提示词，系统提示词与完整分析相同
+    SENTIMENT_DELTA_PROMPT = '''以下是此前对该股票新闻的分析结果（JSON）：
+{previous_analysis}
+
+此后新增了以下新闻：
+{news_content}
+
+请结合新增新闻修订此前的分析结果，按系统提示中的JSON格式返回。
+只需返回因新增新闻而发生变化的顶层维度，未变化的维度可以省略；overall_sentiment必须返回。
+time_analysis如有变化需返回完整的trend列表。'''
+
+    # 多股票批量分析时附加在新闻内容之后的输出要求，系统提示词保持不变
+    MULTI_STOCK_PROMPT_SUFFIX = '''
+
+补充说明：以上新闻分别属于多只股票（{stock_codes}），每只股票的新闻以"=== 股票 代码 ==="开头。
+请分别对每只股票的新闻独立进行上述分析，不要混用其他股票的新闻。
+返回一个JSON对象，键为股票代码，值为该股票按上述JSON格式的完整分析结果，按股票出现的顺序依次输出，例如：
+{{
+    "000001": {{"overall_sentiment": {{...}}, "time_analysis": {{...}}, ...}},
+    "600000": {{"overall_sentiment": {{...}}, "time_analysis": {{...}}, ...}}
+}}'''
+
 #     # 新闻爬取配置
 #     NEWS_CACHE_DAYS = 1  # 新闻缓存天数
 
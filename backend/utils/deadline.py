@@ -0,0 +1,51 @@
+import time
+from typing import Optional
+from backend.utils.config import Config
+
+
+class Deadline:
+    """一个请求的截止时间，在抓取、大模型分析和格式化之间传递剩余时间"""
+
+    def __init__(self, seconds: float):
+        """初始化截止时间
+
+        Args:
+            seconds: 从现在起的时间预算（秒）
+        """
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    @classmethod
+    def from_request(cls, query_value: Optional[float], header_value: Optional[str]) -> 'Deadline':
+        """由查询参数或请求头X-Request-Deadline（秒）构造，查询参数优先，都没有时使用服务端默认值
+
+        Args:
+            query_value: 查询参数deadline
+            header_value: 请求头X-Request-Deadline
+
+        Raises:
+            ValueError: 时间预算不是正数
+        """
+        seconds = query_value
+        if seconds is None and header_value:
+            try:
+                seconds = float(header_value)
+            except ValueError:
+                raise ValueError("X-Request-Deadline必须是秒数")
+        if seconds is None:
+            seconds = Config.REQUEST_DEADLINE_SECONDS
+        if not seconds > 0:
+            raise ValueError("deadline必须为正数（秒）")
+        return cls(min(seconds, Config.REQUEST_DEADLINE_MAX_SECONDS))
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """剩余的秒数，扣除为后续步骤预留的时间，不小于0
+
+        Args:
+            reserve: 为后续步骤（如格式化）预留的秒数
+        """
+        return max(0.0, self.at - time.monotonic() - reserve)
+
+    def expired(self) -> bool:
+        """是否已经到达截止时间"""
+        return time.monotonic() >= self.at
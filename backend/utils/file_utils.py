@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+def atomic_write_json(path: Path, data: Any):
+    """原子地写入JSON文件
+
+    先写入同目录下的临时文件并fsync，再通过os.replace重命名覆盖目标文件，
+    读取方要么看到旧文件，要么看到完整的新文件，不会读到写了一半的JSON。
+
+    Args:
+        path: 目标文件路径
+        data: 可JSON序列化的数据
+    """
+    atomic_write_bytes(
+        path, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """原子地写入二进制文件，方式同atomic_write_json
+
+    已经通过mmap打开旧文件的读取方不受影响，继续看到旧文件的内容。
+
+    Args:
+        path: 目标文件路径
+        data: 文件内容
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path: Path) -> Optional[Any]:
+    """读取JSON文件，文件不存在时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def get_lock_path(cache_dir: Path, key: str) -> Path:
+    """获取缓存键对应的锁文件路径（放在缓存目录的.locks子目录中）"""
+    return Path(cache_dir) / '.locks' / f"{key}.lock"
+
+
+class FileLock:
+    """基于文件的跨进程互斥锁
+
+    使用flock(POSIX)或msvcrt.locking(Windows)实现，锁随文件描述符释放，
+    进程崩溃时由操作系统自动回收，不会留下死锁。同一进程内不同实例之间同样互斥，
+    因此既能防止多个worker重复填充同一个缓存键，也能防止同一worker内的并发协程重复填充。
+
+    获取超时后不会抛出异常，而是以未持有锁的状态继续执行（acquired为False），
+    此时最坏情况只是重复获取一次数据，而不是让请求失败。
+
+    用法:
+        with FileLock(path, timeout=30) as lock:
+            ...
+
+        async with FileLock(path, timeout=30) as lock:
+            ...
+    """
+
+    def __init__(self, path: Path, timeout: float = 60.0, poll_interval: float = 0.1):
+        """初始化文件锁
+
+        Args:
+            path: 锁文件路径
+            timeout: 获取锁的最长等待时间（秒）
+            poll_interval: 轮询间隔（秒）
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.acquired = False
+        self.waited = False  # 是否曾因其他持有者而等待
+        self._fd: Optional[int] = None
+
+    def _try_lock(self) -> bool:
+        """尝试以非阻塞方式获取锁"""
+        while True:
+            if self._fd is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.name == 'nt':
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            if self._is_current():
+                return True
+            # 打开后锁文件被删除或替换，锁住的是已不在路径上的旧文件，
+            # 之后打开该路径的进程会得到新文件，因此关闭后重新打开
+            self._close()
+
+    def _is_current(self) -> bool:
+        """持有的文件描述符是否仍是路径上的锁文件"""
+        if os.name == 'nt':
+            # Windows上打开中的文件不能被删除
+            return True
+        try:
+            path_stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        fd_stat = os.fstat(self._fd)
+        return (fd_stat.st_dev, fd_stat.st_ino) == (path_stat.st_dev, path_stat.st_ino)
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """阻塞获取锁
+
+        Args:
+            timeout: 等待超时（秒），默认使用构造时的timeout
+
+        Returns:
+            bool: 是否成功获取锁
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while not self._try_lock():
+            self.waited = True
+            if time.monotonic() >= deadline:
+                self._close()
+                return False
+            time.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """在协程中获取锁，等待期间让出事件循环"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while not self._try_lock():
+            self.waited = True
+            if time.monotonic() >= deadline:
+                self._close()
+                return False
+            await asyncio.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    def release(self):
+        """释放锁"""
+        if not self.acquired:
+            return
+        try:
+            if os.name == 'nt':
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self.acquired = False
+            self._close()
+
+    def __enter__(self) -> 'FileLock':
+        if not self.acquire():
+            print(f"获取文件锁超时，不持锁继续执行: {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    async def __aenter__(self) -> 'FileLock':
+        if not await self.acquire_async():
+            print(f"获取文件锁超时，不持锁继续执行: {self.path}")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
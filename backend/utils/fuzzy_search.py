@@ -0,0 +1,113 @@
+from typing import Dict, List, Set, Tuple, Union
+
+# 排序时相邻字符交换的代价：交换是最常见的输入错误（如600591与600519），
+# 同样距离为1时排在替换之前
+TRANSPOSITION_RANK_COST = 0.5
+
+
+def osa_distance(a: str, b: str, max_distance: int,
+                 transposition_cost: Union[int, float] = 1) -> Union[int, float]:
+    """两个字符串的编辑距离（插入、删除、替换各计1次，相邻字符交换计transposition_cost）
+
+    Args:
+        a: 字符串
+        b: 字符串
+        max_distance: 距离上限，超过时提前返回max_distance + 1
+        transposition_cost: 相邻字符交换的代价
+
+    Returns:
+        Union[int, float]: 编辑距离，超过上限时为max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                # 相邻字符交换，如600159与600519
+                value = min(value, previous2[j - 2] + transposition_cost)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    """删除至多max_distance个字符得到的全部字符串，包含原字符串"""
+    result = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier if len(word) > 1
+                    for i in range(len(word))}
+        result |= frontier
+    return result
+
+
+class SymSpellIndex:
+    """基于删除的近似查找索引（SymSpell）
+
+    建索引时把每个词删除至多max_distance个字符得到的字符串都指向该词；查询时对查询词
+    做同样的删除，两边有相同的删除结果即为候选，再用编辑距离精确校验。
+    查询只需几十次字典查找，与词表大小无关。
+    """
+
+    def __init__(self, max_distance: int = 2):
+        """初始化索引
+
+        Args:
+            max_distance: 支持查询的最大编辑距离
+        """
+        self.max_distance = max_distance
+        self._terms: List[str] = []
+        self._deletes: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, term: str) -> int:
+        """加入一个词
+
+        Args:
+            term: 词
+
+        Returns:
+            int: 词的序号，与加入的顺序一致
+        """
+        term_id = len(self._terms)
+        self._terms.append(term)
+        for deleted in _deletes(term, self.max_distance):
+            self._deletes.setdefault(deleted, []).append(term_id)
+        return term_id
+
+    def lookup(self, query: str, max_distance: int) -> List[Tuple[int, int]]:
+        """查找与query编辑距离不超过max_distance的词
+
+        Args:
+            query: 查询词
+            max_distance: 最大编辑距离，不能超过建索引时的max_distance
+
+        Returns:
+            List[Tuple[int, int]]: (词的序号, 编辑距离)，按相邻字符交换计0.5的加权距离从小到大排列，
+                加权距离相同时按加入的顺序
+        """
+        max_distance = min(max_distance, self.max_distance)
+        candidates = set()
+        for deleted in _deletes(query, max_distance):
+            candidates.update(self._deletes.get(deleted, ()))
+        ranked = []
+        for term_id in candidates:
+            term = self._terms[term_id]
+            distance = osa_distance(query, term, max_distance)
+            if distance <= max_distance:
+                rank_cost = osa_distance(query, term, max_distance, TRANSPOSITION_RANK_COST)
+                ranked.append((rank_cost, term_id, distance))
+        ranked.sort()
+        return [(term_id, distance) for _, term_id, distance in ranked]
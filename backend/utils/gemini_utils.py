@@ -1,8 +1,15 @@
 import re
 import json
+import time
 import asyncio
+import hashlib
 from google import genai
-from typing import Dict, Optional
+from google.genai import types
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from backend.utils.config import Config
+from backend.utils.http_utils import create_async_http_client
+from backend.utils.json_stream import SectionStreamParser
+from backend.utils.llm_usage import LLMUsageStats
 
 
 def extract_json_from_markdown(text: str) -> str:
@@ -17,7 +24,8 @@ async def generate_content_with_retry(
     client: genai.Client,
     model: str,
     contents: str,
-    max_retries: int = 3
+    max_retries: int = 3,
+    config: Optional[types.GenerateContentConfig] = None
 ) -> Dict:
     """带重试机制的内容生成函数
 
@@ -26,6 +34,7 @@ async def generate_content_with_retry(
         model: 模型名称
         contents: 提示词内容
         max_retries: 最大重试次数
+        config: 生成配置（系统提示词或缓存内容）
 
     Returns:
         Dict: 解析后的JSON响应
@@ -36,10 +45,11 @@ async def generate_content_with_retry(
     last_error = None
     for attempt in range(max_retries):
         try:
-            # 发送请求
-            response = client.models.generate_content(
+            # 发送请求（异步接口，不阻塞事件循环）
+            response = await client.aio.models.generate_content(
                 model=model,
-                contents=contents
+                contents=contents,
+                config=config
             )
 
             # 提取JSON内容
@@ -70,14 +80,99 @@ class GeminiClient:
             api_key: API密钥
             model: 模型名称
         """
-        self.client = genai.Client(api_key=api_key)
+        # 长期复用的异步HTTP客户端，所有调用共享同一个连接池
+        self.http_client = create_async_http_client()
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                # SDK会把该值作为每次请求的总超时（毫秒）传给HTTP客户端
+                timeout=int(Config.LLM_READ_TIMEOUT * 1000),
+                httpx_async_client=self.http_client
+            )
+        )
         self.model = model
+        self.usage = LLMUsageStats()
+        # 系统提示词摘要 -> (缓存内容名称, 过期时间)，名称为None表示该提示词无法注册缓存
+        self._cached_contents: Dict[str, Tuple[Optional[str], float]] = {}
+        self._cache_lock = asyncio.Lock()
+
+    async def warmup(self):
+        """预先建立到Gemini的TLS连接，避免首个请求承担握手延迟"""
+        await self.client.aio.models.get(model=self.model)
+
+    async def aclose(self):
+        """删除注册的缓存内容并关闭连接池"""
+        for name, _ in self._cached_contents.values():
+            if name is None:
+                continue
+            try:
+                await self.client.aio.caches.delete(name=name)
+            except Exception as e:
+                print(f"删除Gemini缓存内容 {name} 失败: {e}")
+        self._cached_contents.clear()
+        await self.http_client.aclose()
+
+    async def _cached_content(self, system_prompt: str) -> Optional[str]:
+        """获取系统提示词对应的缓存内容名称，不存在或即将过期时重新注册
 
-    async def analyze_sentiment(self, prompt: str) -> Dict:
+        Args:
+            system_prompt: 系统提示词
+
+        Returns:
+            Optional[str]: 缓存内容名称，未启用或注册失败时返回None
+        """
+        ttl = Config.GEMINI_CONTEXT_CACHE_TTL
+        if ttl <= 0:
+            return None
+        key = hashlib.md5(system_prompt.encode('utf-8')).hexdigest()
+        async with self._cache_lock:
+            entry = self._cached_contents.get(key)
+            # 提前一分钟续期，避免请求发出时缓存恰好过期
+            if entry is not None and entry[1] - 60 > time.time():
+                return entry[0]
+            try:
+                cached = await self.client.aio.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_prompt,
+                        ttl=f"{ttl}s"
+                    )
+                )
+                self._cached_contents[key] = (cached.name, time.time() + ttl)
+                print(f"已注册Gemini缓存内容: {cached.name}")
+                return cached.name
+            except Exception as e:
+                # 提示词低于模型的最小缓存长度或模型不支持时，在有效期内不再尝试，退回隐式缓存
+                print(f"注册Gemini缓存内容失败，使用系统提示词: {e}")
+                self._cached_contents[key] = (None, time.time() + ttl)
+                return None
+
+    async def _generate_config(self, system_prompt: Optional[str]) -> Optional[types.GenerateContentConfig]:
+        """构建生成配置：优先引用缓存内容，否则把系统提示词放在请求最前面"""
+        if not system_prompt:
+            return None
+        cached_name = await self._cached_content(system_prompt)
+        if cached_name:
+            return types.GenerateContentConfig(cached_content=cached_name)
+        return types.GenerateContentConfig(system_instruction=system_prompt)
+
+    def _record_usage(self, usage_metadata):
+        """记录一次调用的token用量"""
+        if usage_metadata is None:
+            return
+        input_tokens = usage_metadata.prompt_token_count or 0
+        cached_tokens = usage_metadata.cached_content_token_count or 0
+        output_tokens = usage_metadata.candidates_token_count or 0
+        self.usage.record(input_tokens, cached_tokens, output_tokens)
+        print(f"Gemini调用用量: 输入{input_tokens} token（缓存命中{cached_tokens}），"
+              f"输出{output_tokens} token")
+
+    async def analyze_sentiment(self, prompt: str, system_prompt: Optional[str] = None) -> Dict:
         """分析情感
 
         Args:
             prompt: 提示词
+            system_prompt: 系统提示词
 
         Returns:
             Dict: 情感分析结果
@@ -85,5 +180,50 @@ class GeminiClient:
         return await generate_content_with_retry(
             client=self.client,
             model=self.model,
-            contents=prompt
+            contents=prompt,
+            config=await self._generate_config(system_prompt)
         )
+
+    async def stream_sections(self, prompt: str,
+                              system_prompt: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """流式情感分析，顶层字段一旦闭合立即产出
+
+        Args:
+            prompt: 提示词
+            system_prompt: 系统提示词，应在各次调用间保持不变以命中上下文缓存
+
+        Yields:
+            Tuple[str, Any]: (字段名, 字段值)
+
+        Raises:
+            IncompleteJSONError: 响应被截断，已产出的字段仍然有效
+        """
+        max_retries = 3
+        for attempt in range(max_retries):
+            parser = SectionStreamParser()
+            usage_metadata = None
+            config = await self._generate_config(system_prompt)
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model,
+                    contents=prompt,
+                    config=config
+                )
+                async for chunk in stream:
+                    if chunk.usage_metadata is not None:
+                        # 每个块都带有累计用量，以最后一个为准
+                        usage_metadata = chunk.usage_metadata
+                    for section in parser.feed(chunk.text or ''):
+                        yield section
+                self._record_usage(usage_metadata)
+                parser.close()
+                return
+            except Exception as e:
+                if config is not None and config.cached_content:
+                    # 缓存内容可能已在服务端失效，下次调用重新注册
+                    self._cached_contents.clear()
+                # 已经产出过字段时不能重试，否则调用方会收到重复的字段
+                if parser.sections or attempt == max_retries - 1:
+                    raise
+                print(f"Gemini流式调用失败，准备重试: {e}")
+                await asyncio.sleep(2 ** attempt)
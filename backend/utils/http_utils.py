@@ -0,0 +1,91 @@
+import socket
+import ipaddress
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+from backend.utils.config import Config
+
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """创建大模型调用使用的长连接异步HTTP客户端
+
+    客户端在进程内长期复用：连接池保持keep-alive连接，安装了h2时启用HTTP/2多路复用，
+    并显式设置连接与读取超时，避免每次调用重新建立TLS连接。
+
+    Returns:
+        httpx.AsyncClient: 异步HTTP客户端
+    """
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec('h2') is not None,
+        limits=httpx.Limits(
+            max_connections=Config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            Config.LLM_READ_TIMEOUT,
+            connect=Config.LLM_CONNECT_TIMEOUT
+        )
+    )
+
+
+def check_webhook_url(url: str) -> List[str]:
+    """校验回调地址，防止客户端借服务端的回调请求访问内网（SSRF）
+
+    配置了Config.JOB_WEBHOOK_ALLOWED_HOSTS时只允许其中的主机；否则解析主机名，
+    任一地址为回环、私有、链路本地、保留或组播地址时拒绝。会解析DNS，不要在事件循环中直接调用。
+
+    Args:
+        url: 回调地址
+
+    Returns:
+        List[str]: 校验通过的IP地址，发送回调时应连接这些地址而不是重新解析主机名（防止DNS重绑定）；
+            允许列表中的主机可信，不解析DNS，返回空列表
+
+    Raises:
+        ValueError: 地址不允许回调
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("webhook_url必须是http或https地址")
+    host = parsed.hostname.rstrip('.').lower()
+    if Config.JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host not in Config.JOB_WEBHOOK_ALLOWED_HOSTS:
+            raise ValueError(f"webhook_url的主机{host}不在允许列表中")
+        return []
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (ValueError, OSError):
+        raise ValueError(f"无法解析webhook_url的主机{host}")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"webhook_url的主机{host}解析到非公网地址{ip}")
+    return addresses
+
+
+def pin_webhook_request(url: str, address: Optional[str]) -> Tuple[httpx.URL, Dict[str, str], Dict[str, str]]:
+    """把回调请求固定到已校验的IP地址
+
+    请求直接连接address，Host头保持原主机名；https请求通过sni_hostname扩展
+    用原主机名做SNI和证书校验。address为空（允许列表中的主机）时按原地址发送。
+
+    Args:
+        url: 回调地址
+        address: check_webhook_url返回的IP地址
+
+    Returns:
+        Tuple[httpx.URL, Dict[str, str], Dict[str, str]]: 请求地址、请求头和httpx请求扩展
+    """
+    original = httpx.URL(url)
+    if not address:
+        return original, {}, {}
+    pinned = original.copy_with(host=address.split('%')[0])
+    headers = {'Host': original.netloc.decode('ascii')}
+    extensions = {'sni_hostname': original.host} if original.scheme == 'https' else {}
+    return pinned, headers, extensions
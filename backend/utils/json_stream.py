@@ -0,0 +1,190 @@
+import re
+import json
+from typing import Any, Dict, List, Tuple
+
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+class IncompleteJSONError(ValueError):
+    """流结束时顶层JSON对象仍未闭合"""
+
+
+class SectionStreamParser:
+    """增量解析大模型流式输出的JSON，逐个产出顶层字段
+
+    按块喂入模型输出的文本，跳过Markdown代码块标记和JSON之前的任何说明文字，
+    每当一个顶层字段（如overall_sentiment、time_analysis）的值闭合时立即解析并返回，
+    无需等待整个文档结束。响应被截断时，已经闭合的字段仍然可用。
+
+    模型有时会照抄提示词模板中的 # 注释或留下尾随逗号，解析时会予以容忍。
+
+    用法:
+        parser = SectionStreamParser()
+        for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                ...
+        parser.close()  # 顶层对象未闭合时抛出IncompleteJSONError
+    """
+
+    # 解析状态
+    _BEFORE_OBJECT = 0  # 等待顶层对象的 {
+    _EXPECT_KEY = 1  # 顶层对象内，等待字段名
+    _IN_KEY = 2  # 读取字段名字符串
+    _EXPECT_COLON = 3  # 等待冒号
+    _EXPECT_VALUE = 4  # 等待字段值开始
+    _IN_VALUE = 5  # 读取字段值
+    _DONE = 6  # 顶层对象已闭合
+
+    def __init__(self):
+        self.sections: Dict[str, Any] = {}
+        self._state = self._BEFORE_OBJECT
+        self._key_buf: List[str] = []
+        self._value_buf: List[str] = []
+        self._key = ''
+        self._depth = 0  # 字段值内部的嵌套深度
+        self._in_string = False
+        self._escape = False
+        self._in_comment = False
+
+    @property
+    def complete(self) -> bool:
+        """顶层对象是否已经完整闭合"""
+        return self._state == self._DONE
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """喂入一段文本
+
+        Args:
+            chunk: 模型输出的文本片段
+
+        Returns:
+            List[Tuple[str, Any]]: 本次新闭合的顶层字段列表
+        """
+        completed = []
+        for char in chunk:
+            state = self._state
+            if state == self._DONE:
+                break
+
+            if state == self._BEFORE_OBJECT:
+                if char == '{':
+                    self._state = self._EXPECT_KEY
+                continue
+
+            if state == self._IN_KEY:
+                self._key_buf.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._key = json.loads(''.join(self._key_buf))
+                    self._key_buf = []
+                    self._state = self._EXPECT_COLON
+                continue
+
+            if state == self._IN_VALUE:
+                section = self._consume_value_char(char)
+                if section is not None:
+                    completed.append(section)
+                continue
+
+            # 以下为结构性位置，处理注释与空白
+            if self._in_comment:
+                if char == '\n':
+                    self._in_comment = False
+                continue
+            if char == '#':
+                self._in_comment = True
+                continue
+
+            if state == self._EXPECT_KEY:
+                if char == '"':
+                    self._key_buf = ['"']
+                    self._state = self._IN_KEY
+                elif char == '}':
+                    self._state = self._DONE
+            elif state == self._EXPECT_COLON:
+                if char == ':':
+                    self._state = self._EXPECT_VALUE
+            elif state == self._EXPECT_VALUE:
+                if not char.isspace():
+                    self._state = self._IN_VALUE
+                    self._value_buf = []
+                    self._depth = 0
+                    section = self._consume_value_char(char)
+                    if section is not None:
+                        completed.append(section)
+        return completed
+
+    def _consume_value_char(self, char: str):
+        """读取字段值中的一个字符，值结束时返回(字段名, 解析后的值)"""
+        if self._in_string:
+            self._value_buf.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            return None
+
+        if self._in_comment:
+            if char == '\n':
+                self._in_comment = False
+                self._value_buf.append(char)
+            return None
+
+        if char == '#':
+            self._in_comment = True
+            return None
+
+        if char == '"':
+            self._in_string = True
+        elif char in '{[':
+            self._depth += 1
+        elif char in '}]':
+            if self._depth == 0:
+                # 标量值之后直接遇到顶层对象的 }
+                section = self._finish_value()
+                self._state = self._DONE
+                return section
+            self._depth -= 1
+            if self._depth == 0:
+                self._value_buf.append(char)
+                section = self._finish_value()
+                self._state = self._EXPECT_KEY
+                return section
+        elif char == ',' and self._depth == 0:
+            section = self._finish_value()
+            self._state = self._EXPECT_KEY
+            return section
+        self._value_buf.append(char)
+        return None
+
+    def _finish_value(self):
+        """解析已读完的字段值"""
+        text = ''.join(self._value_buf).strip()
+        self._value_buf = []
+        if not text:
+            return None
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = json.loads(_TRAILING_COMMA.sub(r'\1', text))
+        self.sections[self._key] = value
+        return self._key, value
+
+    def close(self) -> Dict[str, Any]:
+        """结束解析
+
+        Returns:
+            Dict[str, Any]: 解析得到的全部顶层字段
+
+        Raises:
+            IncompleteJSONError: 顶层对象未闭合（响应被截断）
+        """
+        if not self.complete:
+            raise IncompleteJSONError(
+                f"JSON响应不完整，已解析字段: {list(self.sections.keys())}")
+        return self.sections
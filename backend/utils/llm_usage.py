@@ -0,0 +1,45 @@
+import threading
+from typing import Dict
+
+
+class LLMUsageStats:
+    """大模型调用的token用量统计
+
+    记录输入token中命中服务端前缀缓存（上下文缓存）的部分，用于确认系统提示词的缓存是否生效。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.last_cached_tokens = 0
+
+    def record(self, input_tokens: int, cached_tokens: int, output_tokens: int):
+        """记录一次调用的用量
+
+        Args:
+            input_tokens: 输入token数（包含命中缓存的部分）
+            cached_tokens: 命中缓存的输入token数
+            output_tokens: 输出token数
+        """
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens or 0
+            self.cached_tokens += cached_tokens or 0
+            self.output_tokens += output_tokens or 0
+            self.last_cached_tokens = cached_tokens or 0
+
+    def to_dict(self) -> Dict:
+        """导出统计信息"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'input_tokens': self.input_tokens,
+                'cached_tokens': self.cached_tokens,
+                'output_tokens': self.output_tokens,
+                'last_cached_tokens': self.last_cached_tokens,
+                'cache_hit_ratio': (round(self.cached_tokens / self.input_tokens, 4)
+                                    if self.input_tokens else 0.0)
+            }
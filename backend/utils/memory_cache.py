@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def expiry_from_cache_date(cache_date: str, valid_days: int) -> float:
+    """根据磁盘缓存的日期计算过期时间戳
+
+    磁盘缓存的判定规则是 (now - date).days <= valid_days，其中date为当天零点，
+    因此缓存在 date + (valid_days + 1) 天的零点失效，内存层与之保持一致。
+
+    Args:
+        cache_date: 缓存日期，格式YYYY-MM-DD
+        valid_days: 缓存有效天数
+
+    Returns:
+        float: 过期时间的Unix时间戳
+    """
+    date = datetime.strptime(cache_date, '%Y-%m-%d')
+    return (date + timedelta(days=valid_days + 1)).timestamp()
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at', 'mtime_ns', 'checked_at')
+
+    def __init__(self, value: Any, size: int, expires_at: float,
+                 mtime_ns: Optional[int], checked_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.mtime_ns = mtime_ns
+        self.checked_at = checked_at
+
+
+class MemoryCache:
+    """按字节数限制容量的进程内LRU缓存，作为磁盘缓存前面的一级缓存
+
+    - 容量按条目大小（取对应磁盘文件的字节数）累计，超出上限时淘汰最久未访问的条目
+    - 每个条目带有与磁盘缓存一致的过期时间
+    - 条目记录对应磁盘文件的mtime，至多每revalidate_seconds秒检查一次，
+      其他worker重写了磁盘文件时本进程的内存条目随之失效
+
+    缓存的值在命中时直接返回同一对象，调用方不应修改。
+    """
+
+    def __init__(self, max_bytes: int, revalidate_seconds: float = 5.0):
+        """初始化内存缓存
+
+        Args:
+            max_bytes: 容量上限（字节）
+            revalidate_seconds: 对照磁盘文件mtime重新校验的最小间隔（秒）
+        """
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, path: Optional[Path] = None) -> Optional[Any]:
+        """获取缓存值
+
+        Args:
+            key: 缓存键
+            path: 对应的磁盘文件，用于检测其他进程的重写
+
+        Returns:
+            Optional[Any]: 缓存值，未命中、已过期或磁盘文件已变化时返回None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now >= entry.expires_at:
+                self._remove(key)
+                self.misses += 1
+                return None
+            needs_check = (path is not None and entry.mtime_ns is not None
+                           and now - entry.checked_at >= self.revalidate_seconds)
+
+        if needs_check:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            with self._lock:
+                if self._entries.get(key) is not entry:
+                    self.misses += 1
+                    return None
+                if mtime_ns != entry.mtime_ns:
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                entry.checked_at = now
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, expires_at: float,
+            path: Optional[Path] = None, size: Optional[int] = None,
+            stat: Optional[os.stat_result] = None):
+        """写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            expires_at: 过期时间戳
+            path: 对应的磁盘文件，用于之后检测其他进程的重写
+            size: 条目大小（字节），默认取磁盘文件大小
+            stat: 读取磁盘文件之前得到的stat结果；从磁盘加载时应传入，
+                避免读取与stat之间文件被替换而记录了错误的mtime。
+                写入磁盘之后调用时可省略，由本方法对path做stat
+        """
+        mtime_ns = None
+        if path is not None:
+            try:
+                if stat is None:
+                    stat = os.stat(path)
+                mtime_ns = stat.st_mtime_ns
+                if size is None:
+                    size = stat.st_size
+            except OSError:
+                pass
+        size = size or 1
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _Entry(value, size, expires_at, mtime_ns, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def invalidate(self, key: str):
+        """使指定缓存键失效"""
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_prefix(self, prefix: str):
+        """使所有以prefix开头的缓存键失效"""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._remove(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        """删除条目，调用方需持有self._lock"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
@@ -2,10 +2,17 @@ import os
 import re
 import json
 import asyncio
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from backend.utils.config import Config
+from backend.utils.http_utils import create_async_http_client
+from backend.utils.json_stream import SectionStreamParser
+from backend.utils.llm_usage import LLMUsageStats
+
+DEFAULT_SYSTEM_PROMPT = "You are a professional stock analyst."
 
 def extract_json_from_markdown(text: str) -> str:
     """从Markdown格式的响应中提取JSON内容"""
@@ -23,26 +30,49 @@ class DeepSeekClient:
             api_key: DeepSeek API密钥
             model: 模型名称（默认deepseek-chat）
         """
+        self.api_key = api_key
+        self.base_url = base_url
+        # 长期复用的异步HTTP客户端，所有调用共享同一个连接池
+        self.http_client = create_async_http_client()
         self.llm = ChatOpenAI(
             model=model,
             api_key=api_key,
             base_url=base_url,  # DeepSeek API端点
             max_retries=3,  # 使用LangChain内置重试机制
+            timeout=httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+            http_async_client=self.http_client,
+            # 流式响应最后附带用量，其中包含命中硬盘缓存的输入token数
+            stream_usage=True,
         )
         self.parser = JsonOutputParser()
-
-    async def analyze_sentiment(self, prompt: str) -> Dict:
-        """情感分析（带JSON格式输出）"""
-        # 构建带格式要求的提示词
+        # 调用链在构造时编译一次，之后每次调用直接复用
+        # 系统提示词作为变量传入，内容原样发送；DeepSeek自动缓存请求的公共前缀，
+        # 固定的系统提示词放在最前面即可命中缓存
         prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "You are a professional stock analyst."),
+            ("system", "{system}"),
             ("human", "{input}"),
         ])
-        chain = prompt_template | self.llm | self.parser
-        
+        self.chain = prompt_template | self.llm | self.parser
+        self.stream_chain = prompt_template | self.llm
+        self.usage = LLMUsageStats()
+
+    async def warmup(self):
+        """预先建立到DeepSeek的TLS连接，避免首个请求承担握手延迟"""
+        await self.http_client.get(
+            f"{self.base_url}/models",
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self.http_client.aclose()
+
+    async def analyze_sentiment(self, prompt: str,
+                                system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> Dict:
+        """情感分析（带JSON格式输出）"""
         try:
             # 异步调用
-            result = await chain.ainvoke({"input": prompt})
+            result = await self.chain.ainvoke({"system": system_prompt, "input": prompt})
             return result
         except json.JSONDecodeError as e:
             # 处理格式错误的情况
@@ -50,6 +80,36 @@ class DeepSeekClient:
             json_text = extract_json_from_markdown(raw_response)
             return json.loads(json_text)
 
+    async def stream_sections(self, prompt: str,
+                              system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> AsyncIterator[Tuple[str, Any]]:
+        """流式情感分析，顶层字段一旦闭合立即产出
+
+        Args:
+            prompt: 提示词
+            system_prompt: 系统提示词，应在各次调用间保持不变以命中前缀缓存
+
+        Yields:
+            Tuple[str, Any]: (字段名, 字段值)
+
+        Raises:
+            IncompleteJSONError: 响应被截断，已产出的字段仍然有效
+        """
+        parser = SectionStreamParser()
+        async for chunk in self.stream_chain.astream({"system": system_prompt, "input": prompt}):
+            if chunk.usage_metadata:
+                self._record_usage(chunk.usage_metadata)
+            for section in parser.feed(chunk.content):
+                yield section
+        parser.close()
+
+    def _record_usage(self, usage_metadata: Dict):
+        """记录一次调用的token用量"""
+        cached_tokens = (usage_metadata.get('input_token_details') or {}).get('cache_read', 0)
+        self.usage.record(usage_metadata.get('input_tokens', 0), cached_tokens,
+                          usage_metadata.get('output_tokens', 0))
+        print(f"DeepSeek调用用量: 输入{usage_metadata.get('input_tokens', 0)} token"
+              f"（缓存命中{cached_tokens}），输出{usage_metadata.get('output_tokens', 0)} token")
+
 # 使用示例
 async def main():
     client = DeepSeekClient(
@@ -0,0 +1,250 @@
+import io
+import time
+import random
+import marshal
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+
+class RequestProfiler:
+    """按采样率对指定路径的请求做CPU分析（cProfile），结果累加为一份pstats
+
+    cProfile只记录开启它的线程，且同一线程同时只能有一个分析器，因此事件循环上
+    同一时间只分析一个请求，其他请求直接跳过；请求中通过asyncio.to_thread在线程池
+    执行的部分不在统计内。分析期间事件循环上其他协程的执行也会计入被分析的请求。
+    状态只在当前worker进程内有效。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.paths: Tuple[str, ...] = ()
+        self.sample_rate = 0.0
+        self.max_requests = 0
+        self.profiled = 0
+        self.skipped_busy = 0
+        self.started_at: Optional[float] = None
+        self._active = False
+        self._stats: Optional[pstats.Stats] = None
+
+    def start(self, paths: List[str], sample_rate: float, max_requests: int):
+        """开始采样，清空之前累加的结果
+
+        Args:
+            paths: 需要分析的请求路径前缀
+            sample_rate: 采样率（0-1]
+            max_requests: 分析的请求数达到该值后自动停止
+        """
+        with self._lock:
+            self.enabled = True
+            self.paths = tuple(paths)
+            self.sample_rate = sample_rate
+            self.max_requests = max_requests
+            self.profiled = 0
+            self.skipped_busy = 0
+            self.started_at = time.time()
+            self._stats = None
+
+    def stop(self):
+        """停止采样，保留已累加的结果"""
+        with self._lock:
+            self.enabled = False
+
+    def begin(self, path: str) -> Optional[cProfile.Profile]:
+        """请求开始时调用，被采样时返回已开启的分析器，否则返回None
+
+        Args:
+            path: 请求路径
+        """
+        if not self.enabled or not path.startswith(self.paths):
+            return None
+        if random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if not self.enabled:
+                return None
+            if self._active:
+                self.skipped_busy += 1
+                return None
+            self._active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 其他分析工具已在本线程开启
+            with self._lock:
+                self._active = False
+            return None
+        return profile
+
+    def end(self, profile: cProfile.Profile):
+        """请求结束时调用，把本次结果累加到汇总中"""
+        profile.disable()
+        with self._lock:
+            self._active = False
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.profiled += 1
+            if self.max_requests and self.profiled >= self.max_requests:
+                self.enabled = False
+
+    def status(self) -> Dict:
+        """采样状态"""
+        return {
+            'enabled': self.enabled,
+            'paths': list(self.paths),
+            'sample_rate': self.sample_rate,
+            'max_requests': self.max_requests,
+            'profiled_requests': self.profiled,
+            'skipped_busy': self.skipped_busy,
+            'started_at': self.started_at
+        }
+
+    def report(self, sort: str = 'cumulative', limit: int = 30) -> Optional[str]:
+        """按sort排序的前limit个函数的文本报告，还没有结果时返回None"""
+        with self._lock:
+            if self._stats is None:
+                return None
+            output = io.StringIO()
+            self._stats.stream = output
+            self._stats.sort_stats(sort).print_stats(limit)
+            return output.getvalue()
+
+    def dump(self) -> Optional[bytes]:
+        """导出pstats文件内容，可用pstats、snakeviz等工具打开，还没有结果时返回None"""
+        with self._lock:
+            if self._stats is None:
+                return None
+            # 与pstats.Stats.dump_stats写入的文件格式相同
+            return marshal.dumps(self._stats.stats)
+
+
+class MemoryProfiler:
+    """基于tracemalloc的内存快照与对比
+
+    第一次拍快照时开始跟踪，之后的分配才会被记录；跟踪期间内存分配会变慢，
+    排查结束后应调用stop。快照只保留最近的若干个。
+    """
+
+    def __init__(self, max_snapshots: int, frames: int):
+        """初始化内存分析
+
+        Args:
+            max_snapshots: 保留的快照数
+            frames: 每次分配记录的调用栈深度
+        """
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, Tuple[float, tracemalloc.Snapshot]] = {}
+        self._next_id = 1
+
+    @staticmethod
+    def _filter(snapshot: tracemalloc.Snapshot,
+                include: Optional[str] = None) -> tracemalloc.Snapshot:
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ]
+        if include:
+            filters.append(tracemalloc.Filter(True, include, all_frames=True))
+        return snapshot.filter_traces(filters)
+
+    @staticmethod
+    def _format(stats: List, limit: int) -> List[Dict]:
+        result = []
+        for stat in stats[:limit]:
+            entry = {
+                'size_bytes': stat.size,
+                'count': stat.count,
+                'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+            }
+            if isinstance(stat, tracemalloc.StatisticDiff):
+                entry['size_diff_bytes'] = stat.size_diff
+                entry['count_diff'] = stat.count_diff
+            result.append(entry)
+        return result
+
+    def snapshot(self, group_by: str = 'lineno', limit: int = 20) -> Dict:
+        """拍一个快照，返回快照编号和当前占用最多的分配位置
+
+        Args:
+            group_by: 分组方式，lineno、filename或traceback
+            limit: 返回的分配位置数
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            snapshot = tracemalloc.take_snapshot()
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'snapshot_id': snapshot_id,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'top': self._format(self._filter(snapshot).statistics(group_by), limit)
+        }
+
+    def diff(self, base_id: Optional[int] = None, snapshot_id: Optional[int] = None,
+             group_by: str = 'lineno', limit: int = 20, include: Optional[str] = None) -> Dict:
+        """对比两个快照，返回增长最多的分配位置
+
+        Args:
+            base_id: 基准快照编号，默认为倒数第二个快照
+            snapshot_id: 对比的快照编号，默认为最新的快照
+            group_by: 分组方式，lineno、filename或traceback
+            limit: 返回的分配位置数
+            include: 只统计调用栈中包含该文件（支持通配符）的分配，如"*stock_cache.py"
+
+        Raises:
+            KeyError: 快照不存在
+        """
+        with self._lock:
+            ids = sorted(self._snapshots)
+            if snapshot_id is None:
+                snapshot_id = ids[-1] if ids else None
+            if base_id is None:
+                earlier = [i for i in ids if snapshot_id is not None and i < snapshot_id]
+                base_id = earlier[-1] if earlier else None
+            if base_id not in self._snapshots or snapshot_id not in self._snapshots:
+                raise KeyError("快照不存在，对比需要至少两个快照")
+            base_at, base = self._snapshots[base_id]
+            taken_at, snapshot = self._snapshots[snapshot_id]
+        stats = self._filter(snapshot, include).compare_to(self._filter(base, include), group_by)
+        return {
+            'base_id': base_id,
+            'snapshot_id': snapshot_id,
+            'seconds_between': round(taken_at - base_at, 3),
+            'size_diff_bytes': sum(stat.size_diff for stat in stats),
+            'top': self._format(stats, limit)
+        }
+
+    def status(self) -> Dict:
+        """跟踪状态和已保留的快照"""
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'snapshots': [{'snapshot_id': snapshot_id, 'taken_at': taken_at}
+                          for snapshot_id, (taken_at, _) in sorted(self._snapshots.items())]
+        }
+
+    def stop(self):
+        """停止跟踪并丢弃全部快照"""
+        with self._lock:
+            self._snapshots.clear()
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
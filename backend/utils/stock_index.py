@@ -0,0 +1,298 @@
+import os
+import mmap
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from backend.utils.file_utils import atomic_write_bytes
+from backend.utils.fuzzy_search import SymSpellIndex
+
+# 快照文件格式（本机字节序，快照只在本机生成和使用）：
+#   文件头: magic, 版本, 标志位, 股票数, n-gram数, 源文件mtime_ns, 源文件字节数
+#   分区表: 各分区的(偏移, 字节数)，每个分区按8字节对齐
+#   codes: 按代码排序的股票代码，每个CODE_WIDTH字节，不足补\0
+#   name_offsets: 每只股票名称在names中的起始偏移(uint32)，末尾多一项为总长度
+#   names: UTF-8编码的股票名称依次拼接
+#   gram_keys: 名称中出现的单字和相邻两字组成的键(uint64)，升序
+#   posting_offsets: 每个键的倒排列表在postings中的起始位置(uint32)，末尾多一项
+#   postings: 倒排列表，股票序号(uint32)升序
+MAGIC = b'STKIDX\x00\x00'
+VERSION = 1
+FLAG_COMPLETE = 1  # 快照包含全部A股，不在其中的查询无需再请求数据源
+CODE_WIDTH = 8
+
+_HEADER = struct.Struct('=8sIIIIqq')
+_SECTIONS = ('codes', 'name_offsets', 'names', 'gram_keys', 'posting_offsets', 'postings')
+_SECTION_TABLE = struct.Struct('=' + 'QQ' * len(_SECTIONS))
+
+
+def _gram_key(first: str, second: str = '') -> int:
+    """单字或两字n-gram的键：两个码点各占21位"""
+    return (ord(first) << 21) | (ord(second) if second else 0)
+
+
+def build_stock_index(stocks: Iterable[Dict], path: Path, complete: bool = False,
+                      source_mtime_ns: int = 0, source_size: int = 0) -> int:
+    """编译股票搜索快照并原子地写入文件
+
+    Args:
+        stocks: 股票列表，每项包含code和name，代码重复时保留第一项
+        path: 快照文件路径
+        complete: 股票列表是否为全部A股
+        source_mtime_ns: 编译所用股票数据文件的mtime，用于判断快照是否过期
+        source_size: 编译所用股票数据文件的字节数
+
+    Returns:
+        int: 快照中的股票数
+    """
+    by_code = {}
+    for stock in stocks:
+        code = stock['code']
+        if code not in by_code and code.isascii() and len(code) <= CODE_WIDTH:
+            by_code[code] = stock['name']
+    codes = sorted(by_code)
+
+    name_offsets = array('I', [0])
+    names = bytearray()
+    postings_by_key = defaultdict(list)
+    for i, code in enumerate(codes):
+        name = by_code[code]
+        names += name.encode('utf-8')
+        name_offsets.append(len(names))
+        keys = {_gram_key(char) for char in name}
+        keys.update(_gram_key(a, b) for a, b in zip(name, name[1:]))
+        for key in keys:
+            postings_by_key[key].append(i)
+
+    gram_keys = array('Q', sorted(postings_by_key))
+    posting_offsets = array('I', [0])
+    postings = array('I')
+    for key in gram_keys:
+        postings.extend(postings_by_key[key])
+        posting_offsets.append(len(postings))
+
+    sections = [
+        b''.join(code.encode('ascii').ljust(CODE_WIDTH, b'\0') for code in codes),
+        name_offsets.tobytes(),
+        bytes(names),
+        gram_keys.tobytes(),
+        posting_offsets.tobytes(),
+        postings.tobytes()
+    ]
+
+    offset = _HEADER.size + _SECTION_TABLE.size
+    table = []
+    body = bytearray()
+    for data in sections:
+        padding = -offset % 8
+        body += b'\0' * padding
+        offset += padding
+        table.extend((offset, len(data)))
+        body += data
+        offset += len(data)
+
+    header = _HEADER.pack(MAGIC, VERSION, FLAG_COMPLETE if complete else 0,
+                          len(codes), len(gram_keys), source_mtime_ns, source_size)
+    atomic_write_bytes(path, header + _SECTION_TABLE.pack(*table) + bytes(body))
+    return len(codes)
+
+
+class StockIndex:
+    """通过mmap只读打开的股票搜索快照
+
+    打开快照不需要解析或构建任何Python对象，多个worker通过操作系统页缓存共享同一份数据。
+    快照被重建（原子替换文件）后，已打开的实例继续使用旧文件，需重新打开才能看到新数据。
+    """
+
+    def __init__(self, path: Path):
+        """打开快照
+
+        Args:
+            path: 快照文件路径
+
+        Raises:
+            ValueError: 文件不是当前版本的快照
+        """
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # 用于判断磁盘上的快照是否已被替换
+        self.file_id = (stat.st_ino, stat.st_mtime_ns)
+
+        magic, version, flags, count, gram_count, source_mtime_ns, source_size = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"股票索引快照格式不兼容: {path}")
+        self.count = count
+        self.complete = bool(flags & FLAG_COMPLETE)
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+
+        table = _SECTION_TABLE.unpack_from(self._mmap, _HEADER.size)
+        view = memoryview(self._mmap)
+        regions = {
+            name: view[table[2 * i]:table[2 * i] + table[2 * i + 1]]
+            for i, name in enumerate(_SECTIONS)
+        }
+        self._codes_start = table[0]
+        self._codes_end = table[0] + table[1]
+        self._codes = regions['codes']
+        self._name_offsets = regions['name_offsets'].cast('I')
+        self._names = regions['names']
+        self._gram_keys = regions['gram_keys'].cast('Q')
+        self._posting_offsets = regions['posting_offsets'].cast('I')
+        self._postings = regions['postings'].cast('I')
+        # 近似查找索引在第一次需要时才构建，随快照一起被替换
+        self._fuzzy_lock = threading.Lock()
+        self._fuzzy_codes: Optional[SymSpellIndex] = None
+        self._fuzzy_names: Optional[SymSpellIndex] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _code_at(self, i: int) -> bytes:
+        return bytes(self._codes[i * CODE_WIDTH:(i + 1) * CODE_WIDTH])
+
+    def _stock_at(self, i: int) -> Dict:
+        return {
+            'code': self._code_at(i).rstrip(b'\0').decode('ascii'),
+            'name': bytes(self._names[self._name_offsets[i]:self._name_offsets[i + 1]])
+            .decode('utf-8')
+        }
+
+    def get(self, code: str) -> Optional[Dict]:
+        """按完整代码查找股票（二分查找）
+
+        Args:
+            code: 股票代码
+
+        Returns:
+            Optional[Dict]: 股票信息，未找到时返回None
+        """
+        if not code.isascii() or len(code) > CODE_WIDTH:
+            return None
+        target = code.encode('ascii').ljust(CODE_WIDTH, b'\0')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._code_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._code_at(lo) == target:
+            return self._stock_at(lo)
+        return None
+
+    def _posting(self, key: int) -> memoryview:
+        i = bisect_left(self._gram_keys, key)
+        if i < len(self._gram_keys) and self._gram_keys[i] == key:
+            return self._postings[self._posting_offsets[i]:self._posting_offsets[i + 1]]
+        return self._postings[0:0]
+
+    def _match_names(self, query: str) -> List[int]:
+        """名称包含query的股票序号"""
+        if len(query) == 1:
+            return list(self._posting(_gram_key(query)))
+        postings = sorted(
+            (self._posting(_gram_key(a, b)) for a, b in zip(query, query[1:])),
+            key=len
+        )
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        if len(query) == 2:
+            return list(candidates)
+        # 所有两字组合都出现不代表它们相邻，需要再确认一次
+        encoded = query.encode('utf-8')
+        return [
+            i for i in candidates
+            if encoded in self._names[self._name_offsets[i]:self._name_offsets[i + 1]].tobytes()
+        ]
+
+    def _match_codes(self, query: str) -> List[int]:
+        """代码包含query的股票序号，直接在映射的代码分区上查找"""
+        if not query.isascii() or len(query) > CODE_WIDTH:
+            return []
+        needle = query.encode('ascii')
+        matches = []
+        pos = self._mmap.find(needle, self._codes_start, self._codes_end)
+        while pos != -1:
+            offset = pos - self._codes_start
+            i, start = divmod(offset, CODE_WIDTH)
+            if start + len(needle) <= CODE_WIDTH:
+                matches.append(i)
+            pos = self._mmap.find(needle, pos + 1, self._codes_end)
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """查找名称或代码包含query的股票
+
+        Args:
+            query: 搜索关键词
+            limit: 最多返回的条数
+
+        Returns:
+            List[Dict]: 按代码排序的股票列表
+        """
+        if not query:
+            return []
+        indices = sorted(set(self._match_names(query)) | set(self._match_codes(query)))
+        if limit is not None:
+            indices = indices[:limit]
+        return [self._stock_at(i) for i in indices]
+
+    def _build_fuzzy(self):
+        """由快照构建代码和名称的近似查找索引，词的序号即股票序号"""
+        with self._fuzzy_lock:
+            if self._fuzzy_names is not None:
+                return
+            codes = SymSpellIndex(max_distance=2)
+            names = SymSpellIndex(max_distance=2)
+            for i in range(self.count):
+                stock = self._stock_at(i)
+                codes.add(stock['code'])
+                names.add(stock['name'])
+            self._fuzzy_codes = codes
+            self._fuzzy_names = names
+
+    @staticmethod
+    def _name_max_distance(query: str) -> int:
+        """名称允许的编辑距离：两个字的名称不做近似匹配，三到四个字允许1处错误，更长允许2处"""
+        if len(query) <= 2:
+            return 0
+        return 1 if len(query) <= 4 else 2
+
+    def fuzzy_search(self, query: str, limit: int = 10) -> List[Dict]:
+        """按编辑距离查找与query相近的股票代码或名称，用于纠正输入错误
+
+        六位数字按代码匹配，允许2处错误（包括相邻数字交换，如600159与600519）；
+        其他按名称匹配，如"贵洲茅台"。
+
+        Args:
+            query: 搜索关键词
+            limit: 最多返回的条数
+
+        Returns:
+            List[Dict]: 按编辑距离从小到大排列的股票（相邻字符交换排在替换之前），每项额外包含distance
+        """
+        query = query.strip()
+        if query.isdigit():
+            if len(query) != 6:
+                return []
+            index_name, max_distance = '_fuzzy_codes', 2
+        else:
+            max_distance = self._name_max_distance(query)
+            if max_distance == 0:
+                return []
+            index_name = '_fuzzy_names'
+        if self._fuzzy_names is None:
+            self._build_fuzzy()
+        matches = getattr(self, index_name).lookup(query, max_distance)[:limit]
+        return [{**self._stock_at(i), 'distance': distance} for i, distance in matches]
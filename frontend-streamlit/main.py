@@ -1,10 +1,17 @@
 import streamlit as st
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 需要确保中文字体支持（在系统或代码中配置）
 # 基本配置
 BACKEND_URL = "http://localhost:8000"  # 根据实际后端地址修改
+SEARCH_MIN_QUERY_LENGTH = 2  # 输入达到该长度才搜索
+SEARCH_CACHE_TTL = 300  # 搜索结果缓存时间（秒）
+ANALYSIS_CACHE_TTL = 600  # 分析结果缓存时间（秒）
+SEARCH_TIMEOUT = (3.05, 10)  # 搜索请求的(连接, 读取)超时（秒）
+ANALYSIS_TIMEOUT = (3.05, 180)  # 分析请求需要等待大模型，读取超时更长
 st.set_page_config(page_title="股票舆情分析系统", layout="wide")
 
 # 初始化session状态
@@ -16,15 +23,52 @@ if "analysis_data" not in st.session_state:
     st.session_state.analysis_data = None
 
 
-def search_stocks(query: str):
-    """调用后端搜索股票接口"""
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """所有用户会话共享的HTTP会话，复用到后端的长连接"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=20,
+        # 只对连接失败重试，不重试已经发出的分析请求
+        max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.3)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=SEARCH_CACHE_TTL, show_spinner=False)
+def fetch_stock_options(query: str) -> list:
+    """搜索股票，相同关键词在缓存期内不再请求后端"""
+    response = get_http_session().get(
+        f"{BACKEND_URL}/api/stocks/search",
+        params={"query": query},
+        timeout=SEARCH_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=ANALYSIS_CACHE_TTL, show_spinner=False)
+def fetch_analysis(stock_code: str) -> dict:
+    """获取股票分析结果，同一股票在缓存期内不再请求后端"""
+    response = get_http_session().get(
+        f"{BACKEND_URL}/api/stock-analysis/{stock_code}",
+        timeout=ANALYSIS_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def search_stocks():
+    """搜索框内容变化时调用后端搜索股票接口"""
+    query = st.session_state.search_input.strip()
+    if len(query) < SEARCH_MIN_QUERY_LENGTH:
+        st.session_state.stock_options = []
+        return
     try:
-        response = requests.get(
-            f"{BACKEND_URL}/api/stocks/search",
-            params={"query": query}
-        )
-        response.raise_for_status()
-        st.session_state.stock_options = response.json()
+        st.session_state.stock_options = fetch_stock_options(query)
     except requests.exceptions.RequestException as e:
         st.error(f"搜索股票失败: {str(e)}")
         st.session_state.stock_options = []
@@ -34,11 +78,7 @@ def analyze_stock(stock_code: str):
     """调用股票分析接口"""
     try:
         with st.spinner("正在分析，请稍候..."):
-            response = requests.get(
-                f"{BACKEND_URL}/api/stock-analysis/{stock_code}"
-            )
-            response.raise_for_status()
-            st.session_state.analysis_data = response.json()
+            st.session_state.analysis_data = fetch_analysis(stock_code)
     except requests.exceptions.HTTPError as e:
         st.error(f"分析失败: {e.response.json().get('detail', '未知错误')}")
     except requests.exceptions.RequestException as e:
@@ -53,17 +93,15 @@ st.title("📈 股票舆情分析系统")
 # 搜索栏
 search_col, analysis_col = st.columns([3, 1])
 with search_col:
-    search_query = st.text_input(
+    # 只在输入内容变化时搜索，其他控件交互引起的重新运行不会请求后端
+    st.text_input(
         "输入股票名称或代码",
         placeholder="输入关键词搜索股票...",
         key="search_input",
-        help="支持股票名称或代码模糊搜索"
+        on_change=search_stocks,
+        help=f"支持股票名称或代码模糊搜索，至少输入{SEARCH_MIN_QUERY_LENGTH}个字符"
     )
 
-# 实时搜索（输入变化时触发）
-if search_query:
-    search_stocks(search_query)
-
 # 股票选择框
 if st.session_state.stock_options:
     selected = st.selectbox(
@@ -102,18 +140,19 @@ if st.session_state.analysis_data:
     # 时间趋势分析
     with st.container():
         st.subheader("⏳ 时间趋势分析")
-        df_time = pd.DataFrame(data['time_analysis']['trend'])
-        print(df_time)
-
-        df_time['date'] = pd.to_datetime(df_time['date'])
-
-        # 趋势图
-        tab1, tab2 = st.tabs(["趋势图表", "关键事件"])
-        with tab1:
+        trend = data['time_analysis']['trend']
+
+        # 图表和事件列表只渲染当前选中的一个
+        view = st.radio("查看", ["趋势图表", "关键事件"], horizontal=True,
+                        label_visibility="collapsed")
+        if not trend:
+            st.info("暂无时间趋势数据")
+        elif view == "趋势图表":
+            df_time = pd.DataFrame(trend)
+            df_time['date'] = pd.to_datetime(df_time['date'])
             st.line_chart(df_time.set_index('date')['score'], use_container_width=True)
-
-        with tab2:
-            for event in data['time_analysis']['trend']:
+        else:
+            for event in trend:
                 with st.expander(f"{event['date']} - 评分 {event['score']}"):
                     for e in event['key_events']:
                         st.markdown(f"**{e['title']}**  \n{e['description']}")
@@ -192,13 +231,13 @@ if st.session_state.analysis_data:
     # 新闻分析
     with st.container():
         st.subheader("📰 相关新闻")
-        for news in data['news_analysis']:
-            with st.expander(f"{news['title']} - {news['source']}"):
-                st.markdown(f"""
-                    **发布时间**: {news['publish_time']}  
-                    **来源**: {news['source']}  
-                    **内容摘要**: {news['content'][:200]}...  
-                    [查看原文]({news['url']})
-                """)
-
-
+        # 新闻列表较长，按需展开
+        if st.toggle(f"显示相关新闻（{len(data['news_analysis'])}条）", key="show_news"):
+            for news in data['news_analysis']:
+                with st.expander(f"{news['title']} - {news['source']}"):
+                    st.markdown(f"""
+                        **发布时间**: {news['publish_time']}  
+                        **来源**: {news['source']}  
+                        **内容摘要**: {news['content'][:200]}...  
+                        [查看原文]({news['url']})
+                    """)
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from backend.utils.config import Config
+from backend.core.news_record import NewsRecord
+from backend.core.sentiment_analyzer import SentimentAnalyzer
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """把缓存目录和各数据库重定向到临时目录，测试不读写仓库中的data目录"""
+    monkeypatch.setattr(Config, 'NEWS_CACHE_DIR', tmp_path / 'news_cache')
+    monkeypatch.setattr(Config, 'SENTIMENT_CACHE_DIR', tmp_path / 'sentiment_cache')
+    monkeypatch.setattr(Config, 'STOCKS_CACHE_DIR', tmp_path / 'stocks_cache')
+    monkeypatch.setattr(Config, 'SECTOR_CACHE_DIR', tmp_path / 'sector_cache')
+    monkeypatch.setattr(Config, 'SENTIMENT_HISTORY_DB', tmp_path / 'sentiment_history' / 'history.db')
+    monkeypatch.setattr(Config, 'ARTICLE_STORE_DB', tmp_path / 'articles' / 'articles.db')
+    monkeypatch.setattr(Config, 'NEWS_INDEX_DB', tmp_path / 'news_index' / 'news.db')
+    monkeypatch.setattr(Config, 'JOB_DB', tmp_path / 'jobs' / 'jobs.db')
+    return tmp_path
+
+
+def make_news(title='标题', content='内容', publish_time='2024-03-01 09:30:00',
+              source='证券时报', url='https://example.com') -> NewsRecord:
+    """构造测试新闻，未指定的字段使用固定默认值"""
+    return NewsRecord(title, content, publish_time, source, url)
+
+
+class FakeCrawler:
+    """从预设新闻字典返回新闻的爬虫，记录抓取次数"""
+
+    def __init__(self, news=None):
+        self.news = news if news is not None else {}
+        self.calls = 0
+
+    def get_stock_news(self, stock_code, days=None, max_news=None):
+        self.calls += 1
+        return list(self.news.get(stock_code, []))
+
+    def refresh_stock_news(self, stock_code):
+        return self.get_stock_news(stock_code)
+
+
+class FakeAnalyzer:
+    """返回固定分数的情感分析器，记录分析过的股票，设置error时分析失败"""
+
+    def __init__(self, score=0.5, label='中性', error=None):
+        self.score = score
+        self.label = label
+        self.error = error
+        self.analyzed = []
+
+    async def analyze_sentiment(self, news_list, stock_code, priority='interactive',
+                                consumer='default', mode='deep'):
+        self.analyzed.append(stock_code)
+        if self.error:
+            raise self.error
+        return {'stock_code': stock_code, 'news': news_list, 'consumer': consumer,
+                'analysis_summary': {'overall_score': self.score,
+                                     'sentiment_label': self.label,
+                                     'confidence_index': 0.6}}
+
+
+class FakeLLMClient:
+    """按预设结果逐个维度输出的大模型客户端，记录收到的提示词"""
+
+    def __init__(self):
+        self.responses = []
+        self.prompts = []
+        self.delay = 0.0
+
+    async def stream_sections(self, prompt, system_prompt):
+        self.prompts.append(prompt)
+        response = self.responses.pop(0) if self.responses else {
+            'overall_sentiment': {'score': 0.8, 'label': '看好', 'summary': '大模型分析'}}
+        await asyncio.sleep(self.delay)
+        for key, value in response.items():
+            yield key, value
+
+    async def warmup(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def analyzer(data_dir, monkeypatch):
+    """使用假大模型客户端的情感分析器"""
+    monkeypatch.setattr(Config, 'DEEPSEEK_API_KEY', 'test-key')
+    sentiment_analyzer = SentimentAnalyzer()
+    sentiment_analyzer.client = FakeLLMClient()
+    sentiment_analyzer.batcher.client = sentiment_analyzer.client
+    return sentiment_analyzer
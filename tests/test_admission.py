@@ -0,0 +1,129 @@
+import copy
+import asyncio
+import pytest
+from backend.core.admission import AdmissionController, Overloaded
+from backend.utils.config import Config
+from tests.conftest import make_news
+
+
+@pytest.fixture(autouse=True)
+def service_time(monkeypatch):
+    monkeypatch.setattr(Config, 'ADMISSION_DEFAULT_SERVICE_SECONDS', 10)
+    monkeypatch.setattr(Config, 'ADMISSION_MAX_RETRY_AFTER', 60)
+
+
+def test_admits_up_to_limit_then_queues_in_order():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+        first = await admission.acquire()
+        order = []
+
+        async def request(label):
+            async with admission.admit():
+                order.append(label)
+
+        tasks = [asyncio.create_task(request(label)) for label in ('a', 'b')]
+        await asyncio.sleep(0)
+        assert admission.metrics()['queued'] == 2
+        admission.release(first)
+        await asyncio.gather(*tasks)
+        return admission, order
+
+    admission, order = asyncio.run(main())
+    assert order == ['a', 'b']
+    metrics = admission.metrics()
+    assert (metrics['in_flight'], metrics['queued'], metrics['admitted']) == (0, 0, 3)
+
+
+def test_rejects_when_queue_is_full():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        await admission.acquire()
+        queued = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as error:
+            await admission.acquire()
+        queued.cancel()
+        return admission, error.value
+
+    admission, error = asyncio.run(main())
+    # 一个在途、一个排队，队尾还需等待 10 × 2 / 1 秒
+    assert error.retry_after == 20
+    assert admission.rejected == 1
+
+
+def test_rejects_after_queue_timeout():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=5, queue_timeout=0.01)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as error:
+            await admission.acquire()
+        return admission, error.value
+
+    admission, error = asyncio.run(main())
+    assert admission.timed_out == 1 and admission.queued == 0
+    assert error.retry_after == 10
+
+
+def test_retry_after_uses_observed_service_time():
+    admission = AdmissionController(max_in_flight=2, max_queue=5, queue_timeout=5)
+    admission.durations.extend([3.0, 5.0])
+    assert admission.retry_after() == 2
+    admission.durations.extend([1000.0] * 10)
+    assert admission.retry_after() == 60
+    admission.durations.clear()
+    admission.durations.append(0.01)
+    assert admission.retry_after() == 1
+
+
+def test_cancelled_waiter_is_skipped():
+    async def main():
+        admission = AdmissionController(max_in_flight=1, max_queue=5, queue_timeout=5)
+        first = await admission.acquire()
+        cancelled = asyncio.create_task(admission.acquire())
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        admission.release(first)
+        await asyncio.wait_for(waiting, 1)
+        return admission
+
+    admission = asyncio.run(main())
+    assert (admission.in_flight, admission.queued) == (1, 0)
+
+
+def test_formatting_does_not_mutate_cached_results(analyzer):
+    news = [make_news('年报发布')]
+    result = {'overall_sentiment': {'score': 0.8, 'label': '看好', 'summary': '业绩增长'},
+              'topic_analysis': {'financial_performance': {'score': 0.9, 'summary': '增长'}}}
+    original = copy.deepcopy(result)
+
+    first = analyzer._format_response(result, news)
+    second = analyzer._format_response(result, news)
+
+    assert result == original
+    assert first == second
+
+
+def test_stale_analysis_for_degraded_responses(analyzer):
+    news = [make_news('年报发布')]
+    assert analyzer.get_stale_analysis(news, '600519') is None
+    asyncio.run(analyzer.analyze_sentiment(news, '600519'))
+
+    # 降级时返回最近一次的大模型结果，与当前新闻是否一致无关
+    stale = analyzer.get_stale_analysis([make_news('新的新闻')], '600519')
+    assert stale['analysis_summary']['overall_score'] == 0.8
+    assert analyzer.get_stale_analysis([make_news('新的新闻')], '600519') == stale
+
+
+def test_cached_results_stay_unchanged_across_requests(analyzer):
+    news = [make_news('年报发布')]
+    first = asyncio.run(analyzer.analyze_sentiment(news, '600519'))
+    cache_key = analyzer._generate_cache_key(news, 1, '600519')
+    cached = copy.deepcopy(analyzer.memory_cache.get(cache_key))
+
+    second = asyncio.run(analyzer.analyze_sentiment(news, '600519'))
+    assert analyzer.memory_cache.get(cache_key) == cached
+    assert second == first
+    assert len(analyzer.client.prompts) == 1
@@ -0,0 +1,55 @@
+import time
+from backend.core.article_store import ArticleStore
+from tests.conftest import make_news
+
+
+CONTENT = '白酒行业政策调整，' * 20
+
+
+def test_same_article_is_stored_once_and_shared(tmp_path):
+    store = ArticleStore(tmp_path / 'articles.db')
+    first = store.put_many([make_news('行业政策', CONTENT)])[0]
+    # 另一只股票的新闻缓存中出现同一篇新闻
+    second = store.put_many([make_news('行业政策', CONTENT), make_news('另一条', CONTENT)])
+
+    assert second[0] is first
+    assert store.stats()['entries'] == 2
+
+
+def test_round_trip_through_compressed_storage(tmp_path):
+    news = make_news('行业政策', CONTENT)
+    ArticleStore(tmp_path / 'articles.db').put_many([news])
+
+    # 新进程中没有已解析的对象，从数据库解压读取
+    store = ArticleStore(tmp_path / 'articles.db')
+    found = store.get_many([news.digest, 'missing'])
+
+    assert list(found) == [news.digest]
+    assert found[news.digest].to_dict() == news.to_dict()
+    assert store.get_many([news.digest])[news.digest] is found[news.digest]
+    stats = store.stats()
+    assert stats['stored_bytes'] < stats['raw_bytes']
+
+
+def test_in_memory_records_are_bounded(tmp_path):
+    store = ArticleStore(tmp_path / 'articles.db', max_records=2)
+    news = store.put_many([make_news(f"新闻{i}", CONTENT) for i in range(3)])
+
+    assert store.stats()['records_in_memory'] == 2
+    assert news[0].digest not in store._records
+    assert store.get_many([news[0].digest])[news[0].digest].title == '新闻0'
+
+
+def test_prune_removes_unreferenced_articles(tmp_path):
+    store = ArticleStore(tmp_path / 'articles.db')
+    old, recent = make_news('旧闻', CONTENT), make_news('新闻', CONTENT)
+    store.put_many([old, recent])
+    with store._connect() as conn:
+        conn.execute("UPDATE articles SET last_seen = ? WHERE digest = ?",
+                     (time.time() - 10 * 86400, old.digest))
+
+    assert store.prune(7) == 1
+    assert store.stats()['entries'] == 1
+    # 再次被引用时刷新last_seen
+    store.put_many([recent])
+    assert store.prune(7) == 0
@@ -0,0 +1,143 @@
+import os
+import time
+from backend.core.cache_manager import CacheRetention
+from backend.utils.cache_stats import CacheStats
+from backend.utils.file_utils import get_lock_path, FileLock
+from backend.utils.memory_cache import MemoryCache
+
+DAY = 86400
+
+
+def make_retention(cache_dir, max_age_days=3, max_entries=100, max_bytes=10 ** 6):
+    return CacheRetention('test', cache_dir, MemoryCache(max_bytes=10 ** 6), CacheStats(), {
+        'max_age_days': max_age_days,
+        'max_entries': max_entries,
+        'max_bytes': max_bytes
+    })
+
+
+def write_entry(cache_dir, key, written_ago=0.0, accessed_ago=0.0, size=10):
+    path = cache_dir / f"{key}.json"
+    path.write_bytes(b'x' * size)
+    now = time.time()
+    os.utime(path, (now - accessed_ago, now - written_ago))
+    return path
+
+
+def test_sweep_deletes_expired_entries(tmp_path):
+    retention = make_retention(tmp_path, max_age_days=3)
+    old = write_entry(tmp_path, 'old', written_ago=4 * DAY)
+    fresh = write_entry(tmp_path, 'fresh', written_ago=DAY)
+
+    result = retention.sweep()
+
+    assert result['expired'] == 1 and result['evicted'] == 0
+    assert not old.exists() and fresh.exists()
+
+
+def test_sweep_evicts_least_recently_accessed_over_entry_limit(tmp_path):
+    retention = make_retention(tmp_path, max_entries=2)
+    write_entry(tmp_path, 'a', accessed_ago=300)
+    write_entry(tmp_path, 'b', accessed_ago=100)
+    write_entry(tmp_path, 'c', accessed_ago=200)
+
+    assert retention.sweep()['evicted'] == 1
+    assert sorted(p.stem for p in tmp_path.glob('*.json')) == ['b', 'c']
+
+
+def test_sweep_evicts_over_byte_limit(tmp_path):
+    retention = make_retention(tmp_path, max_bytes=25)
+    write_entry(tmp_path, 'a', accessed_ago=300, size=10)
+    write_entry(tmp_path, 'b', accessed_ago=200, size=10)
+    write_entry(tmp_path, 'c', accessed_ago=100, size=10)
+
+    retention.sweep()
+    assert sorted(p.stem for p in tmp_path.glob('*.json')) == ['b', 'c']
+
+
+def test_memory_hits_count_as_accesses_for_eviction(tmp_path):
+    retention = make_retention(tmp_path, max_entries=1)
+    write_entry(tmp_path, 'a', accessed_ago=300)
+    write_entry(tmp_path, 'b', accessed_ago=100)
+    # a只在内存层被命中过，磁盘atime仍然较旧
+    retention.cache_stats.record_hit('a')
+
+    retention.sweep()
+    assert [p.stem for p in tmp_path.glob('*.json')] == ['a']
+
+
+def test_sweep_invalidates_memory_tier(tmp_path):
+    retention = make_retention(tmp_path, max_age_days=1)
+    path = write_entry(tmp_path, 'old', written_ago=2 * DAY)
+    retention.memory_cache.set('old', 'value', expires_at=time.time() + 3600, path=path)
+
+    retention.sweep()
+    assert retention.memory_cache.get('old') is None
+
+
+def test_sweep_removes_stale_temp_files_and_unused_locks(tmp_path):
+    retention = make_retention(tmp_path)
+    write_entry(tmp_path, 'live')
+    stale_tmp = tmp_path / '.live.json.123.tmp'
+    stale_tmp.write_text('')
+    os.utime(stale_tmp, (time.time() - 7200, time.time() - 7200))
+    recent_tmp = tmp_path / '.live.json.456.tmp'
+    recent_tmp.write_text('')
+    for key in ('live', 'gone', 'held'):
+        get_lock_path(tmp_path, key).parent.mkdir(exist_ok=True)
+        get_lock_path(tmp_path, key).touch()
+
+    holder = FileLock(get_lock_path(tmp_path, 'held'), timeout=0)
+    assert holder.acquire()
+    try:
+        retention.sweep()
+    finally:
+        holder.release()
+
+    assert not stale_tmp.exists() and recent_tmp.exists()
+    assert get_lock_path(tmp_path, 'live').exists()
+    assert not get_lock_path(tmp_path, 'gone').exists()
+    assert get_lock_path(tmp_path, 'held').exists()
+
+
+def test_lock_stays_exclusive_after_lock_file_is_deleted(tmp_path):
+    path = get_lock_path(tmp_path, 'key')
+    holder = FileLock(path, timeout=0)
+    assert holder.acquire()
+    # waiter已经打开了旧的锁文件，正在等待
+    waiter = FileLock(path, timeout=0)
+    assert not waiter.acquire()
+    waiter._fd = os.open(str(path), os.O_RDWR)
+
+    # 清理任务删除锁文件后，新的进程在同一路径上创建了新文件并持有
+    holder.release()
+    os.unlink(path)
+    newcomer = FileLock(path, timeout=0)
+    assert newcomer.acquire()
+
+    # waiter锁住的旧文件已不在路径上，必须重新打开，不能与newcomer同时持有
+    assert not waiter.acquire(timeout=0)
+    newcomer.release()
+    assert waiter.acquire(timeout=0)
+    waiter.release()
+
+
+def test_purge_deletes_matching_entries(tmp_path):
+    retention = make_retention(tmp_path)
+    for key in ('600519_a', '600519_b', '000001_a'):
+        write_entry(tmp_path, key)
+
+    assert retention.purge('600519_*.json') == 2
+    assert [p.stem for p in tmp_path.glob('*.json')] == ['000001_a']
+
+
+def test_stats_counts_entries_and_hits(tmp_path):
+    retention = make_retention(tmp_path)
+    write_entry(tmp_path, 'a', size=10)
+    write_entry(tmp_path, 'b', size=15)
+    retention.cache_stats.record_hit('a')
+    retention.cache_stats.record_miss()
+
+    stats = retention.stats()
+    assert (stats['entries'], stats['bytes']) == (2, 25)
+    assert stats['hit_ratio'] == 0.5
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from backend.utils.config import Config
+from backend.utils.deadline import Deadline
+from tests.conftest import make_news
+
+
+@pytest.fixture(autouse=True)
+def deadline_config(monkeypatch):
+    monkeypatch.setattr(Config, 'REQUEST_DEADLINE_SECONDS', 30)
+    monkeypatch.setattr(Config, 'REQUEST_DEADLINE_MAX_SECONDS', 60)
+    monkeypatch.setattr(Config, 'DEADLINE_FORMAT_RESERVE_SECONDS', 0)
+
+
+def test_from_request():
+    assert Deadline.from_request(5, '10').seconds == 5
+    assert Deadline.from_request(None, '10').seconds == 10
+    assert Deadline.from_request(None, None).seconds == 30
+    # 超过上限时按上限
+    assert Deadline.from_request(600, None).seconds == 60
+    for query, header in ((0, None), (-1, None), (None, 'abc'), (None, 'nan')):
+        with pytest.raises(ValueError):
+            Deadline.from_request(query, header)
+
+
+def test_remaining_and_expired():
+    deadline = Deadline(10)
+    assert 9 < deadline.remaining() <= 10
+    assert deadline.remaining(reserve=20) == 0.0
+    assert not deadline.expired()
+    assert Deadline(0.001).remaining(1) == 0.0
+    expired = Deadline(0.001)
+    expired.at -= 1
+    assert expired.expired()
+
+
+NEWS = [make_news('业绩预增超预期', '净利润大幅增长')]
+
+
+def test_llm_result_within_deadline(analyzer):
+    news = NEWS
+
+    async def main():
+        return await analyzer.analyze_within_deadline(
+            analyzer.analyze_sentiment(news, '600519'), news, '600519', Deadline(5))
+
+    result = asyncio.run(main())
+    assert result.get('analysis_mode', 'deep') == 'deep'
+    assert 'deadline_exceeded' not in result
+
+
+def test_local_result_when_llm_is_late(analyzer):
+    news = NEWS
+    analyzer.client.delay = 0.2
+
+    async def main():
+        result = await analyzer.analyze_within_deadline(
+            analyzer.analyze_sentiment(news, '600519'), news, '600519', Deadline(0.05))
+        # 大模型分析在后台继续完成并写入缓存
+        assert len(analyzer._upgrades) == 1
+        await asyncio.gather(*analyzer._upgrades.values())
+        return result
+
+    result = asyncio.run(main())
+    assert result['analysis_mode'] == 'fast' and result['deadline_exceeded']
+    assert not analyzer._upgrades
+    assert analyzer.get_cached_analysis(news, '600519') is not None
+
+
+def collect(analyzer, news, deadline):
+    async def main():
+        events = [event async for event in analyzer.stream_within_deadline(
+            analyzer.stream_sentiment(news, '600519'), news, '600519', deadline)]
+        await asyncio.gather(*analyzer._upgrades.values())
+        return events
+
+    return asyncio.run(main())
+
+
+def test_stream_forwards_llm_events_within_deadline(analyzer):
+    analyzer.client.responses.append({
+        'overall_sentiment': {'score': 0.8, 'label': '看好'}, 'topic_analysis': {}})
+    events = collect(analyzer, NEWS, Deadline(5))
+
+    assert [(e['type'], e.get('key')) for e in events] == [
+        ('section', 'overall_sentiment'), ('section', 'topic_analysis'), ('result', None)]
+    assert 'deadline_exceeded' not in events[-1]['data']
+
+
+def test_stream_ends_with_local_result_when_llm_is_late(analyzer):
+    news = NEWS
+    analyzer.client.delay = 0.2
+    events = collect(analyzer, news, Deadline(0.05))
+
+    assert [e['type'] for e in events] == ['result']
+    assert events[0]['data']['analysis_mode'] == 'fast'
+    assert events[0]['data']['deadline_exceeded']
+    assert analyzer.get_cached_analysis(news, '600519') is not None
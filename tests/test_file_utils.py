@@ -0,0 +1,79 @@
+import asyncio
+import json
+from backend.utils.file_utils import atomic_write_json, read_json, get_lock_path, FileLock
+
+
+def test_atomic_write_json_round_trip(tmp_path):
+    path = tmp_path / 'cache' / '600519.json'
+    atomic_write_json(path, {'date': '2026-10-19', 'news': ['贵州茅台']})
+
+    assert read_json(path) == {'date': '2026-10-19', 'news': ['贵州茅台']}
+    # 中文不转义，且不留下临时文件
+    assert '贵州茅台' in path.read_text(encoding='utf-8')
+    assert [p.name for p in path.parent.iterdir()] == ['600519.json']
+
+
+def test_atomic_write_json_replaces_existing_file(tmp_path):
+    path = tmp_path / 'data.json'
+    atomic_write_json(path, {'version': 1})
+    atomic_write_json(path, {'version': 2})
+
+    assert json.loads(path.read_text(encoding='utf-8')) == {'version': 2}
+
+
+def test_atomic_write_json_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / 'data.json'
+    atomic_write_json(path, {'version': 1})
+    try:
+        atomic_write_json(path, {'bad': object()})
+    except TypeError:
+        pass
+
+    assert read_json(path) == {'version': 1}
+    assert [p.name for p in tmp_path.iterdir()] == ['data.json']
+
+
+def test_read_json_missing_file(tmp_path):
+    assert read_json(tmp_path / 'missing.json') is None
+
+
+def test_lock_path_is_in_locks_subdirectory(tmp_path):
+    assert get_lock_path(tmp_path, '600519') == tmp_path / '.locks' / '600519.lock'
+
+
+def test_file_lock_is_exclusive_between_instances(tmp_path):
+    path = get_lock_path(tmp_path, 'key')
+    first = FileLock(path, timeout=0)
+    second = FileLock(path, timeout=0.05, poll_interval=0.01)
+
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.waited and not second.acquired
+
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_file_lock_context_manager_continues_without_lock_on_timeout(tmp_path):
+    path = get_lock_path(tmp_path, 'key')
+    with FileLock(path, timeout=0) as holder:
+        with FileLock(path, timeout=0) as waiter:
+            assert holder.acquired
+            assert not waiter.acquired
+    assert FileLock(path, timeout=0).acquire()
+
+
+def test_file_lock_async_acquire_waits_for_release(tmp_path):
+    path = get_lock_path(tmp_path, 'key')
+
+    async def main():
+        holder = FileLock(path, timeout=0)
+        assert holder.acquire()
+        asyncio.get_running_loop().call_later(0.05, holder.release)
+        waiter = FileLock(path, timeout=1, poll_interval=0.01)
+        assert await waiter.acquire_async()
+        assert waiter.waited
+        waiter.release()
+
+    asyncio.run(main())
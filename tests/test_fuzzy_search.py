@@ -0,0 +1,72 @@
+import pytest
+from backend.utils.fuzzy_search import osa_distance, SymSpellIndex
+from backend.utils.stock_index import build_stock_index, StockIndex
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('600519', '600519', 0),
+    ('600519', '600518', 1),
+    ('600519', '600591', 1),
+    ('600519', '60519', 1),
+    ('600519', '6005199', 1),
+    ('贵州茅台', '贵洲茅台', 1),
+    ('600519', '600000', 3),
+])
+def test_osa_distance(a, b, distance):
+    assert osa_distance(a, b, max_distance=3) == distance
+
+
+def test_osa_distance_stops_at_limit():
+    assert osa_distance('600519', '000001', max_distance=1) == 2
+    assert osa_distance('6', '600519', max_distance=2) == 3
+    assert osa_distance('600519', '600591', 2, transposition_cost=0.5) == 0.5
+
+
+def test_lookup_finds_terms_within_distance():
+    index = SymSpellIndex(max_distance=2)
+    for term in ('600519', '600518', '000001', '600036'):
+        index.add(term)
+
+    assert len(index) == 4
+    assert index.lookup('600519', 0) == [(0, 0)]
+    assert index.lookup('600510', 1) == [(0, 1), (1, 1)]
+    assert index.lookup('900001', 2) == [(2, 1)]
+    # 超过建索引时的上限按上限查找
+    assert index.lookup('123456', 5) == []
+
+
+def test_transpositions_rank_before_substitutions():
+    index = SymSpellIndex(max_distance=2)
+    substitution = index.add('600592')
+    transposition = index.add('600519')
+    # 600591与两者的距离都是1，交换更可能是用户想输入的
+    assert index.lookup('600591', 1) == [(transposition, 1), (substitution, 1)]
+
+
+@pytest.fixture
+def stock_index(tmp_path):
+    path = tmp_path / 'stocks.idx'
+    build_stock_index([
+        {'code': '600519', 'name': '贵州茅台'},
+        {'code': '600592', 'name': '龙溪股份'},
+        {'code': '000858', 'name': '五粮液'},
+        {'code': '601318', 'name': '中国平安'},
+        {'code': '300750', 'name': '宁德时代'},
+    ], path)
+    return StockIndex(path)
+
+
+def test_fuzzy_search_codes(stock_index):
+    results = stock_index.fuzzy_search('600591')
+    assert [(r['code'], r['distance']) for r in results] == [('600519', 1), ('600592', 1)]
+    assert stock_index.fuzzy_search('600591', limit=1)[0]['name'] == '贵州茅台'
+    # 只对完整的六位代码做近似匹配
+    assert stock_index.fuzzy_search('60059') == []
+
+
+def test_fuzzy_search_names(stock_index):
+    assert [r['code'] for r in stock_index.fuzzy_search('贵洲茅台')] == ['600519']
+    assert [r['code'] for r in stock_index.fuzzy_search(' 宁得时代 ')] == ['300750']
+    assert stock_index.fuzzy_search('五梁液') == [{'code': '000858', 'name': '五粮液', 'distance': 1}]
+    # 两个字的名称不做近似匹配
+    assert stock_index.fuzzy_search('平按') == []
@@ -0,0 +1,48 @@
+import asyncio
+import httpx
+from backend.utils.config import Config
+from backend.utils.http_utils import create_async_http_client
+from backend.utils.openai_utils import DeepSeekClient
+
+
+def test_client_uses_configured_pool_and_timeouts():
+    async def main():
+        client = create_async_http_client()
+        try:
+            assert client.timeout.read == Config.LLM_READ_TIMEOUT
+            assert client.timeout.connect == Config.LLM_CONNECT_TIMEOUT
+            pool = client._transport._pool
+            assert pool._max_connections == Config.LLM_MAX_CONNECTIONS
+            assert pool._max_keepalive_connections == Config.LLM_MAX_KEEPALIVE_CONNECTIONS
+            assert pool._keepalive_expiry == Config.LLM_KEEPALIVE_EXPIRY
+        finally:
+            await client.aclose()
+
+    asyncio.run(main())
+
+
+def test_deepseek_client_builds_chain_once_and_shares_pool():
+    client = DeepSeekClient(api_key='test-key')
+    chain = client.chain
+    assert client.llm.http_async_client is client.http_client
+    assert client.chain is chain
+
+
+def test_warmup_and_aclose_use_the_shared_client():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={'data': []})
+
+    async def main():
+        client = DeepSeekClient(api_key='test-key', base_url='https://llm.test/v1')
+        await client.http_client.aclose()
+        client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        await client.warmup()
+        await client.aclose()
+        return client.http_client.is_closed
+
+    assert asyncio.run(main())
+    assert [str(r.url) for r in requests] == ['https://llm.test/v1/models']
+    assert requests[0].headers['Authorization'] == 'Bearer test-key'
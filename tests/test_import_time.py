@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from backend.utils.config import Config
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 导入backend.main时不应加载的重量级依赖
+HEAVY_MODULES = ('akshare', 'pandas', 'google.genai', 'langchain_openai')
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'elapsed': elapsed,
+    'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def import_backend_main() -> dict:
+    """在新的解释器进程中导入backend.main，返回耗时和已加载的重量级依赖"""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True,
+        check=True, timeout=60
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_does_not_load_heavy_modules():
+    assert import_backend_main()['loaded'] == []
+
+
+def test_import_within_budget():
+    # 取多次中最快的一次，排除磁盘缓存冷启动等偶然因素
+    elapsed = min(import_backend_main()['elapsed'] for _ in range(3))
+    assert elapsed < Config.IMPORT_TIME_BUDGET_SECONDS, \
+        f"导入backend.main耗时{elapsed:.2f}秒，超过预算{Config.IMPORT_TIME_BUDGET_SECONDS}秒"
@@ -0,0 +1,198 @@
+import time
+import asyncio
+import socket
+import httpx
+import pytest
+from backend.core import job_queue
+from backend.core.job_queue import AnalysisJobQueue
+from backend.utils.config import Config
+from backend.utils.http_utils import check_webhook_url, pin_webhook_request
+from tests.conftest import FakeCrawler, FakeAnalyzer
+
+
+def make_queue(tmp_path, analyzer=None):
+    crawler = FakeCrawler({'600519': ['600519-news']})
+    return AnalysisJobQueue(crawler, analyzer or FakeAnalyzer(), tmp_path / 'jobs.db')
+
+
+def test_submit_deduplicates_active_jobs(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.submit('600519', 7, 50)
+    assert first['status'] == 'queued'
+    assert queue.submit('600519', 7, 50)['job_id'] == first['job_id']
+    assert queue.submit('600519', 3, 50)['job_id'] != first['job_id']
+
+    # 任务结束后相同参数可以再次提交
+    job = queue._claim()
+    assert queue._finish(job['id'], job['attempts'], {'ok': True})
+    assert queue.submit('600519', 7, 50)['job_id'] != first['job_id']
+
+
+def test_claims_oldest_job_first(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.submit('600519', 7, 50)
+    queue.submit('000001', 7, 50)
+
+    job = queue._claim()
+    assert (job['id'], job['attempts']) == (first['job_id'], 1)
+    assert queue.get(first['job_id'])['status'] == 'running'
+
+
+def test_live_job_is_not_reclaimed(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_RUNNING_TIMEOUT', 60)
+    queue = make_queue(tmp_path)
+    queue.submit('600519', 7, 50)
+    job = queue._claim()
+
+    assert queue._claim() is None
+    assert queue._renew(job['id'], job['attempts'])
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_fenced(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_RUNNING_TIMEOUT', 60)
+    queue = make_queue(tmp_path)
+    queue.submit('600519', 7, 50)
+    stale = queue._claim()
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - 120,))
+
+    job = queue._claim()
+    assert (job['id'], job['attempts']) == (stale['id'], 2)
+    # 原执行者既不能续期，也不能写入结果
+    assert not queue._renew(stale['id'], stale['attempts'])
+    assert not queue._finish(stale['id'], stale['attempts'], {'stale': True})
+    assert queue._finish(job['id'], job['attempts'], {'fresh': True})
+    assert queue.get(job['id'])['result'] == {'fresh': True}
+
+
+def test_run_job_records_result_and_error(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit('600519', 7, 50, consumer='alice')['job_id']
+    asyncio.run(queue._run_job(queue._claim()))
+    job = queue.get(job_id)
+    assert job['status'] == 'succeeded'
+    assert (job['result']['news'], job['result']['consumer']) == (['600519-news'], 'alice')
+
+    failing = make_queue(tmp_path, FakeAnalyzer(error=RuntimeError('模型不可用')))
+    job_id = failing.submit('000001', 7, 50)['job_id']
+    asyncio.run(failing._run_job(failing._claim()))
+    job = failing.get(job_id)
+    assert (job['status'], job['error']) == ('failed', '模型不可用')
+
+
+def test_heartbeat_renews_while_running(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_HEARTBEAT_INTERVAL', 0.01)
+    queue = make_queue(tmp_path)
+    queue.submit('600519', 7, 50)
+    job = queue._claim()
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0")
+
+    async def main():
+        task = asyncio.create_task(queue._heartbeat(job['id'], job['attempts']))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(main())
+    with queue._connect() as conn:
+        assert conn.execute("SELECT heartbeat_at FROM jobs").fetchone()[0] > 0
+
+
+@pytest.mark.parametrize('url', [
+    'ftp://93.184.216.34/hook',
+    'http:///hook',
+    'http://127.0.0.1/hook',
+    'http://localhost:8000/hook',
+    'http://10.0.0.5/hook',
+    'http://192.168.1.1/hook',
+    'http://169.254.169.254/latest/meta-data',
+    'http://[::1]/hook',
+    'http://[::ffff:127.0.0.1]/hook',
+    'http://224.0.0.1/hook',
+    'http://0.0.0.0/hook',
+])
+def test_webhook_rejects_non_public_addresses(url):
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+
+def test_webhook_accepts_public_address():
+    assert check_webhook_url('https://93.184.216.34:8443/hook') == ['93.184.216.34']
+
+
+def test_webhook_allowlist(monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_WEBHOOK_ALLOWED_HOSTS', ['hooks.internal'])
+    assert check_webhook_url('http://hooks.internal/done') == []
+    with pytest.raises(ValueError):
+        check_webhook_url('http://93.184.216.34/hook')
+
+
+def test_pin_webhook_request_keeps_host_and_sni():
+    url, headers, extensions = pin_webhook_request('https://hooks.example.com:8443/done?x=1', '93.184.216.34')
+    assert str(url) == 'https://93.184.216.34:8443/done?x=1'
+    assert headers == {'Host': 'hooks.example.com:8443'}
+    assert extensions == {'sni_hostname': 'hooks.example.com'}
+
+    url, headers, extensions = pin_webhook_request('http://hooks.example.com/done', '2606:2800:220:1::1')
+    assert str(url) == 'http://[2606:2800:220:1::1]/done'
+    assert headers == {'Host': 'hooks.example.com'}
+    assert extensions == {}
+
+    url, headers, extensions = pin_webhook_request('http://hooks.internal/done', None)
+    assert str(url) == 'http://hooks.internal/done'
+    assert headers == {} and extensions == {}
+
+
+def test_notify_posts_to_checked_address_without_final_sleep(tmp_path, monkeypatch):
+    # 第一次解析到公网地址，之后重绑定到内网地址：请求必须发往校验过的地址
+    resolved = iter(['93.184.216.34'] + ['127.0.0.1'] * 10)
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda host, port, proto=0: [
+        (socket.AF_INET, socket.SOCK_STREAM, proto, '', (next(resolved), port))])
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(500)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(job_queue.httpx, 'AsyncClient',
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(job_queue.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(Config, 'JOB_WEBHOOK_RETRIES', 3)
+
+    queue = make_queue(tmp_path)
+    job = queue.submit('600519', 7, 50, 'https://hooks.example.com/done')
+    asyncio.run(queue._notify(job['job_id']))
+
+    # 第二次校验发现重绑定后不再回调
+    assert len(requests) == 1
+    assert requests[0].url.host == '93.184.216.34'
+    assert requests[0].headers['Host'] == 'hooks.example.com'
+    assert requests[0].extensions['sni_hostname'] == 'hooks.example.com'
+    assert sleeps == [1]
+
+
+def test_notify_skips_sleep_after_last_attempt(tmp_path, monkeypatch):
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda host, port, proto=0: [
+        (socket.AF_INET, socket.SOCK_STREAM, proto, '', ('93.184.216.34', port))])
+    attempts = []
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(job_queue.httpx, 'AsyncClient', lambda **kwargs: real_client(
+        transport=httpx.MockTransport(lambda request: attempts.append(request) or httpx.Response(503)),
+        **kwargs))
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(job_queue.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(Config, 'JOB_WEBHOOK_RETRIES', 3)
+
+    queue = make_queue(tmp_path)
+    job = queue.submit('600519', 7, 50, 'http://hooks.example.com/done')
+    asyncio.run(queue._notify(job['job_id']))
+
+    assert len(attempts) == 3
+    assert sleeps == [1, 2]
@@ -0,0 +1,67 @@
+import pytest
+from backend.utils.json_stream import SectionStreamParser, IncompleteJSONError
+
+DOCUMENT = '''{
+  "overall_sentiment": {"score": 0.6, "label": "积极"},
+  "topic_analysis": {"业绩": {"score": 0.8}},
+  "summary": "营收增长 {超预期}, \\"稳健\\"",
+  "count": 3
+}'''
+
+
+def feed_in_chunks(parser, text, size):
+    sections = []
+    for i in range(0, len(text), size):
+        sections.extend(parser.feed(text[i:i + size]))
+    return sections
+
+
+@pytest.mark.parametrize('size', [1, 7, 1000])
+def test_sections_are_identical_for_any_chunking(size):
+    parser = SectionStreamParser()
+    sections = feed_in_chunks(parser, DOCUMENT, size)
+
+    assert [key for key, _ in sections] == ['overall_sentiment', 'topic_analysis', 'summary', 'count']
+    assert parser.close() == {
+        'overall_sentiment': {'score': 0.6, 'label': '积极'},
+        'topic_analysis': {'业绩': {'score': 0.8}},
+        'summary': '营收增长 {超预期}, "稳健"',
+        'count': 3
+    }
+
+
+def test_section_is_emitted_as_soon_as_it_closes():
+    parser = SectionStreamParser()
+    assert parser.feed('{"overall_sentiment": {"score": 0.5') == []
+    assert parser.feed('}, "topic') == [('overall_sentiment', {'score': 0.5})]
+    assert not parser.complete
+
+
+def test_skips_code_fences_and_leading_text():
+    parser = SectionStreamParser()
+    feed_in_chunks(parser, '以下是分析结果：\n```json\n{"a": 1}\n```\n多余说明', 3)
+    assert parser.close() == {'a': 1}
+
+
+def test_tolerates_trailing_commas_and_comments():
+    parser = SectionStreamParser()
+    parser.feed('{"a": {"x": [1, 2,], "y": 3,},  # 整体情感\n'
+                ' "b": [1, # 注释中的 } 不影响解析\n 2], "c": "#不是注释",}')
+    assert parser.close() == {'a': {'x': [1, 2], 'y': 3}, 'b': [1, 2], 'c': '#不是注释'}
+
+
+def test_truncated_response_keeps_closed_sections():
+    parser = SectionStreamParser()
+    sections = parser.feed('{"overall_sentiment": {"score": 0.2}, "time_analysis": {"trend": [')
+
+    assert sections == [('overall_sentiment', {'score': 0.2})]
+    with pytest.raises(IncompleteJSONError):
+        parser.close()
+    assert parser.sections == {'overall_sentiment': {'score': 0.2}}
+
+
+def test_ignores_text_after_top_level_object():
+    parser = SectionStreamParser()
+    parser.feed('{"a": 1} {"b": 2}')
+    assert parser.complete
+    assert parser.close() == {'a': 1}
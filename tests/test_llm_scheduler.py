@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from backend.core.llm_scheduler import LLMScheduler
+
+
+def run_order(scheduler, requests):
+    """先占满名额，再按顺序提交请求，逐个释放名额，返回请求开始执行的顺序"""
+    order = []
+
+    async def request(label, priority, consumer):
+        async with scheduler.slot(priority, consumer):
+            order.append(label)
+
+    async def main():
+        await scheduler.acquire('interactive', 'holder')
+        tasks = []
+        for label, priority, consumer in requests:
+            tasks.append(asyncio.create_task(request(label, priority, consumer)))
+            await asyncio.sleep(0)
+        scheduler.release('interactive')
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return order
+
+
+def test_higher_priority_jumps_the_queue():
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0, consumer_weights={})
+    order = run_order(scheduler, [
+        ('bg', 'background', 'a'),
+        ('batch', 'batch', 'a'),
+        ('ui', 'interactive', 'a'),
+    ])
+    assert order == ['ui', 'batch', 'bg']
+
+
+def test_fair_queueing_between_consumers():
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0, consumer_weights={})
+    order = run_order(scheduler, [
+        ('a1', 'batch', 'a'), ('a2', 'batch', 'a'), ('a3', 'batch', 'a'),
+        ('b1', 'batch', 'b'), ('b2', 'batch', 'b'),
+    ])
+    # 提交多的调用方不会饿死后来的调用方
+    assert order == ['a1', 'b1', 'a2', 'b2', 'a3']
+
+
+def test_consumer_weights():
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0,
+                             consumer_weights={'a': 2.0})
+    order = run_order(scheduler, [
+        ('a1', 'batch', 'a'), ('a2', 'batch', 'a'), ('a3', 'batch', 'a'), ('a4', 'batch', 'a'),
+        ('b1', 'batch', 'b'), ('b2', 'batch', 'b'),
+    ])
+    assert order == ['a1', 'a2', 'b1', 'a3', 'a4', 'b2']
+
+
+def test_reserved_slot_is_only_for_interactive():
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=2, interactive_reserved=1, consumer_weights={})
+        await scheduler.acquire('batch')
+        blocked = asyncio.create_task(scheduler.acquire('batch'))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        # 批量任务占满其余名额时交互请求仍可立即开始
+        await asyncio.wait_for(scheduler.acquire('interactive'), 1)
+        scheduler.release('batch')
+        await asyncio.sleep(0)
+        # 交互请求占用着名额，批量任务仍不能超过其余名额
+        assert not blocked.done()
+        scheduler.release('interactive')
+        await asyncio.wait_for(blocked, 1)
+        assert scheduler.metrics()['active'] == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_is_skipped():
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0, consumer_weights={})
+        await scheduler.acquire('batch')
+        cancelled = asyncio.create_task(scheduler.acquire('batch'))
+        waiting = asyncio.create_task(scheduler.acquire('batch'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        scheduler.release('batch')
+        await asyncio.wait_for(waiting, 1)
+        return scheduler.metrics()['lanes']['batch']
+
+    lane = asyncio.run(main())
+    assert (lane['queued'], lane['in_flight'], lane['started'], lane['cancelled']) == (0, 1, 2, 1)
+
+
+def test_slot_released_on_error():
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0, consumer_weights={})
+        with pytest.raises(RuntimeError):
+            async with scheduler.slot('batch'):
+                raise RuntimeError
+        return scheduler.metrics()
+
+    metrics = asyncio.run(main())
+    assert metrics['active'] == 0 and metrics['lanes']['batch']['in_flight'] == 0
+
+
+def test_unknown_priority():
+    with pytest.raises(ValueError):
+        asyncio.run(LLMScheduler().acquire('urgent'))
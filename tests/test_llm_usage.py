@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+from backend.utils.config import Config
+from backend.utils.gemini_utils import GeminiClient
+from backend.utils.llm_usage import LLMUsageStats
+from backend.utils.openai_utils import DeepSeekClient
+
+
+def test_usage_totals_and_hit_ratio():
+    usage = LLMUsageStats()
+    assert usage.to_dict()['cache_hit_ratio'] == 0.0
+    usage.record(1000, 800, 200)
+    usage.record(500, 0, None)
+
+    assert usage.to_dict() == {
+        'calls': 2,
+        'input_tokens': 1500,
+        'cached_tokens': 800,
+        'output_tokens': 200,
+        'last_cached_tokens': 0,
+        'cache_hit_ratio': 0.5333
+    }
+
+
+def test_system_prompt_is_static_and_news_follows_it():
+    # 系统提示词每次调用完全相同，新闻内容只出现在之后的用户消息中
+    assert '{news_content}' not in Config.SENTIMENT_SYSTEM_PROMPT
+    prompt = Config.SENTIMENT_NEWS_PROMPT.format(news_content='新闻内容')
+    assert '新闻内容' in prompt
+    assert '"overall_sentiment"' in Config.SENTIMENT_SYSTEM_PROMPT
+
+
+def test_deepseek_records_cache_hits_from_usage_metadata():
+    client = DeepSeekClient(api_key='test-key')
+    client._record_usage({'input_tokens': 1200, 'output_tokens': 300,
+                          'input_token_details': {'cache_read': 1024}})
+    client._record_usage({'input_tokens': 100, 'output_tokens': 10})
+
+    usage = client.usage.to_dict()
+    assert (usage['input_tokens'], usage['cached_tokens'], usage['output_tokens']) == (1300, 1024, 310)
+
+
+class FakeCaches:
+    def __init__(self, error=None):
+        self.error = error
+        self.created = []
+
+    async def create(self, model, config):
+        self.created.append(config.system_instruction)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+
+def make_gemini(caches):
+    client = GeminiClient(api_key='test-key', model='gemini-test')
+    client.client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return client
+
+
+def test_gemini_registers_system_prompt_once(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_CONTEXT_CACHE_TTL', 3600)
+    caches = FakeCaches()
+    client = make_gemini(caches)
+
+    async def main():
+        first = await client._generate_config('系统提示词')
+        second = await client._generate_config('系统提示词')
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.cached_content == second.cached_content == 'cachedContents/1'
+    assert caches.created == ['系统提示词']
+
+
+def test_gemini_falls_back_to_system_instruction(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_CONTEXT_CACHE_TTL', 3600)
+    caches = FakeCaches(error=RuntimeError('提示词过短'))
+    client = make_gemini(caches)
+
+    async def main():
+        return [await client._generate_config('系统提示词') for _ in range(2)]
+
+    configs = asyncio.run(main())
+    assert [config.system_instruction for config in configs] == ['系统提示词'] * 2
+    assert configs[0].cached_content is None
+    # 有效期内不再重复注册
+    assert len(caches.created) == 1
+
+
+def test_gemini_context_cache_disabled(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_CONTEXT_CACHE_TTL', 0)
+    caches = FakeCaches()
+    config = asyncio.run(make_gemini(caches)._generate_config('系统提示词'))
+    assert config.system_instruction == '系统提示词'
+    assert caches.created == []
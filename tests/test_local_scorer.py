@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+import pytest
+from backend.core.local_scorer import LocalSentimentScorer, score_to_label
+from tests.conftest import make_news
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.mark.parametrize('score, label', [
+    (0.9, '极度看好'), (0.7, '看好'), (0.5, '中性'), (0.2, '看空'), (0.1, '极度看空')])
+def test_score_to_label(score, label):
+    assert score_to_label(score) == label
+
+
+def test_match_handles_negation_intensifiers_and_overlaps():
+    match = LocalSentimentScorer._match
+    assert match('股东增持') == {'增持': 1.5}
+    # 否定后方向反转且强度减半
+    assert match('股东未减持') == {'减持': 0.75}
+    assert match('营收大幅增长') == {'增长': 2.0}
+    # "创新高"包含"新高"，只计一次
+    assert match('股价创新高') == {'创新高': 2.0}
+
+
+def test_positive_and_negative_news():
+    scorer = LocalSentimentScorer()
+    positive = scorer.analyze([make_news('业绩预增超预期', '净利润大幅增长')])
+    negative = scorer.analyze([make_news('公司被立案调查', '股价跌停')])
+
+    assert positive['overall_sentiment']['score'] > 0.85
+    assert positive['overall_sentiment']['label'] == '极度看好'
+    assert negative['overall_sentiment']['score'] < 0.15
+    assert negative['risk_analysis']['risk_level'] == '高'
+    assert {risk['factor'] for risk in negative['risk_analysis']['risk_factors']} == {
+        '立案', '调查', '跌停'}
+
+
+def test_official_and_recent_news_weigh_more():
+    scorer = LocalSentimentScorer(half_life_days=1)
+    news = [make_news('公司公告回购股份', source='巨潮资讯公告'),
+            make_news('网传公司亏损', source='某公众号')]
+    assert scorer.analyze(news)['overall_sentiment']['score'] > 0.5
+
+    news = [make_news('公司亏损', publish_time=days_ago(0)),
+            make_news('公司盈利', publish_time=days_ago(5))]
+    assert scorer.analyze(news)['overall_sentiment']['score'] < 0.5
+
+
+def test_result_has_llm_structure():
+    scorer = LocalSentimentScorer()
+    result = scorer.analyze([
+        make_news('营收增长', '产品研发取得突破', publish_time=days_ago(1)),
+        make_news('北向资金净流入', '机构上调评级')
+    ])
+
+    assert set(result['topic_analysis']) >= {'financial_performance', 'product_technology',
+                                             'capital_market'}
+    assert result['topic_analysis']['financial_performance']['key_points'] == ['营收增长']
+    assert result['topic_analysis']['industry_policy']['summary'] == '暂无行业政策相关新闻'
+    assert [day['date'] for day in result['time_analysis']['trend']] == sorted(
+        day['date'] for day in result['time_analysis']['trend'])
+    assert isinstance(result['overall_sentiment']['investor_sentiment'], int)
+    assert result['source_analysis']['mainstream_media']['score'] > 0.5
+
+
+def test_empty_news_is_neutral():
+    result = LocalSentimentScorer().analyze([])
+    assert result['overall_sentiment']['score'] == 0.5
+    assert result['overall_sentiment']['investor_sentiment'] == '无'
+
+
+def test_features_are_cached_by_digest():
+    scorer = LocalSentimentScorer()
+    news = make_news('业绩预增')
+    scorer.analyze([news])
+    assert list(scorer._features) == [news.digest]
+    assert scorer._news_features(make_news('业绩预增', source='另一来源')) is scorer._features[news.digest]
@@ -0,0 +1,89 @@
+import os
+import time
+from datetime import datetime, timedelta
+from backend.utils.memory_cache import MemoryCache, expiry_from_cache_date
+
+FAR_FUTURE = time.time() + 3600
+
+
+def test_get_returns_value_until_expiry():
+    cache = MemoryCache(max_bytes=100)
+    cache.set('a', {'score': 1}, expires_at=FAR_FUTURE, size=10)
+    cache.set('b', {'score': 2}, expires_at=time.time() - 1, size=10)
+
+    assert cache.get('a') == {'score': 1}
+    assert cache.get('b') is None
+    assert cache.get('missing') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_evicts_least_recently_used_entries_by_bytes():
+    cache = MemoryCache(max_bytes=30)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key, expires_at=FAR_FUTURE, size=10)
+    cache.get('a')
+    cache.set('d', 'd', expires_at=FAR_FUTURE, size=10)
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+    assert cache.stats()['bytes'] == 30
+
+
+def test_entry_larger_than_capacity_is_not_cached():
+    cache = MemoryCache(max_bytes=10)
+    cache.set('big', 'value', expires_at=FAR_FUTURE, size=11)
+
+    assert cache.get('big') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_size_defaults_to_file_size(tmp_path):
+    path = tmp_path / 'entry.json'
+    path.write_bytes(b'x' * 25)
+    cache = MemoryCache(max_bytes=100)
+    cache.set('entry', 'value', expires_at=FAR_FUTURE, path=path)
+
+    assert cache.stats()['bytes'] == 25
+
+
+def test_rewritten_file_invalidates_entry(tmp_path):
+    path = tmp_path / 'entry.json'
+    path.write_text('old')
+    cache = MemoryCache(max_bytes=100, revalidate_seconds=0)
+    cache.set('entry', 'old', expires_at=FAR_FUTURE, path=path)
+    assert cache.get('entry', path) == 'old'
+
+    # 模拟另一个worker重写了磁盘文件
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get('entry', path) is None
+
+
+def test_file_is_rechecked_only_after_revalidate_interval(tmp_path):
+    path = tmp_path / 'entry.json'
+    path.write_text('old')
+    cache = MemoryCache(max_bytes=100, revalidate_seconds=60)
+    cache.set('entry', 'old', expires_at=FAR_FUTURE, path=path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.get('entry', path) == 'old'
+
+
+def test_invalidate_prefix():
+    cache = MemoryCache(max_bytes=100)
+    for key in ('600519_a', '600519_b', '000001_a'):
+        cache.set(key, key, expires_at=FAR_FUTURE, size=1)
+    cache.invalidate_prefix('600519_')
+
+    assert cache.get('600519_a') is None
+    assert cache.get('600519_b') is None
+    assert cache.get('000001_a') == '000001_a'
+
+
+def test_expiry_matches_disk_cache_rule():
+    today = datetime.now().strftime('%Y-%m-%d')
+    midnight = datetime.strptime(today, '%Y-%m-%d')
+
+    assert expiry_from_cache_date(today, 1) == (midnight + timedelta(days=2)).timestamp()
@@ -0,0 +1,76 @@
+from backend.core.news_index import NewsSearchIndex, tokenize, build_match_query
+from tests.conftest import make_news
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert tokenize('贵州茅台 Q3营收') == ['贵州', '州茅', '茅台', 'q3', '营收']
+    assert tokenize('涨') == ['涨']
+    assert tokenize('，！') == []
+
+
+def test_build_match_query():
+    assert build_match_query('茅台 年报') == '"茅台" AND "年报"'
+    assert build_match_query('贵州茅台') == '"贵州 州茅 茅台"'
+    # 单个汉字按前缀匹配
+    assert build_match_query('酒') == '"酒"*'
+    assert build_match_query('  ！') is None
+
+
+def make_index(tmp_path):
+    index = NewsSearchIndex(tmp_path / 'news.db')
+    index.add('600519', [
+        make_news('贵州茅台发布年报', '营收同比增长，茅台酒量价齐升。'),
+        make_news('白酒板块走强', '多只白酒股上涨。', publish_time='2024-03-05 09:30:00'),
+    ])
+    index.add('000858', [make_news('五粮液年报点评', '白酒龙头业绩稳健。',
+                                   publish_time='2024-03-05 09:30:00')])
+    return index
+
+
+def titles(results):
+    return [result['title'] for result in results]
+
+
+def test_add_skips_indexed_news(tmp_path):
+    index = make_index(tmp_path)
+    assert not index.is_empty()
+    assert index.add('600519', [make_news('贵州茅台发布年报', '营收同比增长，茅台酒量价齐升。')]) == 0
+    # 同一篇新闻可以属于多只股票
+    assert index.add('000858', [make_news('贵州茅台发布年报', '营收同比增长，茅台酒量价齐升。')]) == 1
+
+
+def test_search_matches_phrases_in_title_and_content(tmp_path):
+    index = make_index(tmp_path)
+    assert sorted(titles(index.search('年报'))) == ['五粮液年报点评', '贵州茅台发布年报']
+    assert titles(index.search('量价齐升')) == ['贵州茅台发布年报']
+    # 多个词须同时出现
+    assert titles(index.search('白酒 年报')) == ['五粮液年报点评']
+    # 二元组须相邻
+    assert index.search('茅年') == []
+    assert index.search('') == []
+
+
+def test_title_hits_rank_first(tmp_path):
+    index = make_index(tmp_path)
+    assert titles(index.search('白酒')) == ['白酒板块走强', '五粮液年报点评']
+
+
+def test_search_filters(tmp_path):
+    index = make_index(tmp_path)
+    results = index.search('年报', stock_codes=['000858'])
+    assert [(r['stock_code'], r['title']) for r in results] == [('000858', '五粮液年报点评')]
+    assert titles(index.search('年报', since='2024-03-02')) == ['五粮液年报点评']
+    assert len(index.search('年报', limit=1)) == 1
+
+
+def test_backfill_from_cached_news(tmp_path):
+    index = NewsSearchIndex(tmp_path / 'news.db')
+    assert index.is_empty()
+
+    def iter_cached_news():
+        yield '600519', [make_news('贵州茅台发布年报', '营收增长')]
+        yield '000858', [make_news('五粮液年报点评', '业绩稳健')]
+
+    assert index.backfill(iter_cached_news) == 2
+    assert index.backfill(iter_cached_news) == 0
+    assert len(index.search('年报')) == 2
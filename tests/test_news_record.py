@@ -0,0 +1,53 @@
+from backend.core.news_record import NewsRecord, SourceCategory, to_records, sort_by_time
+from tests.conftest import make_news
+
+
+def test_fields_are_parsed_once_at_construction():
+    news = NewsRecord.from_dict(make_news().to_dict())
+    assert news.date == '2024-03-01'
+    assert news.timestamp == NewsRecord.from_dict(make_news().to_dict()).timestamp
+    assert news.source_category is SourceCategory.MAINSTREAM_MEDIA
+    assert len(news.digest) == 32
+
+
+def test_round_trips_to_the_cached_dict_format():
+    data = make_news().to_dict()
+    assert NewsRecord.from_dict(data).to_dict() == data
+
+
+def test_source_classification():
+    assert SourceCategory.classify('巨潮资讯公告') is SourceCategory.OFFICIAL_ANNOUNCEMENT
+    assert SourceCategory.classify('深交所互动易') is SourceCategory.OFFICIAL_ANNOUNCEMENT
+    assert SourceCategory.classify('经济日报') is SourceCategory.MAINSTREAM_MEDIA
+    assert SourceCategory.classify('东方财经') is SourceCategory.INDUSTRY_MEDIA
+    assert SourceCategory.classify('某公众号') is SourceCategory.SELF_MEDIA
+    assert SourceCategory.SELF_MEDIA == 'self_media'
+
+
+def test_sources_are_interned():
+    a = NewsRecord.from_dict(make_news(source=''.join(['证券', '时报'])).to_dict())
+    b = NewsRecord.from_dict(make_news(source=''.join(['证券', '时报'])).to_dict())
+    assert a.source is b.source
+
+
+def test_digest_depends_on_title_and_content_only():
+    a = NewsRecord.from_dict(make_news(source='A').to_dict())
+    b = NewsRecord.from_dict(make_news(source='B', publish_time='2024-03-02 10:00:00').to_dict())
+    c = NewsRecord.from_dict(make_news(title='另一条').to_dict())
+    assert a.digest == b.digest != c.digest
+
+
+def test_to_records_keeps_existing_records():
+    record = NewsRecord.from_dict(make_news().to_dict())
+    records = to_records([record, make_news().to_dict()])
+    assert records[0] is record
+    assert isinstance(records[1], NewsRecord)
+
+
+def test_sort_by_time_newest_first():
+    older = NewsRecord.from_dict(make_news(publish_time='2024-03-01 09:30:00').to_dict())
+    newer = NewsRecord.from_dict(make_news(publish_time='2024-03-02 09:30:00').to_dict())
+    ordered = [newer, older]
+    # 已经有序时直接返回原列表
+    assert sort_by_time(ordered) is ordered
+    assert sort_by_time([older, newer]) == [newer, older]
@@ -0,0 +1,118 @@
+import asyncio
+import marshal
+import pytest
+from backend.api.services import get_request_profiler
+from backend.main import ProfileRequestsMiddleware
+from backend.utils.profiling import RequestProfiler, MemoryProfiler
+
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+
+def profile_once(profiler, path):
+    profile = profiler.begin(path)
+    if profile is None:
+        return False
+    busy_work()
+    profiler.end(profile)
+    return True
+
+
+def test_samples_only_matching_paths():
+    profiler = RequestProfiler()
+    assert not profile_once(profiler, '/api/analyze')
+
+    profiler.start(['/api/analyze'], sample_rate=1.0, max_requests=0)
+    assert not profile_once(profiler, '/api/stocks')
+    assert profile_once(profiler, '/api/analyze/stream')
+    assert profile_once(profiler, '/api/analyze')
+
+    assert profiler.status()['profiled_requests'] == 2
+    assert 'busy_work' in profiler.report(sort='cumulative', limit=50)
+    stats = marshal.loads(profiler.dump())
+    assert any(func[2] == 'busy_work' for func in stats)
+
+
+def test_one_request_at_a_time_and_auto_stop():
+    profiler = RequestProfiler()
+    assert profiler.report() is None and profiler.dump() is None
+    profiler.start(['/'], sample_rate=1.0, max_requests=2)
+
+    first = profiler.begin('/a')
+    assert profiler.begin('/b') is None
+    profiler.end(first)
+    assert profile_once(profiler, '/c')
+
+    status = profiler.status()
+    assert (status['skipped_busy'], status['profiled_requests'], status['enabled']) == (1, 2, False)
+    # 重新开始时清空之前的结果
+    profiler.start(['/'], sample_rate=1.0, max_requests=0)
+    assert profiler.report() is None
+
+
+def test_memory_snapshots_and_diff():
+    profiler = MemoryProfiler(max_snapshots=2, frames=5)
+    try:
+        profiler.snapshot()
+        retained = [bytearray(1024) for _ in range(200)]
+        profiler.snapshot()
+        diff = profiler.diff(include='*test_profiling.py')
+        assert diff['size_diff_bytes'] >= 200 * 1024
+        assert 'test_profiling.py' in diff['top'][0]['traceback'][0]
+
+        profiler.snapshot()
+        assert [s['snapshot_id'] for s in profiler.status()['snapshots']] == [2, 3]
+        with pytest.raises(KeyError):
+            profiler.diff(base_id=1)
+    finally:
+        profiler.stop()
+        del retained
+    assert not profiler.status()['tracing']
+
+
+def run_streaming_request(path='/api/analyze/stream'):
+    messages = []
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'a', 'more_body': True})
+        # 流式响应体生成过程中的计算
+        busy_work()
+        await send({'type': 'http.response.body', 'body': b'b'})
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(ProfileRequestsMiddleware(app)(
+        {'type': 'http', 'path': path}, None, send))
+    return messages
+
+
+def test_middleware_profiles_whole_streamed_response():
+    profiler = get_request_profiler()
+    profiler.start(['/api/analyze'], sample_rate=1.0, max_requests=0)
+    try:
+        messages = run_streaming_request()
+        run_streaming_request(path='/api/stocks')
+    finally:
+        profiler.stop()
+
+    assert [m.get('body') for m in messages] == [None, b'a', b'b']
+    assert profiler.status()['profiled_requests'] == 1
+    assert 'busy_work' in profiler.report(limit=50)
+
+
+def test_middleware_passes_through_when_disabled():
+    received = []
+
+    async def app(scope, receive, send):
+        received.append(send)
+
+    async def send(message):
+        pass
+
+    get_request_profiler().stop()
+    asyncio.run(ProfileRequestsMiddleware(app)({'type': 'http', 'path': '/api'}, None, send))
+    # 未开启分析时不包装send
+    assert received == [send]
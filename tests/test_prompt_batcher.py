@@ -0,0 +1,90 @@
+import asyncio
+from backend.core.llm_scheduler import LLMScheduler
+from backend.core.prompt_batcher import PromptBatcher
+
+
+class FakeClient:
+    """按股票代码逐个输出结果的模型客户端"""
+
+    def __init__(self, results, error=None):
+        self.results = results
+        self.error = error
+        self.prompts = []
+
+    async def stream_sections(self, prompt, system_prompt):
+        self.prompts.append(prompt)
+        for stock_code, value in self.results.items():
+            yield stock_code, value
+        if self.error:
+            raise self.error
+
+
+def result(score):
+    return {'overall_sentiment': {'score': score}}
+
+
+def make_batcher(client, max_stocks=3, window=0.01):
+    return PromptBatcher(client, LLMScheduler(max_concurrency=2, interactive_reserved=0),
+                         max_stocks=max_stocks, window=window)
+
+
+def analyze_all(batcher, codes, priority='batch'):
+    async def main():
+        return await asyncio.gather(*[
+            batcher.analyze(code, f"{code}的新闻", priority, 'test') for code in codes])
+    return asyncio.run(main())
+
+
+def test_stocks_in_a_window_share_one_call():
+    client = FakeClient({'600519': result(0.5), '000001': result(-0.1)})
+    batcher = make_batcher(client)
+
+    assert analyze_all(batcher, ['600519', '000001']) == [result(0.5), result(-0.1)]
+    assert len(client.prompts) == 1
+    assert '=== 股票 600519 ===\n600519的新闻' in client.prompts[0]
+    assert '=== 股票 000001 ===\n000001的新闻' in client.prompts[0]
+    assert not batcher._batches
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    client = FakeClient({code: result(0.1) for code in ('a', 'b', 'c', 'd')})
+    batcher = make_batcher(client, max_stocks=2, window=60)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*[
+            batcher.analyze(code, code, 'batch', 'test') for code in ('a', 'b', 'c', 'd')]), 1)
+
+    assert asyncio.run(main()) == [result(0.1)] * 4
+    assert len(client.prompts) == 2
+
+
+def test_single_stock_falls_back_to_individual_analysis():
+    client = FakeClient({'600519': result(0.5)})
+    assert analyze_all(make_batcher(client), ['600519']) == [None]
+    assert client.prompts == []
+
+
+def test_duplicate_stock_starts_a_new_batch():
+    client = FakeClient({'a': result(0.1), 'b': result(0.2)})
+    batcher = make_batcher(client)
+    # 第二个a把[a, b]提前发送，自己单独成批
+    assert analyze_all(batcher, ['a', 'b', 'a']) == [result(0.1), result(0.2), None]
+    assert len(client.prompts) == 1
+
+
+def test_missing_or_invalid_results_return_none():
+    client = FakeClient({'a': result(0.3), 'b': {'summary': '格式不对'}},
+                        error=RuntimeError('连接中断'))
+    assert analyze_all(make_batcher(client), ['a', 'b', 'c']) == [result(0.3), None, None]
+
+
+def test_priorities_are_batched_separately():
+    client = FakeClient({'a': result(0.1), 'b': result(0.2)})
+    batcher = make_batcher(client)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.analyze('a', 'a', 'batch', 'test'),
+            batcher.analyze('b', 'b', 'background', 'test'))
+
+    assert asyncio.run(main()) == [None, None]
@@ -0,0 +1,65 @@
+import json
+import pytest
+from backend.utils.config import Config
+from backend.core.relevance_ranker import RelevanceRanker, stock_aliases, cached_industries
+from tests.conftest import make_news
+
+
+@pytest.mark.parametrize('name, aliases', [
+    ('贵州茅台', ['贵州茅台']),
+    ('*ST中珠', ['*ST中珠', '中珠']),
+    ('ST易购', ['ST易购', '易购']),
+    ('N海光', ['N海光', '海光']),
+    ('C芯原', ['C芯原', '芯原']),
+    ('万科A', ['万科A', '万科']),
+    ('寒武纪-U', ['寒武纪-U', '寒武纪']),
+    # 英文简称的首尾字母不是标记
+    ('CATL', ['CATL']),
+    ('NVIDIA', ['NVIDIA']),
+    ('TCL科技', ['TCL科技']),
+])
+def test_stock_aliases(name, aliases):
+    assert stock_aliases(name) == aliases
+
+
+NEWS = [
+    make_news('贵州茅台发布年报', '贵州茅台营收同比增长，茅台酒量价齐升。'),
+    make_news('白酒板块午后拉升', '白酒板块走强，多只个股上涨，其中600519涨幅居前。'),
+    make_news('白酒行业观察', '行业库存回落，白酒消费逐步恢复。'),
+    make_news('央行开展逆回购操作', '央行今日开展逆回购操作，维护流动性合理充裕。'),
+]
+
+
+def test_scores_rank_stock_news_above_unrelated_news():
+    scores = RelevanceRanker().score(NEWS, '600519', ['贵州茅台'], ['白酒'])
+    assert scores[0] > scores[1] > scores[2] > scores[3]
+    assert scores[3] == 0.0
+
+
+def test_title_hits_weigh_more_than_content_hits():
+    news = [make_news('贵州茅台公告', '公司公告如下。'), make_news('公司公告', '公告提到贵州茅台。')]
+    scores = RelevanceRanker(title_boost=3.0).score(news, '600519', ['贵州茅台'])
+    assert scores[0] > scores[1] > 0
+
+
+def test_select_applies_threshold_and_limit():
+    ranker = RelevanceRanker()
+    selected = ranker.select(NEWS, '600519', ['贵州茅台'], ['白酒'], threshold=0.01)
+    assert selected == NEWS[:3]
+    assert ranker.select(NEWS, '600519', ['贵州茅台'], max_news=1, threshold=0.01) == NEWS[:1]
+    assert ranker.select([], '600519', ['贵州茅台']) == []
+
+
+def test_cached_industries_reads_local_membership(data_dir):
+    Config.SECTOR_CACHE_DIR.mkdir(parents=True)
+    (Config.SECTOR_CACHE_DIR / 'membership.json').write_text(json.dumps({
+        'industries': {'酿酒行业': {'codes': ['600519', '000858']},
+                       '银行': {'codes': ['601988']}}
+    }), encoding='utf-8')
+
+    assert cached_industries('600519') == ['酿酒行业']
+    assert cached_industries('300750') == []
+
+
+def test_cached_industries_without_cache(data_dir):
+    assert cached_industries('600519') == []
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+from backend.core.sector_aggregator import SectorAggregator
+from backend.core.sentiment_history import SentimentHistoryStore
+from tests.conftest import FakeCrawler, FakeAnalyzer
+
+TODAY = datetime.now().strftime('%Y-%m-%d')
+
+
+def record(store, code, score, label='积极'):
+    store.record(code, {
+        'overall_sentiment': {'score': score, 'label': label},
+        'topic_analysis': {'financial_performance': {'score': score}}
+    }, [])
+
+
+def make_aggregator(data_dir, news=None):
+    store = SentimentHistoryStore()
+    aggregator = SectorAggregator(FakeCrawler(news), FakeAnalyzer(), store)
+    aggregator.membership.data['industries']['白酒'] = {
+        'date': TODAY, 'codes': ['600519', '000858', '000568', '600809']}
+    aggregator.membership.data['market_caps'] = {
+        'date': TODAY, 'caps': {'600519': 3.0, '000858': 1.0, '000568': 1.0}}
+    return aggregator, store
+
+
+def test_equal_weighted_industry_sentiment(data_dir):
+    aggregator, store = make_aggregator(data_dir)
+    record(store, '600519', 0.6)
+    record(store, '000858', 0.0, label='中性')
+    store.record_empty('000568')
+
+    result = aggregator.aggregate_industry('白酒')
+
+    assert result['score'] == 0.3
+    assert result['dispersion'] == 0.3
+    assert (result['constituents'], result['covered'], result['coverage']) == (4, 2, 0.5)
+    assert result['topic_scores']['financial_performance'] == 0.3
+    assert result['topic_scores']['industry_policy'] is None
+    assert [c['code'] for c in result['top_constituents']] == ['600519', '000858']
+    # 检查过但没有新闻的股票不算过期
+    assert result['stale_codes'] == ['600809']
+
+
+def test_market_cap_weighting_skips_stocks_without_cap(data_dir):
+    aggregator, store = make_aggregator(data_dir)
+    record(store, '600519', 0.6)
+    record(store, '000858', -0.2, label='消极')
+    record(store, '600809', 1.0)
+
+    result = aggregator.aggregate_industry('白酒', weighting='market_cap')
+
+    assert result['score'] == 0.4
+    assert result['coverage'] == 0.8
+    # 没有市值的股票权重为0，不需要刷新
+    assert result['stale_codes'] == ['000568']
+
+
+def test_no_coverage_returns_empty_scores(data_dir):
+    aggregator, _ = make_aggregator(data_dir)
+    result = aggregator.aggregate_industry('白酒')
+    assert result['score'] is None and result['coverage'] == 0.0
+    assert len(result['stale_codes']) == 4
+
+
+def test_refresh_records_stocks_without_news(data_dir):
+    aggregator, store = make_aggregator(data_dir, news={'600519': ['news']})
+
+    async def main():
+        scheduled = aggregator.schedule_refresh(['600519', '600809'])
+        # 已在刷新中的股票不重复调度
+        assert aggregator.schedule_refresh(['600519']) == []
+        await asyncio.gather(*aggregator._refresh_tasks)
+        return scheduled
+
+    assert asyncio.run(main()) == ['600519', '600809']
+    assert aggregator.sentiment_analyzer.analyzed == ['600519']
+    assert not aggregator._refreshing and not aggregator._refresh_tasks
+    assert aggregator.aggregate_industry('白酒')['stale_codes'] == ['600519', '000858', '000568']
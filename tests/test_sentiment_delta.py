@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime
+from backend.core.sentiment_analyzer import SentimentAnalyzer
+from backend.utils.config import Config
+from backend.utils.file_utils import atomic_write_json
+from tests.conftest import make_news
+
+
+def write_latest(analyzer, news_list, date=None, delta_count=0):
+    atomic_write_json(analyzer._get_latest_path('600519'), {
+        'date': date or datetime.now().strftime('%Y-%m-%d'),
+        'digests': [news.digest for news in news_list],
+        'delta_count': delta_count,
+        'analysis_result': {
+            'overall_sentiment': {'score': 0.61234, 'label': '看好', 'summary': ''},
+            'topic_analysis': {'financial_performance': {'score': 0.7}}
+        }
+    })
+
+
+def try_delta(analyzer, news_list):
+    return asyncio.run(analyzer._try_delta_update(news_list, '600519', 'interactive', 'test'))
+
+
+def test_compress_analysis_is_compact():
+    compressed = SentimentAnalyzer._compress_analysis({
+        'overall_sentiment': {'score': 0.61234, 'summary': '', 'key_points': []},
+        'trend': [{'score': 0.333333, 'note': None}]
+    })
+    assert compressed == '{"overall_sentiment":{"score":0.61},"trend":[{"score":0.33}]}'
+
+
+def test_delta_sends_only_new_articles(analyzer):
+    old = [make_news('旧闻一'), make_news('旧闻二')]
+    write_latest(analyzer, old)
+    analyzer.client.responses.append({'overall_sentiment': {'score': 0.7, 'label': '看好'}})
+
+    new = make_news('新闻', '新闻的内容', publish_time='2024-03-01 10:30:00')
+    result, delta_count = try_delta(analyzer, [new] + old)
+
+    prompt = analyzer.client.prompts[0]
+    assert '新闻的内容' in prompt and '旧闻一' not in prompt
+    assert '"score":0.61' in prompt
+    assert delta_count == 1
+    # 模型省略的维度沿用上次的结果
+    assert result == {'overall_sentiment': {'score': 0.7, 'label': '看好'},
+                      'topic_analysis': {'financial_performance': {'score': 0.7}}}
+
+
+def test_falls_back_to_full_analysis(analyzer, monkeypatch):
+    monkeypatch.setattr(Config, 'DELTA_MAX_NEW_ARTICLES', 2)
+    monkeypatch.setattr(Config, 'DELTA_MAX_UPDATES', 3)
+    old = [make_news('旧闻')]
+    new = [make_news(f"新闻{i}", publish_time=f"2024-03-01 {10 + i}:30:00") for i in range(3)]
+
+    # 没有最近分析记录
+    assert try_delta(analyzer, new[:1] + old) is None
+    # 新增新闻过多、没有新增新闻
+    write_latest(analyzer, old)
+    assert try_delta(analyzer, new + old) is None
+    assert try_delta(analyzer, old) is None
+    # 跨日、连续增量更新次数达到上限
+    write_latest(analyzer, old, date='2000-01-01')
+    assert try_delta(analyzer, new[:1] + old) is None
+    write_latest(analyzer, old, delta_count=3)
+    assert try_delta(analyzer, new[:1] + old) is None
+    assert analyzer.client.prompts == []
+
+    # 模型结果缺少overall_sentiment
+    write_latest(analyzer, old)
+    analyzer.client.responses.append({'topic_analysis': {}})
+    assert try_delta(analyzer, new[:1] + old) is None
+
+
+def test_full_then_delta_analysis(analyzer):
+    old = [make_news('旧闻')]
+    asyncio.run(analyzer.analyze_sentiment(old, '600519'))
+    latest = json.loads(analyzer._get_latest_path('600519').read_text(encoding='utf-8'))
+    assert latest['delta_count'] == 0
+
+    new = make_news('新闻', publish_time='2024-03-01 10:30:00')
+    asyncio.run(analyzer.analyze_sentiment([new] + old, '600519'))
+    latest = json.loads(analyzer._get_latest_path('600519').read_text(encoding='utf-8'))
+    assert latest['delta_count'] == 1
+    assert len(latest['digests']) == 2
+    assert '旧闻的内容' not in analyzer.client.prompts[1]
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from backend.api import services
+from backend.main import app
+from backend.utils.config import Config
+from backend.core.sentiment_history import SentimentHistoryStore
+from tests.conftest import make_news
+
+TODAY = datetime.now().strftime('%Y-%m-%d')
+
+
+def days_ago(n):
+    return (datetime.now() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+def make_result(score, trend, label='积极'):
+    return {
+        'overall_sentiment': {'score': score, 'label': label, 'confidence_index': 0.7},
+        'topic_analysis': {'financial_performance': {'score': 0.9},
+                           'industry_policy': {'score': '无'}},
+        'time_analysis': {'trend': [{'date': date, 'score': s} for date, s in trend]}
+    }
+
+
+def test_record_and_query_daily_scores(tmp_path):
+    store = SentimentHistoryStore(tmp_path / 'history.db')
+    news = [make_news('a', publish_time=f"{days_ago(1)} 10:00:00"),
+            make_news('b', publish_time=f"{days_ago(1)} 10:00:00"),
+            make_news('c', publish_time=f"{TODAY} 10:00:00")]
+    store.record('600519', make_result(0.5, [(days_ago(1), 0.2), (TODAY, 0.8)]), news)
+
+    history = store.query('600519', days_ago(7), TODAY)
+
+    assert history['daily'] == [
+        {'date': days_ago(1), 'score': 0.2, 'article_count': 2},
+        {'date': TODAY, 'score': 0.8, 'article_count': 1}
+    ]
+    run = history['runs'][0]
+    assert (run['date'], run['overall_score'], run['confidence']) == (TODAY, 0.5, 0.7)
+    assert run['topic_scores']['financial_performance'] == 0.9
+    # 无法转换为数值的得分存为空
+    assert run['topic_scores']['industry_policy'] is None
+
+
+def test_latest_analysis_wins_for_the_same_date(tmp_path):
+    store = SentimentHistoryStore(tmp_path / 'history.db')
+    store.record('600519', make_result(0.1, [(TODAY, 0.1)]), [])
+    store.record('600519', make_result(-0.3, [(TODAY, -0.3)], label='消极'), [])
+
+    history = store.query('600519', TODAY, TODAY)
+    assert [item['score'] for item in history['daily']] == [-0.3]
+    assert [run['label'] for run in history['runs']] == ['消极']
+
+
+def test_rolling_windows(tmp_path):
+    store = SentimentHistoryStore(tmp_path / 'history.db')
+    news = [make_news('a', publish_time=f"{days_ago(0)} 10:00:00"),
+            make_news('b', publish_time=f"{days_ago(0)} 10:00:00"),
+            make_news('c', publish_time=f"{days_ago(5)} 10:00:00")]
+    store.record('600519', make_result(0.5, [(days_ago(0), 0.6), (days_ago(5), 0.0)]), news)
+
+    # 查询范围只有今天，7日窗口仍包含5天前的数据
+    rolling = store.query('600519', TODAY, TODAY, windows=(1, 7))['rolling']
+
+    assert rolling['1d'] == {'days': 1, 'articles': 2, 'mean_score': 0.6, 'weighted_score': 0.6}
+    assert rolling['7d'] == {'days': 2, 'articles': 3, 'mean_score': 0.3, 'weighted_score': 0.4}
+
+
+def test_latest_runs_per_stock(tmp_path):
+    store = SentimentHistoryStore(tmp_path / 'history.db')
+    store.record('600519', make_result(0.1, []), [])
+    store.record('600519', make_result(0.4, []), [])
+    store.record('000001', make_result(-0.2, [], label='消极'), [])
+
+    runs = store.latest_runs(['600519', '000001', '300750'], TODAY)
+
+    assert set(runs) == {'600519', '000001'}
+    assert runs['600519']['overall_score'] == 0.4
+    assert runs['000001']['label'] == '消极'
+    assert store.latest_runs(['600519'], days_ago(-1)) == {}
+
+
+@pytest.fixture
+def client(data_dir, monkeypatch):
+    """不配置大模型API密钥的接口客户端，各服务单例重新构造"""
+    monkeypatch.setattr(Config, 'DEEPSEEK_API_KEY', None)
+    monkeypatch.setattr(Config, 'GEMINI_API_KEY', None)
+    monkeypatch.setattr(services, '_instances', {})
+    return TestClient(app)
+
+
+def test_history_api_without_llm_key(client):
+    services.get_history_store().record(
+        '600519', make_result(0.5, [(TODAY, 0.8)]),
+        [make_news('a', publish_time=f"{TODAY} 10:00:00")])
+
+    response = client.get('/api/stocks/600519/sentiment-history', params={'windows': '1,7'})
+
+    assert response.status_code == 200
+    assert response.json()['daily'] == [{'date': TODAY, 'score': 0.8, 'article_count': 1}]
+    assert not services.is_created('sentiment_analyzer')
+
+
+def test_history_api_rejects_invalid_ranges(client):
+    url = '/api/stocks/600519/sentiment-history'
+    assert client.get(url, params={'start_date': '2024-03-02', 'end_date': '2024-03-01'}).status_code == 400
+    assert client.get(url, params={'windows': '0'}).status_code == 400
+    assert client.get(url, params={'windows': '99999999'}).status_code == 400
+    assert client.get(url, params={'windows': f"{Config.SENTIMENT_HISTORY_MAX_WINDOW}"}).status_code == 200
@@ -0,0 +1,70 @@
+import pytest
+from backend.utils.stock_index import build_stock_index, StockIndex
+
+STOCKS = [
+    {'code': '600519', 'name': '贵州茅台'},
+    {'code': '000858', 'name': '五粮液'},
+    {'code': '000568', 'name': '泸州老窖'},
+    {'code': '601318', 'name': '中国平安'},
+    {'code': '601988', 'name': '中国银行'},
+    {'code': '600519', 'name': '重复代码'},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / 'stocks.idx'
+    assert build_stock_index(STOCKS, path, complete=True,
+                             source_mtime_ns=123, source_size=456) == 5
+    return StockIndex(path)
+
+
+def codes(stocks):
+    return [stock['code'] for stock in stocks]
+
+
+def test_header_metadata(index):
+    assert len(index) == 5
+    assert index.complete
+    assert (index.source_mtime_ns, index.source_size) == (123, 456)
+
+
+def test_get_by_code(index):
+    # 代码重复时保留第一项
+    assert index.get('600519') == {'code': '600519', 'name': '贵州茅台'}
+    assert index.get('000568') == {'code': '000568', 'name': '泸州老窖'}
+    assert index.get('600520') is None
+    assert index.get('茅台') is None
+
+
+def test_search_names(index):
+    assert codes(index.search('茅')) == ['600519']
+    assert codes(index.search('中国')) == ['601318', '601988']
+    assert codes(index.search('州老窖')) == ['000568']
+    # 两字组合都出现但不相邻
+    assert index.search('中银') == []
+
+
+def test_search_codes(index):
+    assert codes(index.search('0005')) == ['000568']
+    assert codes(index.search('60')) == ['600519', '601318', '601988']
+    # 不会跨越两个代码匹配
+    assert index.search('19000') == []
+
+
+def test_search_limit_and_empty_query(index):
+    assert codes(index.search('60', limit=2)) == ['600519', '601318']
+    assert index.search('') == []
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = tmp_path / 'bad.idx'
+    path.write_bytes(b'\0' * 256)
+    with pytest.raises(ValueError):
+        StockIndex(path)
+
+
+def test_incomplete_snapshot(tmp_path):
+    path = tmp_path / 'partial.idx'
+    build_stock_index(STOCKS[:2], path)
+    assert not StockIndex(path).complete
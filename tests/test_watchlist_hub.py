@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from backend.core.watchlist_hub import WatchlistHub
+from backend.utils.config import Config
+from tests.conftest import make_news, FakeCrawler, FakeAnalyzer
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    # 测试中手动触发后续轮询
+    monkeypatch.setattr(Config, 'WATCHLIST_POLL_INTERVAL', 3600)
+    return WatchlistHub(FakeCrawler(), FakeAnalyzer())
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_one_poll_per_stock_shared_by_subscribers(hub):
+    hub.news_crawler.news['600519'] = [make_news('旧闻')]
+
+    async def main():
+        first, second = hub.connect(), hub.connect()
+        hub.subscribe(first, ['600519'])
+        await settle()
+        hub.subscribe(second, ['600519', '600519'])
+        return drain(first), drain(second)
+
+    first, second = asyncio.run(main())
+    assert hub.news_crawler.calls == 1
+    assert [m['type'] for m in first] == ['subscribed', 'snapshot']
+    # 后订阅的连接立即收到已有状态的快照
+    assert [m['type'] for m in second] == ['subscribed', 'snapshot']
+    assert second[1]['news'][0]['title'] == '旧闻'
+    assert second[1]['sentiment']['overall_score'] == 0.5
+    assert hub.metrics() == {'codes': 1, 'subscriptions': 2}
+
+
+def test_pushes_only_changes(hub, monkeypatch):
+    monkeypatch.setattr(Config, 'WATCHLIST_SCORE_THRESHOLD', 0.1)
+    hub.news_crawler.news['600519'] = [make_news('旧闻')]
+
+    async def main():
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ['600519'])
+        await settle()
+        state = hub._states['600519']
+        drain(subscriber)
+
+        # 没有变化时不推送
+        await hub._poll_once('600519', state)
+        assert drain(subscriber) == []
+
+        hub.news_crawler.news['600519'].append(make_news('新闻'))
+        hub.sentiment_analyzer.score = 0.55
+        await hub._poll_once('600519', state)
+        news_messages = drain(subscriber)
+
+        hub.sentiment_analyzer.score = 0.7
+        await hub._poll_once('600519', state)
+        return news_messages, drain(subscriber)
+
+    news_messages, sentiment_messages = asyncio.run(main())
+    assert [(m['type'], [n['title'] for n in m['data']]) for m in news_messages] == [('news', ['新闻'])]
+    assert [(m['type'], m['data']['overall_score']) for m in sentiment_messages] == [('sentiment', 0.7)]
+
+
+def test_keeps_previous_news_when_refresh_is_empty(hub):
+    hub.news_crawler.news['600519'] = [make_news('旧闻')]
+
+    async def main():
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ['600519'])
+        await settle()
+        hub.news_crawler.news['600519'] = []
+        await hub._poll_once('600519', hub._states['600519'])
+        return hub._states['600519'].news
+
+    assert [news.title for news in asyncio.run(main())] == ['旧闻']
+
+
+def test_last_unsubscribe_stops_polling(hub):
+    async def main():
+        subscriber = hub.connect()
+        assert hub.subscribe(subscriber, ['600519', '000001']) == ['000001', '600519']
+        task = hub._states['600519'].task
+        hub.unsubscribe(subscriber, ['600519'])
+        await settle()
+        assert task.cancelled()
+        assert {'type': 'subscribed', 'codes': ['000001']} in drain(subscriber)
+        hub.disconnect(subscriber)
+        await settle()
+
+    asyncio.run(main())
+    assert hub.metrics() == {'codes': 0, 'subscriptions': 0}
+
+
+def test_subscription_limit(hub, monkeypatch):
+    monkeypatch.setattr(Config, 'WATCHLIST_MAX_CODES', 2)
+
+    async def main():
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ['600519', '000001'])
+        with pytest.raises(ValueError):
+            hub.subscribe(subscriber, ['300750'])
+        hub.stop()
+
+    asyncio.run(main())
+
+
+def test_slow_subscriber_is_disconnected(monkeypatch):
+    monkeypatch.setattr(Config, 'WATCHLIST_QUEUE_SIZE', 2)
+
+    async def main():
+        subscriber = WatchlistHub(None, None).connect()
+        for i in range(4):
+            subscriber.send({'n': i})
+        return subscriber
+
+    subscriber = asyncio.run(main())
+    assert subscriber.overflowed
+    assert drain(subscriber) == [{'n': 0}, {'n': 1}, None]